@@ -0,0 +1,377 @@
+"""
+Resolve benchmarking.
+
+Generates synthetic package repositories, and times a fixed corpus of requests
+against them. Used by the rez-benchmark tool, so that solver performance can be
+compared across releases.
+"""
+from rez.package_repository import package_repository_manager
+from rez.package_serialise import dump_package_data
+from rez.serialise import FileFormat
+from rez.solver import Solver, SolverStatus
+from rez.vendor.version.requirement import Requirement
+from rez import __version__
+import random
+import time
+import sys
+import os
+import os.path
+
+try:
+    import resource
+except ImportError:  # windows
+    resource = None
+
+
+class BenchmarkRepository(object):
+    """A synthetic package repository.
+
+    Families are named 'pkg000', 'pkg001' and so on. Each family only depends
+    on families that come after it, so there are no dependency cycles. Most
+    requirements are satisfied by the higher versions of a family; a proportion
+    (`conflict_density`) are instead pinned to a random single version, or are
+    conflict requirements. Pinned and conflicting requirements are what cause
+    the solver to backtrack.
+    """
+    def __init__(self, num_families=50, num_versions=10, num_variants=1,
+                 fanout=3, conflict_density=0.1, seed=0):
+        """Create the repository data.
+
+        Args:
+            num_families (int): Number of package families.
+            num_versions (int): Number of versions in each family.
+            num_variants (int): Number of variants in each package. Each
+                variant requires a different version of another family.
+            fanout (int): Number of requirements of each package.
+            conflict_density (float): Proportion (0-1) of requirements that are
+                pinned to a single version, or are conflicts.
+            seed (int): Random seed. The same arguments and seed always
+                generate the same repository.
+        """
+        self.num_families = num_families
+        self.num_versions = num_versions
+        self.num_variants = num_variants
+        self.fanout = fanout
+        self.conflict_density = conflict_density
+        self.seed = seed
+
+        rand = random.Random(seed)
+        self.family_names = ["pkg%03d" % i for i in range(num_families)]
+        self.data = {}
+
+        for i, name in enumerate(self.family_names):
+            dependencies = self.family_names[i + 1:]
+            family_data = {}
+
+            for j in range(1, num_versions + 1):
+                version = "%d.0" % j
+                package_data = dict(name=name, version=version)
+
+                n = min(fanout, len(dependencies))
+                names = rand.sample(dependencies, n)
+                requires = [self._requirement(rand, x) for x in names]
+                if requires:
+                    package_data["requires"] = requires
+
+                if num_variants > 1:
+                    names_ = [x for x in dependencies if x not in names]
+                    if names_:
+                        name_ = rand.choice(names_)
+                        package_data["variants"] = [
+                            ["%s-%d" % (name_, num_versions - k)]
+                            for k in range(min(num_variants, num_versions))]
+
+                family_data[version] = package_data
+            self.data[name] = family_data
+
+    def _requirement(self, rand, name):
+        if rand.random() < self.conflict_density:
+            version = rand.randint(1, self.num_versions)
+            if rand.random() < 0.5:
+                return "!%s-%d" % (name, version)
+            else:
+                return "%s-%d" % (name, version)
+        else:
+            version = rand.randint(1, max(self.num_versions / 2, 1))
+            return "%s-%d+" % (name, version)
+
+    def get_requests(self, num_requests=20, request_size=5):
+        """Get a fixed corpus of requests.
+
+        Requests are drawn from the first half of the families, since these
+        have the deepest dependency trees.
+
+        Returns:
+            List of lists of request strings.
+        """
+        rand = random.Random(self.seed)
+        names = self.family_names[:max(self.num_families / 2, 1)]
+        n = min(request_size, len(names))
+        return [sorted(rand.sample(names, n)) for _ in range(num_requests)]
+
+    def create_memory_repository(self):
+        """Create the repository in memory.
+
+        Returns:
+            str: Package path of the repository, for use in 'packages_path'.
+        """
+        path = "memory@rez_benchmark_%s" % '_'.join(
+            str(x) for x in (self.num_families, self.num_versions,
+                             self.num_variants, self.fanout,
+                             self.conflict_density, self.seed))
+        repo = package_repository_manager.get_repository(path)
+        repo.data = self.data
+        return path
+
+    def write_filesystem_repository(self, path):
+        """Write the repository to disk, as package.py files.
+
+        Returns:
+            str: Package path of the repository, for use in 'packages_path'.
+        """
+        for family_data in self.data.itervalues():
+            for package_data in family_data.itervalues():
+                pkg_path = os.path.join(path, package_data["name"],
+                                        package_data["version"])
+                if not os.path.exists(pkg_path):
+                    os.makedirs(pkg_path)
+
+                filepath = os.path.join(pkg_path, "package.py")
+                with open(filepath, 'w') as f:
+                    dump_package_data(package_data, buf=f,
+                                      format_=FileFormat.py)
+        return path
+
+
+def get_peak_memory():
+    """Get the peak resident memory of this process, in kilobytes.
+
+    Returns:
+        int, or None if not available on this platform.
+    """
+    if resource is None:
+        return None
+
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        kb /= 1024  # bytes on osx
+    return kb
+
+
+def run_benchmark(package_paths, requests, use_context=False, **solver_kwargs):
+    """Resolve each request, and collect timing and solver statistics.
+
+    Args:
+        package_paths (list of str): Package search path.
+        requests (list of list of str): Requests to resolve.
+        use_context (bool): If True, resolve via `ResolvedContext` (and so
+            include resolve caching, package filters etc), rather than
+            `Solver` directly.
+        solver_kwargs: Extra arguments passed to `Solver`, such as
+            'learn_nogoods' or 'parallel_workers'. Ignored if `use_context`
+            is True.
+
+    Returns:
+        dict: Results, suitable for serialising to json.
+    """
+    results = []
+    total_start_time = time.time()
+
+    for request in requests:
+        start_time = time.time()
+
+        if use_context:
+            from rez.resolved_context import ResolvedContext
+
+            context = ResolvedContext(request,
+                                      package_paths=package_paths,
+                                      add_implicit_packages=False)
+            entry = dict(status=context.status.name,
+                         solve_time=context.solve_time,
+                         load_time=context.load_time,
+                         from_cache=context.from_cache)
+        else:
+            solver = Solver([Requirement(x) for x in request],
+                            package_paths=package_paths,
+                            **solver_kwargs)
+            solver.solve()
+            status = solver.status
+            if status == SolverStatus.solved:
+                status_name = "solved"
+            else:
+                status_name = "failed"
+
+            entry = dict(status=status_name,
+                         solve_time=solver.solve_time,
+                         load_time=solver.load_time,
+                         num_solves=solver.num_solves,
+                         num_fails=solver.num_fails,
+                         num_pruned=solver.num_pruned)
+
+        entry["request"] = ' '.join(request)
+        entry["wall_time"] = time.time() - start_time
+        results.append(entry)
+
+    def _total(key):
+        return sum(x.get(key) or 0 for x in results)
+
+    return dict(
+        requests=results,
+        totals=dict(wall_time=time.time() - total_start_time,
+                    solve_time=_total("solve_time"),
+                    load_time=_total("load_time"),
+                    num_solves=_total("num_solves"),
+                    num_fails=_total("num_fails"),
+                    num_pruned=_total("num_pruned"),
+                    num_solved=len([x for x in results
+                                    if x["status"] == "solved"])),
+        peak_memory_kb=get_peak_memory(),
+        rez_version=__version__)
+
+
+def run_startup_benchmark(subcommands=None, repeats=5):
+    """Time the startup of rez command line tools.
+
+    Each measurement is made in a new python interpreter, since startup cost
+    is dominated by module imports. Two things are measured per command -
+    the time to import its cli module (including rez itself), and the wall
+    time of 'rez <command> --help', which is the time to first output. The
+    best of `repeats` runs is kept.
+
+    Args:
+        subcommands (list of str): Commands to time, defaults to all.
+        repeats (int): Number of times to run each measurement.
+
+    Returns:
+        dict: Results, suitable for serialising to json.
+    """
+    import subprocess
+    from rez import module_root_path
+    from rez.cli._util import subcommands as all_subcommands
+
+    env = os.environ.copy()
+    paths = [os.path.dirname(module_root_path)]
+    if env.get("PYTHONPATH"):
+        paths.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(paths)
+
+    def _best_time(code, output=False):
+        times = []
+        for _ in range(repeats):
+            start_time = time.time()
+            p = subprocess.Popen([sys.executable, "-c", code], env=env,
+                                 stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+            out, _ = p.communicate()
+            wall_time = time.time() - start_time
+            times.append(float(out) if output else wall_time)
+        return min(times)
+
+    import_code = ("import time; t = time.time(); import %s; "
+                   "print time.time() - t")
+    help_code = ("import sys; sys.argv = ['rez', '%s', '--help']; "
+                 "from rez.cli._main import run; run()")
+
+    commands = {}
+    for subcommand in (subcommands or all_subcommands):
+        module_name = "rez.cli.%s" % subcommand
+        commands[subcommand] = dict(
+            import_time=_best_time(import_code % module_name, output=True),
+            help_time=_best_time(help_code % subcommand))
+
+    def _total(key):
+        return sum(x[key] for x in commands.itervalues())
+
+    return dict(
+        commands=commands,
+        totals=dict(import_time=_total("import_time"),
+                    help_time=_total("help_time")),
+        interpreter_time=_best_time("pass"),
+        import_rez_time=_best_time(import_code % "rez", output=True),
+        repeats=repeats,
+        rez_version=__version__)
+
+
+def run_cache_format_benchmark(package_paths, requests, repeats=5):
+    """Compare cache entries pickled, and encoded in the rez wire format.
+
+    The entries measured are those that resolving the requests would cache -
+    the resolve of each request, and the package files of the resolved
+    packages. Pickled entries are measured as the memcached client stores
+    them (pickle protocol 0). Sizes are given uncompressed and zlib
+    compressed; times are the best of `repeats` runs over all entries.
+
+    Args:
+        package_paths (list of str): Package search path. This should be a
+            filesystem repository, since resolves are only cached for
+            repositories that provide release times.
+        requests (list of list of str): Requests to resolve.
+        repeats (int): Number of times to run each measurement.
+
+    Returns:
+        dict: Results, suitable for serialising to json.
+    """
+    from rez.resolver import Resolver, ResolverStatus
+    from rez.serialise import load_from_file
+    from rez.utils import wire_format
+    import cPickle
+    import zlib
+
+    resolve_entries = []
+    package_file_entries = {}
+
+    for request in requests:
+        resolver = Resolver([Requirement(x) for x in request],
+                            package_paths=package_paths,
+                            caching=False)
+        solver_dict = resolver._solver_to_dict(resolver._solve())
+        resolver._set_result(solver_dict)
+        if resolver.status != ResolverStatus.solved:
+            continue
+
+        entry = resolver._get_cache_entry(solver_dict)
+        if entry:
+            resolve_entries.append(entry)
+
+        for variant in resolver.resolved_packages:
+            resource = variant.parent.resource
+            filepath = getattr(resource, "filepath", None)
+            if filepath and filepath not in package_file_entries:
+                data = load_from_file(filepath, resource.file_format)
+                package_file_entries[filepath] = (filepath, data)
+
+    def _best_time(func, values):
+        times = []
+        for _ in range(repeats):
+            start_time = time.time()
+            for value in values:
+                func(value)
+            times.append(time.time() - start_time)
+        return min(times)
+
+    def _measure(entries):
+        pickled = [cPickle.dumps(x, 0) for x in entries]
+        encoded = [wire_format.dumps(x) for x in entries]
+
+        def _size(values, compress=False):
+            return sum(len(zlib.compress(x) if compress else x)
+                       for x in values)
+
+        return dict(
+            count=len(entries),
+            pickle_bytes=_size(pickled),
+            pickle_compressed_bytes=_size(pickled, compress=True),
+            pickle_encode_time=_best_time(lambda x: cPickle.dumps(x, 0),
+                                          entries),
+            pickle_decode_time=_best_time(cPickle.loads, pickled),
+            wire_bytes=_size(encoded),
+            wire_compressed_bytes=_size(encoded, compress=True),
+            wire_encode_time=_best_time(wire_format.dumps, entries),
+            wire_decode_time=_best_time(wire_format.loads, encoded))
+
+    return dict(
+        entries=dict(resolve=_measure(resolve_entries),
+                     package_file=_measure(package_file_entries.values())),
+        repeats=repeats,
+        wire_format_version=wire_format.format_version,
+        rez_version=__version__)
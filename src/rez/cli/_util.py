@@ -6,6 +6,7 @@ from rez.vendor.argparse import _SubParsersAction, ArgumentParser, SUPPRESS, \
 
 
 subcommands = [
+    "benchmark",
     "bind",
     "build",
     "config",
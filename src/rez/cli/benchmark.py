@@ -0,0 +1,146 @@
+"""
+Benchmark the solver against a synthetic package repository, the startup time
+of rez commands, or the encoding of cache entries.
+"""
+
+
+def setup_parser(parser, completions=False):
+    parser.add_argument(
+        "--families", type=int, default=50,
+        help="number of package families (default: %(default)s)")
+    parser.add_argument(
+        "--versions", type=int, default=10,
+        help="number of versions per family (default: %(default)s)")
+    parser.add_argument(
+        "--variants", type=int, default=1,
+        help="number of variants per package (default: %(default)s)")
+    parser.add_argument(
+        "--fanout", type=int, default=3,
+        help="number of requirements per package (default: %(default)s)")
+    parser.add_argument(
+        "--conflict-density", type=float, default=0.1,
+        help="proportion of requirements that are pinned or conflicting "
+        "(default: %(default)s)")
+    parser.add_argument(
+        "--requests", type=int, default=20,
+        help="number of requests to resolve (default: %(default)s)")
+    parser.add_argument(
+        "--request-size", type=int, default=5,
+        help="number of packages in each request (default: %(default)s)")
+    parser.add_argument(
+        "--seed", type=int, default=0,
+        help="random seed (default: %(default)s)")
+    parser.add_argument(
+        "--repository", choices=("memory", "filesystem"), default="memory",
+        help="type of repository to generate (default: %(default)s)")
+    parser.add_argument(
+        "--path", type=str,
+        help="where to write the filesystem repository (defaults to a "
+        "temporary directory, which is deleted afterwards)")
+    parser.add_argument(
+        "--context", action="store_true",
+        help="resolve via a context (including resolve caching), rather than "
+        "using the solver directly")
+    parser.add_argument(
+        "--workers", type=int,
+        help="number of parallel solver workers (defaults to the "
+        "'solver_parallel_workers' setting)")
+    parser.add_argument(
+        "--no-nogoods", dest="nogoods", action="store_false", default=None,
+        help="disable solver nogood learning (defaults to the "
+        "'solver_learn_nogoods' setting)")
+    parser.add_argument(
+        "--startup", action="store_true",
+        help="time the startup of rez commands, rather than the solver")
+    parser.add_argument(
+        "--commands", type=str, nargs='+', metavar="COMMAND",
+        help="commands to time with --startup (defaults to all)")
+    parser.add_argument(
+        "--repeats", type=int, default=5,
+        help="number of runs per measurement with --startup or "
+        "--cache-format, the best is kept (default: %(default)s)")
+    parser.add_argument(
+        "--cache-format", action="store_true",
+        help="compare the size and decode time of cache entries, pickled and "
+        "in the rez wire format, rather than timing the solver. A filesystem "
+        "repository is always used")
+    parser.add_argument(
+        "-o", "--output", type=str, metavar="FILE",
+        help="write results to FILE, rather than stdout")
+
+
+def command(opts, parser, extra_arg_groups=None):
+    from rez.benchmark import BenchmarkRepository, run_benchmark, \
+        run_startup_benchmark, run_cache_format_benchmark
+    import tempfile
+    import shutil
+
+    if opts.startup:
+        result = run_startup_benchmark(subcommands=opts.commands,
+                                       repeats=opts.repeats)
+        _print_result(result, opts)
+        return
+
+    repo = BenchmarkRepository(num_families=opts.families,
+                               num_versions=opts.versions,
+                               num_variants=opts.variants,
+                               fanout=opts.fanout,
+                               conflict_density=opts.conflict_density,
+                               seed=opts.seed)
+    requests = repo.get_requests(num_requests=opts.requests,
+                                 request_size=opts.request_size)
+
+    tmpdir = None
+    if opts.cache_format:
+        opts.repository = "filesystem"
+
+    if opts.repository == "memory":
+        package_path = repo.create_memory_repository()
+    else:
+        path = opts.path
+        if not path:
+            tmpdir = tempfile.mkdtemp(prefix="rez_benchmark_")
+            path = tmpdir
+        package_path = repo.write_filesystem_repository(path)
+
+    try:
+        if opts.cache_format:
+            result = run_cache_format_benchmark([package_path],
+                                                requests,
+                                                repeats=opts.repeats)
+        else:
+            solver_kwargs = dict(parallel_workers=opts.workers)
+            if opts.nogoods is not None:
+                solver_kwargs["learn_nogoods"] = opts.nogoods
+
+            result = run_benchmark([package_path],
+                                   requests,
+                                   use_context=opts.context,
+                                   **solver_kwargs)
+    finally:
+        if tmpdir:
+            shutil.rmtree(tmpdir)
+
+    result["settings"] = dict(families=opts.families,
+                              versions=opts.versions,
+                              variants=opts.variants,
+                              fanout=opts.fanout,
+                              conflict_density=opts.conflict_density,
+                              requests=opts.requests,
+                              request_size=opts.request_size,
+                              seed=opts.seed,
+                              repository=opts.repository,
+                              context=opts.context)
+
+    _print_result(result, opts)
+
+
+def _print_result(result, opts):
+    import json
+
+    txt = json.dumps(result, indent=4, sort_keys=True)
+    if opts.output:
+        with open(opts.output, 'w') as f:
+            f.write(txt + '\n')
+    else:
+        print txt
@@ -46,6 +46,14 @@ def setup_parser(parser, completions=False):
     parser.add_argument(
         "--pp", "--prune-package", dest="prune_pkg", metavar="PKG",
         type=str, help="prune the graph down to PKG")
+    convert_action = parser.add_argument(
+        "--convert", type=str, metavar="FILE",
+        help="write the context to FILE, in yaml format (or binary format, if "
+        "--binary is present)")
+    parser.add_argument(
+        "--binary", action="store_true",
+        help="write the context in binary format. Ignored if --convert is not "
+        "present")
     parser.add_argument(
         "-i", "--interpret", action="store_true",
         help="interpret the context and print the resulting code")
@@ -78,6 +86,7 @@ def setup_parser(parser, completions=False):
         rxt_completer = FilesCompleter(dirs=False, file_patterns=["*.rxt"])
         RXT_action.completer = rxt_completer
         diff_action.completer = rxt_completer
+        convert_action.completer = rxt_completer
 
 
 def command(opts, parser, extra_arg_groups=None):
@@ -128,6 +137,8 @@ def command(opts, parser, extra_arg_groups=None):
                 print path
             else:
                 print >> sys.stderr, "'%s' not found in the context" % cmd
+        elif opts.convert:
+            rc.save(opts.convert, binary=opts.binary)
         elif opts.print_graph:
             gstr = _graph()
             print gstr
@@ -85,6 +85,11 @@ def setup_parser(parser, completions=False):
     parser.add_argument(
         "--patch-rank", type=int, metavar="N", default=0,
         help="patch rank. Ignored if --patch is not present")
+    parser.add_argument(
+        "--seed", action="store_true",
+        help="prefer the packages of the current context when patching, which "
+        "can make the resolve faster, but may resolve to older packages than "
+        "an unseeded resolve would. Ignored if --patch is not present")
     parser.add_argument(
         "--no-cache", dest="no_cache", action="store_true",
         help="do not fetch cached resolves")
@@ -97,6 +102,10 @@ def setup_parser(parser, completions=False):
     parser.add_argument(
         "--detached", action="store_true",
         help="open a separate terminal")
+    parser.add_argument(
+        "--stats", action="store_true",
+        help="print timing and counter statistics for the resolve and the "
+        "rest of the process to stderr, on exit")
     parser.add_argument(
         "--pre-command", type=str, help=SUPPRESS)
     PKG_action = parser.add_argument(
@@ -134,6 +143,7 @@ def command(opts, parser, extra_arg_groups=None):
         command = extra_arg_groups[0] or None
 
     context = None
+    seed_context = None
     request = opts.PKG
     t = get_epoch_time_from_str(opts.time) if opts.time else None
 
@@ -165,6 +175,8 @@ def command(opts, parser, extra_arg_groups=None):
         request = context.get_patched_request(request,
                                               strict=opts.strict,
                                               rank=opts.patch_rank)
+        if opts.seed:
+            seed_context = context
         context = None
 
     if context is None:
@@ -192,7 +204,13 @@ def command(opts, parser, extra_arg_groups=None):
                                   verbosity=opts.verbose,
                                   max_fails=opts.max_fails,
                                   time_limit=opts.time_limit,
-                                  caching=(not opts.no_cache))
+                                  caching=(not opts.no_cache),
+                                  seed_context=seed_context)
+
+    def _exit(returncode):
+        if opts.stats:
+            context.print_stats(buf=sys.stderr)
+        sys.exit(returncode)
 
     success = (context.status == ResolverStatus.solved)
     if not success:
@@ -203,10 +221,10 @@ def command(opts, parser, extra_arg_groups=None):
             context.write_to_buffer(sys.stdout)
         else:
             context.save(opts.output)
-        sys.exit(0 if success else 1)
+        _exit(0 if success else 1)
 
     if not success:
-        sys.exit(1)
+        _exit(1)
 
     # generally shells will behave as though the '-s' flag was not present when
     # no stdin is available. So here we replicate this behaviour.
@@ -226,4 +244,4 @@ def command(opts, parser, extra_arg_groups=None):
         pre_command=opts.pre_command,
         block=True)
 
-    sys.exit(returncode)
+    _exit(returncode)
@@ -13,26 +13,54 @@ def setup_parser(parser, completions=False):
     parser.add_argument(
         "--reset-stats", action="store_true",
         help="reset statistics")
+    parser.add_argument(
+        "--functions", action="store_true",
+        help="list hit/miss statistics of each cached function, over all rez "
+        "processes (requires the memcached_function_stats setting)")
     parser.add_argument(
         "--poll", action="store_true",
-        help="continually poll, showing get/sets per second")
+        help="continually poll, showing get/sets per second, and the health "
+        "of each server")
     parser.add_argument(
         "--interval", type=float, metavar="SECS", default=1.0,
         help="interval (in seconds) used when polling (default: %(default)s)")
 
 
+def get_health_summary(server):
+    from rez.utils.memcached import server_health
+    import time
+
+    status = server_health.get_status(server)
+    if status["down_until"] > time.time():
+        summary = "down (retry in %ds)" % int(status["down_until"] - time.time())
+    else:
+        summary = "ok"
+
+    if status["total_failures"]:
+        summary += ", %d failures" % status["total_failures"]
+    return summary
+
+
 def poll(client, interval):
-    from rez.utils.memcached import Client
+    from rez.utils.memcached import Client, server_health
     import time
 
     prev_entry = None
-    print "%-64s %-16s %-16s %-16s %-16s %-16s" \
-        % ("SERVER", "CONNS", "GET/s", "SET/s", "TEST_GET", "TEST_SET")
+    print "%-64s %-16s %-16s %-16s %-16s %-16s %s" \
+        % ("SERVER", "CONNS", "GET/s", "SET/s", "TEST_GET", "TEST_SET",
+           "HEALTH")
 
     while True:
         stats = dict(client.get_stats())
         entry = (time.time(), stats)
 
+        # servers that are down do not return stats
+        for server in client.servers:
+            if server_health.is_down(server):
+                print "%-64s %-16s %-16s %-16s %-16s %-16s %s" \
+                    % (server, '-', '-', '-', '-', '-',
+                       get_health_summary(server))
+
         if prev_entry:
             prev_t, prev_stats = prev_entry
             t, stats = entry
@@ -49,24 +77,50 @@ def poll(client, interval):
 
                     # test get/set
                     uri = instance.split()[0]
-                    client = Client([uri], debug=True)
+                    test_client = Client([uri], debug=True)
                     t1 = time.time()
-                    client.set("__TEST__", 1)
+                    test_client.set("__TEST__", 1)
                     t2 = time.time()
                     test_set = t2 - t1
-                    client.get("__TEST__")
+                    test_client.get("__TEST__")
                     test_get = time.time() - t2
 
                     nconns = int(payload["curr_connections"])
 
-                    print "%-64s %-16d %-16g %-16g %-16g %-16g" \
+                    print "%-64s %-16d %-16g %-16g %-16g %-16g %s" \
                         % (instance, nconns, gets_per_sec, sets_per_sec,
-                           test_get, test_set)
+                           test_get, test_set, get_health_summary(uri))
 
         prev_entry = entry
         time.sleep(interval)
 
 
+def print_function_stats():
+    from rez.utils.memcached import get_function_stats
+    from rez.utils.formatting import columnise
+    from rez.plugin_managers import plugin_manager
+    import rez.serialise
+
+    # import the modules that contain cached functions
+    plugin_manager.get_plugins("package_repository")
+
+    rows = [["FUNCTION", "L1 HITS", "HITS", "MISSES", "HIT RATIO"],
+            ["--------", "-------", "----", "------", "---------"]]
+
+    for name, stats in sorted(get_function_stats().iteritems()):
+        hits = stats["l1_hits"] + stats["hits"]
+        misses = stats["misses"]
+        hit_ratio = float(hits) / max(hits + misses, 1)
+
+        row = (name,
+               str(stats["l1_hits"]),
+               str(stats["hits"]),
+               str(misses),
+               "%d%%" % int(hit_ratio * 100.0))
+        rows.append(row)
+    print '\n'.join(columnise(rows))
+
+
 def command(opts, parser, extra_arg_groups=None):
     from rez.config import config
     from rez.utils.yaml import dump_yaml
@@ -96,6 +150,10 @@ def command(opts, parser, extra_arg_groups=None):
         print "memcached servers are stat reset."
         return
 
+    if opts.functions:
+        print_function_stats()
+        return
+
     def _fail():
         print >> sys.stderr, "memcached servers are not responding."
         sys.exit(1)
@@ -2,19 +2,22 @@ from rez import __version__
 from rez.util import deep_update
 from rez.utils.data_utils import AttrDictWrapper, RO_AttrDictWrapper, \
     convert_dicts, cached_property, cached_class_property, LazyAttributeMeta
-from rez.utils.formatting import expandvars, expanduser
+from rez.utils.formatting import expandvars, expanduser, ENV_VAR_REGEX
 from rez.utils.logging_ import get_debug_printer
+from rez.utils.stats import stats
 from rez.utils.scope import scoped_format
 from rez.exceptions import ConfigurationError
 from rez import module_root_path
 from rez.system import system
 from rez.vendor.schema.schema import Schema, SchemaError, Optional, And, Or, Use
 from rez.vendor.enum import Enum
-from rez.vendor import yaml
-from rez.vendor.yaml.error import YAMLError
 from rez.backport.lru_cache import lru_cache
 from UserDict import UserDict
 from inspect import ismodule
+from hashlib import md5
+import marshal
+import atexit
+import sys
 import os
 import os.path
 import copy
@@ -123,6 +126,17 @@ class Int(Setting):
             raise ConfigurationError("expected %s to be an integer"
                                      % self._env_var_name)
 
+
+class Float(Setting):
+    schema = Or(And(int, Use(float)), float)
+
+    def _parse_env_var(self, value):
+        try:
+            return float(value)
+        except ValueError:
+            raise ConfigurationError("expected %s to be a number"
+                                     % self._env_var_name)
+
 class Bool(Setting):
     schema = Schema(bool)
     true_words = frozenset(["1", "true", "yes", "y", "on"])
@@ -231,6 +245,9 @@ config_schema = Schema({
     "memcached_uri":                                OptionalStrList,
     "local_packages_path":                          Str,
     "release_packages_path":                        Str,
+    "resolve_cache_backend":                        Str,
+    "resolve_cache_path":                           Str,
+    "local_package_file_cache_path":                Str,
     "dot_image_format":                             Str,
     "build_directory":                              Str,
     "documentation_url":                            Str,
@@ -265,19 +282,36 @@ config_schema = Schema({
     "alias_back":                                   OptionalStr,
     "build_thread_count":                           BuildThreadCount_,
     "resource_caching_maxsize":                     Int,
+    "solver_parallel_workers":                      Int,
     "max_package_changelog_chars":                  Int,
     "memcached_package_file_min_compress_len":      Int,
     "memcached_context_file_min_compress_len":      Int,
     "memcached_listdir_min_compress_len":           Int,
     "memcached_resolve_min_compress_len":           Int,
+    "resolve_cache_max_size":                       Int,
+    "local_package_file_cache_max_size":            Int,
+    "memcached_l1_size":                            Int,
+    "memcached_l1_ttl":                             Int,
+    "memcached_write_behind_queue_size":            Int,
+    "memcached_retry_interval":                     Int,
+    "memcached_max_retry_interval":                 Int,
+    "memcached_socket_timeout":                     Float,
     "color_enabled":                                Bool,
     "resolve_caching":                              Bool,
     "cache_package_files":                          Bool,
     "cache_listdir":                                Bool,
+    "memcached_write_behind":                       Bool,
+    "memcached_keep_connections":                   Bool,
+    "memcached_function_stats":                     Bool,
+    "local_package_file_cache":                     Bool,
+    "cache_rex_commands":                           Bool,
     "prune_failed_graph":                           Bool,
+    "solver_learn_nogoods":                         Bool,
     "all_parent_variables":                         Bool,
     "all_resetting_variables":                      Bool,
     "package_commands_sourced_first":               Bool,
+    "context_binary_format":                        Bool,
+    "suite_bake_environments":                      Bool,
     "warn_shell_startup":                           Bool,
     "warn_untimestamped":                           Bool,
     "warn_all":                                     Bool,
@@ -346,12 +380,24 @@ class Config(object):
     instance. The 'rezconfig' file in rez acts as the master - other config
     files update the master configuration to create the final config. See the
     comments at the top of 'rezconfig' for more details.
+
+    A config can keep a snapshot of its loaded and validated settings in a
+    file, so that a later process with the same config files and relevant
+    environment variables only has to stat the config files. The snapshot is
+    discarded if any config file changes, and settings are added to it as they
+    are validated. Settings in rezconfig.py files can be computed from anything
+    (the environment, the filesystem and so on), so a config that sources any
+    rezconfig.py other than rez's own is never snapshotted.
     """
     __metaclass__ = LazyAttributeMeta
     schema = config_schema
     schema_error = ConfigurationError
 
-    def __init__(self, filepaths, overrides=None, locked=False):
+    # environment variables that may affect the expansion of settings
+    snapshot_env_vars = ("HOME", "USER", "LOGNAME", "USERNAME", "USERPROFILE")
+
+    def __init__(self, filepaths, overrides=None, locked=False,
+                 snapshot_path=None):
         """Create a config.
 
         Args:
@@ -360,11 +406,16 @@ class Config(object):
                 others. Nested settings are overridden with nested dicts.
             locked: If True, settings overrides in environment variables are
                 ignored.
+            snapshot_path (str): File to keep a snapshot of the loaded config
+                in. If None, no snapshot is used.
         """
         self.filepaths = filepaths
         self._sourced_filepaths = None
         self.overrides = overrides or {}
         self.locked = locked
+        self.snapshot_path = snapshot_path
+        self._snapshot = None
+        self._snapshot_dirty = False
 
     def get(self, key, default=None):
         """Get the value of a setting."""
@@ -496,18 +547,140 @@ class Config(object):
         self.__dict__, other.__dict__ = other.__dict__, self.__dict__
 
     def _validate_key(self, key, value, key_schema):
+        snapshot = self._snapshot
+        if snapshot is not None and key not in self.overrides:
+            validated = snapshot["validated"]
+            if key in validated:
+                return copy.deepcopy(validated[key])
+
         if type(key_schema) is type and issubclass(key_schema, Setting):
             key_schema = key_schema(self, key)
         elif not isinstance(key_schema, Schema):
             key_schema = Schema(key_schema)
-        return key_schema.validate(value)
+        validated_value = key_schema.validate(value)
+
+        # programmatic defaults, and values expanded with system attributes
+        # (such as '{system.platform}'), depend on the host, so are not
+        # snapshotted
+        if snapshot is not None and key not in self.overrides \
+                and not (value is None and hasattr(self, "_get_%s" % key)) \
+                and not _references_system(value) \
+                and not _references_system(os.getenv("REZ_%s" % key.upper())):
+            self._snapshot_key(key, validated_value)
+        return validated_value
 
     @cached_property
     def _data(self):
-        data, self._sourced_filepaths = _load_config_from_filepaths(self.filepaths)
+        snapshot = None
+        if self.snapshot_path:
+            snapshot = self._load_snapshot()
+
+        if snapshot:
+            data = copy.deepcopy(snapshot["data"])
+            self._sourced_filepaths = snapshot["sourced_filepaths"]
+        else:
+            data, self._sourced_filepaths = \
+                _load_config_from_filepaths(self.filepaths)
+            if self.snapshot_path and not self.overrides \
+                    and self._is_static_config():
+                self._create_snapshot(data)
+
         deep_update(data, self.overrides)
         return data
 
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path, "rb") as f:
+                # don't trust a snapshot written by another user
+                if hasattr(os, "getuid") \
+                        and os.fstat(f.fileno()).st_uid != os.getuid():
+                    return None
+                snapshot = marshal.loads(f.read())
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            snapshot = None
+
+        if not isinstance(snapshot, dict) \
+                or snapshot.get("rez_version") != __version__ \
+                or snapshot.get("files") != _get_file_states(self.filepaths) \
+                or snapshot.get("environ") != \
+                self._get_snapshot_environ(snapshot.get("environ") or {}):
+            stats.incr("config.snapshot.misses")
+            return None
+
+        stats.incr("config.snapshot.hits")
+        self._snapshot = snapshot
+        return snapshot
+
+    def _is_static_config(self):
+        # True if the sourced config files are all yaml - rez's own rezconfig.py
+        # only contains literals, and changes only along with rez itself
+        root_config = get_module_root_config()
+        return all((x == root_config or os.path.splitext(x)[1] != ".py")
+                   for x in self._sourced_filepaths)
+
+    def _create_snapshot(self, data):
+        try:
+            data = marshal.loads(marshal.dumps(data, 2))
+        except ValueError:
+            return  # eg a rezconfig.py containing a function
+
+        # env-vars that can change settings - overrides such as
+        # $REZ_PACKAGES_PATH, and those referenced in setting values, or in
+        # the values of overrides
+        override_names = ["REZ_%s" % x.upper() for x in self._schema_keys]
+        names = set(self.snapshot_env_vars)
+        names.update(override_names)
+        names.update(_get_referenced_env_vars(data))
+        names.update(_get_referenced_env_vars(
+            [x for x in map(os.getenv, override_names) if x]))
+
+        self._snapshot = dict(rez_version=__version__,
+                              files=_get_file_states(self.filepaths),
+                              environ=self._get_snapshot_environ(names),
+                              data=data,
+                              sourced_filepaths=self._sourced_filepaths,
+                              validated={})
+        self._set_snapshot_dirty()
+
+    def _snapshot_key(self, key, value):
+        validated = self._snapshot["validated"]
+        if key in validated:
+            return
+        try:
+            validated[key] = marshal.loads(marshal.dumps(value, 2))
+        except ValueError:
+            return
+        self._set_snapshot_dirty()
+
+    def _set_snapshot_dirty(self):
+        # the snapshot is written on exit, so that it includes all the
+        # settings validated in this process
+        if not self._snapshot_dirty:
+            self._snapshot_dirty = True
+            atexit.register(self._save_snapshot)
+
+    def _save_snapshot(self):
+        if not (self._snapshot and self._snapshot_dirty):
+            return
+
+        self._snapshot_dirty = False
+        dirpath = os.path.dirname(self.snapshot_path)
+        tmp_filepath = "%s.%d.tmp" % (self.snapshot_path, os.getpid())
+
+        try:
+            content = marshal.dumps(self._snapshot, 2)
+            if not os.path.isdir(dirpath):
+                os.makedirs(dirpath, 0700)
+            with open(tmp_filepath, "wb") as f:
+                f.write(content)
+            os.rename(tmp_filepath, self.snapshot_path)
+        except (IOError, OSError, ValueError):
+            pass
+
+    @classmethod
+    def _get_snapshot_environ(cls, names):
+        return dict((x, os.getenv(x)) for x in names)
+
     @classmethod
     def _create_main_config(cls, overrides=None):
         """See comment block at top of 'rezconfig' describing how the main
@@ -521,7 +694,11 @@ class Config(object):
         filepath = os.path.expanduser("~/.rezconfig")
         filepaths.append(filepath)
 
-        return Config(filepaths, overrides)
+        snapshot_path = None
+        if not overrides:
+            snapshot_path = _get_snapshot_path(filepaths)
+
+        return Config(filepaths, overrides, snapshot_path=snapshot_path)
 
     def __str__(self):
         keys = (x for x in self.schema._schema if isinstance(x, basestring))
@@ -709,6 +886,9 @@ def _load_config_py(filepath):
 
 @lru_cache()
 def _load_config_yaml(filepath):
+    from rez.vendor import yaml
+    from rez.vendor.yaml.error import YAMLError
+
     with open(filepath) as f:
         content = f.read()
     try:
@@ -723,6 +903,7 @@ def _load_config_yaml(filepath):
     return doc
 
 
+@stats.timed("config.load")
 def _load_config_from_filepaths(filepaths):
     data = {}
     sourced_filepaths = []
@@ -748,6 +929,73 @@ def _load_config_from_filepaths(filepaths):
     return data, sourced_filepaths
 
 
+def _get_file_states(filepaths):
+    # the mtime and size of each file that _load_config_from_filepaths might
+    # source, so that a snapshot is discarded if any of them change
+    states = []
+    for filepath in filepaths:
+        no_ext = os.path.splitext(filepath)[0]
+        for filepath_ in (no_ext + ".py", filepath):
+            try:
+                st = os.stat(filepath_)
+                states.append((filepath_, st.st_mtime, st.st_size))
+            except OSError:
+                states.append((filepath_, None, None))
+    return states
+
+
+def _get_referenced_env_vars(data):
+    names = set()
+
+    def _find(value):
+        if isinstance(value, basestring):
+            for match in ENV_VAR_REGEX.finditer(value):
+                names.add(match.group(1).strip("{}"))
+        elif isinstance(value, (list, tuple, set)):
+            for value_ in value:
+                _find(value_)
+        elif isinstance(value, dict):
+            for value_ in value.itervalues():
+                _find(value_)
+
+    _find(data)
+    return names
+
+
+def _references_system(value):
+    # True if value contains a string that expands a system attribute
+    if isinstance(value, basestring):
+        return "{system." in value
+    elif isinstance(value, (list, tuple, set)):
+        return any(_references_system(x) for x in value)
+    elif isinstance(value, dict):
+        return any(_references_system(x) for x in value.itervalues())
+    return False
+
+
+def _get_snapshot_path(filepaths):
+    """Get the file to keep the main config's snapshot in.
+
+    Snapshots are stored in $REZ_CONFIG_SNAPSHOT_DIR, or a per-user directory
+    in the system temp dir if that is not set. Setting it to an empty string
+    disables snapshots.
+    """
+    path = os.getenv("REZ_CONFIG_SNAPSHOT_DIR")
+    if path is None:
+        import getpass
+        import tempfile
+        try:
+            path = os.path.join(tempfile.gettempdir(),
+                                "rez_config_%s" % getpass.getuser())
+        except Exception:
+            return None
+    elif not path:
+        return None
+
+    key = repr((module_root_path, filepaths, sys.version))
+    return os.path.join(path, md5(key).hexdigest())
+
+
 def get_module_root_config():
     return os.path.join(module_root_path, "rezconfig.py")
 
@@ -188,6 +188,74 @@ class PackageRepository(object):
         """
         return 0
 
+    def get_variant_state_handles(self, variant_resources):
+        """Get the state handles of several variants at once.
+
+        This is used to validate cached resolves. Override it if your repository
+        type can get state handles more efficiently in bulk than one at a time.
+
+        Args:
+            variant_resources (list of `VariantResource`): Variants.
+
+        Returns:
+            List of hashable values, see `get_variant_state_handle`.
+        """
+        return [self.get_variant_state_handle(x) for x in variant_resources]
+
+    def get_last_release_times(self, names):
+        """Get the last release times of several package families at once.
+
+        This is used to validate cached resolves. Override it if your repository
+        type can find families and their release times more efficiently in
+        bulk than one at a time.
+
+        Args:
+            names (list of str): Package family names.
+
+        Returns:
+            dict: {name: time}, see `get_last_release_time`. Families that are
+            not in this repository are not present in the dict.
+        """
+        times = {}
+        for name in names:
+            family_resource = self.get_package_family(name)
+            if family_resource:
+                times[name] = self.get_last_release_time(family_resource)
+        return times
+
+    def get_indexed_variants(self, package_resource):
+        """Get the variants of a package, and their requirements, from an index.
+
+        This is used by the solver to avoid loading package definitions. A
+        repository that maintains an index of its packages' requirements can
+        implement this; the solver falls back to loading the package if None
+        is returned.
+
+        This may not be applicable to your repository type, leave as-is if so.
+
+        Args:
+            package_resource (`PackageResource`): Package.
+
+        Returns:
+            List of (`ResourceHandle`, requires, build_requires) tuples, one
+            per variant, where the requirement lists are lists of strings. None
+            is returned if the package is not indexed.
+        """
+        return None
+
+    def preload_packages(self, package_resources):
+        """Load the definitions of several packages at once.
+
+        This is used by the solver before it expands the packages in a version
+        range into variants. Override it if your repository type can load
+        packages more efficiently in bulk than one at a time; otherwise,
+        packages are loaded individually on first use.
+
+        Args:
+            package_resources (list of `PackageResource`): Packages to load.
+        """
+        pass
+
     def make_resource_handle(self, resource_key, **variables):
         """Create a `ResourceHandle`
 
@@ -14,6 +14,7 @@ from rez.vendor.version.requirement import VersionedObject
 from rez.serialise import load_from_file, FileFormat
 from rez.config import config
 from rez.system import system
+from collections import defaultdict
 import os.path
 import sys
 
@@ -500,6 +501,52 @@ def get_last_release_time(name, paths=None):
     return max_time
 
 
+def get_last_release_times(names, paths=None):
+    """Returns the most recent release times of several packages.
+
+    This is equivalent to calling `get_last_release_time` for each name, but
+    queries each repository in bulk.
+
+    Returns:
+        dict: {name: time}, where time is zero if it cannot be determined, or
+        if the package family does not exist.
+    """
+    names = list(names)
+    times = dict((x, None) for x in names)
+
+    for path in (paths or config.packages_path):
+        repo = package_repository_manager.get_repository(path)
+        repo_times = repo.get_last_release_times(names)
+
+        for name, time_ in repo_times.iteritems():
+            max_time = times[name]
+            if time_ == 0 or max_time == 0:
+                times[name] = 0
+            elif max_time is None or time_ > max_time:
+                times[name] = time_
+
+    return dict((k, v or 0) for k, v in times.iteritems())
+
+
+def preload_packages(packages):
+    """Load the definitions of several packages at once.
+
+    This is equivalent to loading each package on first use, but repositories
+    that support it (see `PackageRepository.preload_packages`) load them in
+    bulk.
+
+    Args:
+        packages (list of `Package`): Packages to load.
+    """
+    resources = defaultdict(list)
+    for package in packages:
+        resource = package.resource
+        resources[resource._repository].append(resource)
+
+    for repo, resources_ in resources.iteritems():
+        repo.preload_packages(resources_)
+
+
 def get_completions(prefix, paths=None, family_only=False):
     """Get autocompletion options given a prefix string.
 
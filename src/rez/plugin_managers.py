@@ -7,6 +7,7 @@ from rez.util import deep_update
 from rez.utils.schema import dict_to_schema
 from rez.utils.data_utils import LazySingleton, cached_property
 from rez.utils.logging_ import print_debug, print_warning
+from rez.utils.stats import stats
 from rez.exceptions import RezPluginError
 import os.path
 import sys
@@ -81,7 +82,7 @@ class RezPluginType(object):
         self.plugin_classes = {}
         self.failed_plugins = {}
         self.plugin_modules = {}
-        self.config_data = {}
+        self.config_paths = []
         self.load_plugins()
 
     def __repr__(self):
@@ -94,6 +95,7 @@ class RezPluginType(object):
         self.plugin_classes[plugin_name] = plugin_class
         self.plugin_modules[plugin_name] = plugin_module
 
+    @stats.timed("plugins.load")
     def load_plugins(self):
         import pkgutil
         from rez.backport.importlib import import_module
@@ -151,9 +153,8 @@ class RezPluginType(object):
                             traceback.print_exc(file=out)
                             print_debug(out.getvalue())
 
-            # load config
-            data, _ = _load_config_from_filepaths([os.path.join(path, "rezconfig")])
-            deep_update(self.config_data, data)
+            # config is loaded on first use, see `config_data`
+            self.config_paths.append(os.path.join(path, "rezconfig"))
 
     def get_plugin_class(self, plugin_name):
         """Returns the class registered under the given plugin name."""
@@ -171,6 +172,19 @@ class RezPluginType(object):
             raise RezPluginError("Unrecognised %s plugin: '%s'"
                                  % (self.pretty_type_name, plugin_name))
 
+    @cached_property
+    def config_data(self):
+        """Returns the merged configuration data of this plugin type.
+
+        This is loaded lazily, so that listing plugins (for example, to
+        setup command line choices) does not parse any config files.
+        """
+        config_data = {}
+        for filepath in self.config_paths:
+            data, _ = _load_config_from_filepaths([filepath])
+            deep_update(config_data, data)
+        return config_data
+
     @cached_property
     def config_schema(self):
         """Returns the merged configuration data schema for this plugin
@@ -9,8 +9,11 @@ from rez.utils.colorize import critical, heading, local, implicit, Printer
 from rez.utils.formatting import columnise, PackageRequest
 from rez.utils.filesystem import TempDirs
 from rez.utils.memcached import pool_memcached_connections
+from rez.utils.local_cache import LocalCache
+from rez.utils.stats import stats, format_stats
 from rez.backport.shutilwhich import which
-from rez.rex import RexExecutor, Python, OutputStyle
+from rez.rex import RexExecutor, Python, OutputStyle, ActionManager, \
+    EscapedString, Command, Source, Comment, Shebang, Unsetenv, Alias, Action
 from rez.rex_bindings import VersionBinding, VariantBinding, \
     VariantsBinding, RequirementsBinding
 from rez.packages_ import get_variant, iter_packages
@@ -24,7 +27,10 @@ from rez.vendor.enum import Enum
 from rez.vendor import yaml
 from rez.utils.yaml import dump_yaml
 from tempfile import mkdtemp
+from hashlib import sha1
 import getpass
+import dis
+import marshal
 import traceback
 import inspect
 import time
@@ -107,8 +113,26 @@ class ResolvedContext(object):
     shell.
     """
     serialize_version = (4, 1)
+
+    # header identifying a context file in the binary format
+    binary_header = "REZ_RXT_BINARY:1\n"
     tmpdir_manager = TempDirs(config.context_tmpdir, prefix="rez_context_")
 
+    # recorded package commands, see `_execute_commands`
+    _recorded_commands = {}
+    _replayable_calls = frozenset(x[0] for x in Action.get_command_types())
+    _recordable_names = _replayable_calls | frozenset(
+        ["env", "this", "version", "root", "base", "literal", "expandable",
+         "True", "False", "None", "str", "int", "len", "list", "tuple", "dict",
+         "set", "range", "enumerate", "zip", "sorted", "reversed", "isinstance",
+         "basestring"])
+    _unrecordable_ops = frozenset(
+        dis.opmap[x] for x in ("IMPORT_NAME", "IMPORT_FROM", "IMPORT_STAR",
+                               "EXEC_STMT", "EXTENDED_ARG"))
+    _global_name_ops = frozenset(
+        dis.opmap[x] for x in ("LOAD_NAME", "LOAD_GLOBAL", "DELETE_NAME",
+                               "DELETE_GLOBAL", "STORE_GLOBAL"))
+
     class Callback(object):
         def __init__(self, max_fails, time_limit, callback, buf=None):
             self.max_fails = max_fails
@@ -134,7 +158,7 @@ class ResolvedContext(object):
                  building=False, caching=None, package_paths=None,
                  package_filter=None, add_implicit_packages=True, max_fails=-1,
                  time_limit=-1, callback=None, package_load_callback=None,
-                 buf=None):
+                 buf=None, seed_context=None):
         """Perform a package resolve, and store the result.
 
         Args:
@@ -164,6 +188,10 @@ class ResolvedContext(object):
                 `Package` object.
             buf (file-like object): Where to print verbose output to, defaults
                 to stdout.
+            seed_context (`ResolvedContext`): A previous resolve. Its resolved
+                variants are preferred wherever they are still possible, so
+                that changing a request on top of an existing context is fast,
+                and leaves unaffected packages as they were. See `Solver`.
         """
         self.load_path = None
 
@@ -215,6 +243,7 @@ class ResolvedContext(object):
         self.from_cache = None
         self.solve_time = 0.0  # inclusive of load time
         self.load_time = 0.0
+        self.resolve_stats = None
 
         # suite information
         self.parent_suite_path = None
@@ -228,6 +257,10 @@ class ResolvedContext(object):
 
         request = self.requested_packages(include_implicit=True)
 
+        seed_variants = None
+        if seed_context is not None and seed_context.success:
+            seed_variants = seed_context.resolved_packages
+
         resolver = Resolver(package_requests=request,
                             package_paths=self.package_paths,
                             package_filter=self.package_filter,
@@ -237,8 +270,13 @@ class ResolvedContext(object):
                             callback=callback_,
                             package_load_callback=package_load_callback,
                             verbosity=verbosity,
+                            seed_variants=seed_variants,
                             buf=buf)
-        resolver.solve()
+
+        stats_ = stats.to_dict()
+        with stats.timer("resolve"):
+            resolver.solve()
+        self.resolve_stats = stats.diff(stats_)
 
         # convert the results
         self.status_ = resolver.status
@@ -299,6 +337,22 @@ class ResolvedContext(object):
         """
         return self._resolved_packages
 
+    @property
+    def _resolved_packages(self):
+        # variants of a loaded context are only created on first access, so
+        # that tools which only need the request, or the graph, don't pay for
+        # the package loads.
+        if self._resolved_package_handles is not None:
+            handles = self._resolved_package_handles
+            self._resolved_packages_ = [get_variant(x) for x in handles]
+            self._resolved_package_handles = None
+        return self._resolved_packages_
+
+    @_resolved_packages.setter
+    def _resolved_packages(self, value):
+        self._resolved_packages_ = value
+        self._resolved_package_handles = None
+
     def set_load_path(self, path):
         """Set the path that this context was reportedly loaded from.
 
@@ -472,21 +526,42 @@ class ResolvedContext(object):
 
         return self.graph_
 
-    def save(self, path):
-        """Save the resolved context to file."""
-        with open(path, 'w') as f:
-            self.write_to_buffer(f)
+    def save(self, path, binary=None):
+        """Save the resolved context to file.
+
+        Args:
+            path (str): File to write to.
+            binary (bool): If True, write the context in binary format, which
+                is much faster to load than yaml. If None, the format is
+                determined by the 'context_binary_format' config setting.
+        """
+        with open(path, 'wb') as f:
+            self.write_to_buffer(f, binary=binary)
+
+    def write_to_buffer(self, buf, binary=None):
+        """Save the context to a buffer.
+
+        Args:
+            buf (file-like object): Buffer to write to.
+            binary (bool): See `save`.
+        """
+        if binary is None:
+            binary = config.context_binary_format
 
-    def write_to_buffer(self, buf):
-        """Save the context to a buffer."""
         doc = self.to_dict()
-        content = dump_yaml(doc)
+        if binary:
+            content = self.binary_header + marshal.dumps(doc, 2)
+        else:
+            content = dump_yaml(doc)
         buf.write(content)
 
     @classmethod
     def load(cls, path):
-        """Load a resolved context from file."""
-        with open(path) as f:
+        """Load a resolved context from file.
+
+        Both yaml and binary context files are supported.
+        """
+        with open(path, 'rb') as f:
             context = cls.read_from_buffer(f, path)
         context.set_load_path(path)
         return context
@@ -585,6 +660,34 @@ class ResolvedContext(object):
             d["removed_packages"] = removed_packages
         return d
 
+    def get_stats(self):
+        """Get timing and counter statistics.
+
+        Returns:
+            dict: Containing:
+            - 'resolve': Stats accumulated while this context was resolved, or
+              None if the context was loaded from file;
+            - 'process': Stats accumulated over the life of the current
+              process. This includes config and plugin loading, and the
+              execution of contexts.
+
+            See `Stats.to_dict` in `rez.utils.stats` for the format of each.
+        """
+        return dict(resolve=self.resolve_stats,
+                    process=stats.to_dict())
+
+    def print_stats(self, buf=sys.stdout):
+        """Prints the statistics returned from `get_stats`."""
+        _pr = Printer(buf)
+        stats_ = self.get_stats()
+
+        for name in ("resolve", "process"):
+            if stats_[name] is not None:
+                _pr("%s stats:" % name, heading)
+                for line in format_stats(stats_[name]):
+                    _pr(line)
+                _pr()
+
     @pool_memcached_connections
     def print_info(self, buf=sys.stdout, verbosity=0, source_order=False,
                    show_resolved_uris=False):
@@ -976,6 +1079,101 @@ class ResolvedContext(object):
         self._execute(executor)
         return executor.actions
 
+    @_on_success
+    def get_baked_environ_data(self):
+        """Record the environment changes made by this context.
+
+        This runs the package commands once, and records the resulting
+        actions, so that they can be reapplied later (see `get_baked_environ`)
+        without running the commands again. This is used by suites, so that
+        tools can be run without the cost of interpreting the context and
+        spawning a shell.
+
+        Note:
+            Commands are run within the current environment. A baked
+            environment will not be correct for packages whose commands
+            behave differently depending on the parent environment.
+
+        Returns:
+            dict: Baked environment data, or None if the context cannot be
+            baked, because its packages source scripts, run commands or
+            define aliases (these require a shell).
+        """
+        # treat all variables as parent variables, so that appends/prepends
+        # are recorded as such, rather than as a setenv on first reference.
+        # The real parent variables are applied when the actions are replayed.
+        interp = Python(target_environ={}, passive=True)
+        executor = RexExecutor(interpreter=interp, parent_variables=True)
+        self._execute(executor)
+
+        def _arg(value):
+            if isinstance(value, EscapedString):
+                return ('e', value.strings)
+            else:
+                return ('v', value)
+
+        actions = []
+        for action in executor.actions:
+            if isinstance(action, (Command, Source, Alias)):
+                return None
+            elif not isinstance(action, (Comment, Shebang)):
+                actions.append((action.name, [_arg(x) for x in action.args]))
+
+        parent_vars = True if config.all_parent_variables \
+            else list(config.parent_variables)
+
+        return dict(rez_version=__version__,
+                    parent_variables=parent_vars,
+                    variant_states=self._get_variant_state_reprs(),
+                    actions=actions)
+
+    @_on_success
+    def get_baked_environ(self, data, parent_environ=None):
+        """Get the environ dict resulting from replaying a baked environment.
+
+        Args:
+            data (dict): Data returned from `get_baked_environ_data`.
+            parent_environ (dict): Environment to apply the changes to,
+                defaults to os.environ if None.
+
+        Returns:
+            dict: The complete environment (ie, including variables from
+            `parent_environ`), or None if the baked data is out of date - that
+            is, any resolved package has changed since the data was created.
+        """
+        if data.get("rez_version") != __version__ \
+                or data.get("variant_states") != self._get_variant_state_reprs():
+            return None
+
+        if parent_environ is None:
+            parent_environ = os.environ
+
+        def _arg(value):
+            type_, value_ = value
+            if type_ == 'e':
+                value_ = EscapedString.__new__(EscapedString)
+                value_.strings = [tuple(x) for x in value[1]]
+            return value_
+
+        interp = Python(target_environ={})
+        manager = ActionManager(interp,
+                                parent_environ=parent_environ,
+                                parent_variables=data["parent_variables"])
+        interp.set_manager(manager)
+
+        unset_keys = set()
+        for name, args in data["actions"]:
+            args = [_arg(x) for x in args]
+            getattr(manager, name)(*args)
+            if name == Unsetenv.name:
+                unset_keys.add(str(args[0]))
+
+        environ = dict(parent_environ)
+        for key in unset_keys:
+            environ.pop(key, None)
+        environ.update(manager.environ)
+        return environ
+
     @_on_success
     def apply(self, parent_environ=None):
         """Apply the context to the current python session.
@@ -1163,16 +1361,17 @@ class ResolvedContext(object):
                           == RezToolsVisibility.never)
 
         # spawn the shell subprocess
-        p = sh.spawn_shell(context_file,
-                           tmpdir,
-                           rcfile=rcfile,
-                           norc=norc,
-                           stdin=stdin,
-                           command=command,
-                           env=parent_environ,
-                           quiet=quiet,
-                           pre_command=pre_command,
-                           **Popen_args)
+        with stats.timer("shell.spawn"):
+            p = sh.spawn_shell(context_file,
+                               tmpdir,
+                               rcfile=rcfile,
+                               norc=norc,
+                               stdin=stdin,
+                               command=command,
+                               env=parent_environ,
+                               quiet=quiet,
+                               pre_command=pre_command,
+                               **Popen_args)
         if block:
             stdout, stderr = p.communicate()
             return p.returncode, stdout, stderr
@@ -1180,9 +1379,12 @@ class ResolvedContext(object):
             return p
 
     def to_dict(self):
-        resolved_packages = []
-        for pkg in (self._resolved_packages or []):
-            resolved_packages.append(pkg.handle.to_dict())
+        if self._resolved_package_handles is not None:
+            resolved_packages = list(self._resolved_package_handles)
+        else:
+            resolved_packages = []
+            for pkg in (self._resolved_packages or []):
+                resolved_packages.append(pkg.handle.to_dict())
 
         serialize_version = '.'.join(str(x) for x in ResolvedContext.serialize_version)
         patch_locks = dict((k, v.name) for k, v in self.patch_locks)
@@ -1279,8 +1481,11 @@ class ResolvedContext(object):
 
         r.graph_string = d["graph"]
         r.graph_ = None
+        r.resolve_stats = None
 
-        r._resolved_packages = []
+        # variants are loaded lazily, see `_resolved_packages`
+        r._resolved_packages_ = None
+        r._resolved_package_handles = []
         for d_ in d["resolved_packages"]:
             variant_handle = d_
             if load_ver < (4, 0):
@@ -1288,8 +1493,7 @@ class ResolvedContext(object):
                 from rez.utils.backcompat import convert_old_variant_handle
                 variant_handle = convert_old_variant_handle(variant_handle)
 
-            variant = get_variant(variant_handle)
-            r._resolved_packages.append(variant)
+            r._resolved_package_handles.append(variant_handle)
 
         # -- SINCE SERIALIZE VERSION 1
 
@@ -1320,7 +1524,10 @@ class ResolvedContext(object):
     @classmethod
     def _read_from_buffer(cls, buf, identifier_str=None):
         content = buf.read()
-        doc = yaml.load(content)
+        if content.startswith(cls.binary_header):
+            doc = marshal.loads(content[len(cls.binary_header):])
+        else:
+            doc = yaml.load(content)
         context = cls.from_dict(doc, identifier_str)
         return context
 
@@ -1336,6 +1543,10 @@ class ResolvedContext(object):
         self.parent_suite_path = suite_path
         self.suite_context_name = context_name
 
+    def _get_variant_state_reprs(self):
+        variant_states = Resolver._get_variant_states(self.resolved_packages)
+        return [repr(x[1]) for x in variant_states]
+
     def _create_executor(self, interpreter, parent_environ):
         parent_vars = True if config.all_parent_variables \
             else config.parent_variables
@@ -1345,6 +1556,7 @@ class ResolvedContext(object):
                            parent_variables=parent_vars)
 
     @pool_memcached_connections
+    @stats.timed("rex.execute")
     def _execute(self, executor):
         br = '#' * 80
         br_minor = '-' * 80
@@ -1444,18 +1656,11 @@ class ResolvedContext(object):
                 exc = None
                 trace = None
                 try:
-                    executor.execute_code(commands.source, filename=filename)
+                    self._execute_commands(executor, pkg, attr, commands,
+                                           filename)
                 except IndentationError as e:
-                    commands_ = commands.corrected_for_indent()
-                    if commands_ is commands:
-                        exc = e
-                        trace = traceback.format_exc()
-                    else:
-                        try:
-                            executor.execute_code(commands_.source, filename=filename)
-                        except error_class as e:
-                            exc = e
-                            trace = traceback.format_exc()
+                    exc = e
+                    trace = traceback.format_exc()
                 except error_class as e:
                     exc = e
                     trace = traceback.format_exc()
@@ -1484,6 +1689,119 @@ class ResolvedContext(object):
         elif mode == RezToolsVisibility.prepend:
             executor.prepend_rez_path()
 
+    def _execute_commands(self, executor, pkg, attr, commands, filename):
+        if not config.cache_rex_commands:
+            self._run_commands(executor, commands, filename)
+            return
+
+        key = self._commands_cache_key(pkg, attr, commands)
+        calls = self._recorded_commands.get(key)
+        local_cache = None
+
+        if calls is None and config.local_package_file_cache:
+            max_size = config.local_package_file_cache_max_size * 1024 * 1024
+            local_cache = LocalCache(config.local_package_file_cache_path,
+                                     max_size=max_size)
+            entry = local_cache.get(key)
+            if entry is not local_cache.miss \
+                    and self._calls_are_replayable(entry):
+                local_cache = None  # already cached, don't store again
+                calls = entry
+                self._recorded_commands[key] = calls
+
+        if calls is not None:
+            executor.manager.replay(calls)
+            return
+
+        # run the commands, recording the calls they make
+        manager = executor.manager
+        global_names = set(executor.globals.iterkeys())
+        manager.recorded_calls = []
+        manager.environ_accessed = False
+        try:
+            source = self._run_commands(executor, commands, filename)
+            calls = manager.recorded_calls
+        finally:
+            manager.recorded_calls = None
+
+        # commands that define globals (which later commands could use) are
+        # not recorded. Note that exec adds '__builtins__' to globals.
+        new_names = set(executor.globals.iterkeys()) - global_names
+        new_names.discard("__builtins__")
+
+        pyc = RexExecutor.compile_code(source, filename=filename)
+        if manager.environ_accessed or new_names \
+                or not self._commands_are_recordable(pyc):
+            calls = None
+        else:
+            self._recorded_commands[key] = calls
+
+        if local_cache is not None and calls is not None \
+                and self._calls_are_replayable(calls):
+            local_cache.set(key, calls)
+
+    @classmethod
+    def _run_commands(cls, executor, commands, filename):
+        # returns the source that was run
+        try:
+            executor.execute_code(commands.source, filename=filename)
+        except IndentationError:
+            commands_ = commands.corrected_for_indent()
+            if commands_ is commands:
+                raise
+            executor.execute_code(commands_.source, filename=filename)
+            return commands_.source
+        return commands.source
+
+    @classmethod
+    def _commands_cache_key(cls, pkg, attr, commands):
+        repo = pkg.resource._repository
+        state_handle = repo.get_variant_state_handle(pkg.resource)
+        digest = sha1(commands.source).hexdigest()
+        return str(("rex_commands", pkg.uri, repr(state_handle), attr, digest,
+                    sys.version))
+
+    @classmethod
+    def _commands_are_recordable(cls, pyc):
+        # Only commands whose global names are all in `_recordable_names` are
+        # recorded - anything else (such as 'resolve', 'building', 'system',
+        # 'getenv' or a builtin such as 'open') may make their actions differ
+        # between contexts. Commands that import or exec are never recorded.
+        codes = [pyc]
+        while codes:
+            code = codes.pop()
+            co_code = code.co_code
+            i = 0
+            while i < len(co_code):
+                op = ord(co_code[i])
+                if op in cls._unrecordable_ops:
+                    return False
+                if op < dis.HAVE_ARGUMENT:
+                    i += 1
+                    continue
+                if op in cls._global_name_ops:
+                    arg = ord(co_code[i + 1]) + ord(co_code[i + 2]) * 256
+                    if code.co_names[arg] not in cls._recordable_names:
+                        return False
+                i += 3
+            codes.extend(x for x in code.co_consts if inspect.iscode(x))
+        return True
+
+    @classmethod
+    def _calls_are_replayable(cls, calls):
+        # recorded calls must be rex actions, with plain data arguments
+        def _pod(value):
+            if isinstance(value, (list, tuple)):
+                return all(_pod(x) for x in value)
+            return value is None or isinstance(value, (basestring, EscapedString))
+
+        try:
+            return all((name in cls._replayable_calls and _pod(nargs)
+                        and isinstance(kwargs, dict) and _pod(kwargs.values()))
+                       for name, nargs, kwargs in calls)
+        except (TypeError, ValueError):
+            return False
+
     def _append_suite_paths(self, executor):
         from rez.suite import Suite
 
@@ -1,10 +1,15 @@
 from rez.solver import Solver, SolverStatus, PackageVariantCache
 from rez.package_repository import package_repository_manager
-from rez.packages_ import get_variant, get_last_release_time
+from rez.packages_ import get_variant, get_last_release_times
 from rez.package_filter import PackageFilterList, TimestampRule
 from rez.utils.memcached import memcached_client, pool_memcached_connections
+from rez.utils.local_cache import LocalCache
+from rez.utils.stats import stats
+from rez.utils import wire_format
 from rez.config import config
+from rez.exceptions import ConfigurationError
 from rez.vendor.enum import Enum
+from rez.vendor.pygraph.classes.digraph import digraph
 from contextlib import contextmanager
 import os
 
@@ -23,6 +28,56 @@ class ResolverStatus(Enum):
         self.description = description
 
 
+def _digraph_from_state(state):
+    g = digraph.__new__(digraph)
+    g.__dict__.update(state)
+    return g
+
+
+# so that cached resolves are stored without pickling
+wire_format.register_type(ResolverStatus, "ResolverStatus",
+                          to_state=lambda x: x.name,
+                          from_state=lambda x: ResolverStatus[x])
+wire_format.register_type(digraph, "digraph",
+                          to_state=lambda x: x.__dict__,
+                          from_state=_digraph_from_state)
+
+
+@contextmanager
+def _memcached_resolve_cache():
+    with memcached_client(config.memcached_uri,
+                          debug=config.debug_memcache) as client:
+        yield client
+
+
+@contextmanager
+def _local_resolve_cache():
+    yield LocalCache(config.resolve_cache_path,
+                     max_size=config.resolve_cache_max_size * 1024 * 1024)
+
+
+# {name: callable}. See `register_resolve_cache_backend`.
+resolve_cache_backends = {
+    "memcached": _memcached_resolve_cache,
+    "local": _local_resolve_cache
+}
+
+
+def register_resolve_cache_backend(name, func):
+    """Register a resolve cache backend.
+
+    The backend is selected with the 'resolve_cache_backend' config setting.
+
+    Args:
+        name (str): Name of the backend.
+        func (callable): Called with no arguments, this returns a context
+            manager that yields a cache client. The client must provide the
+            `get`, `get_multi`, `set` and `delete` methods of the memcached
+            `Client`, and evaluate to False if the backend is not configured.
+    """
+    resolve_cache_backends[name] = func
+
+
 class Resolver(object):
     """The package resolver.
 
@@ -31,7 +86,8 @@ class Resolver(object):
     """
     def __init__(self, package_requests, package_paths, package_filter=None,
                  timestamp=0, callback=None, building=False, verbosity=False,
-                 buf=None, package_load_callback=None, caching=True):
+                 buf=None, package_load_callback=None, caching=True,
+                 seed_variants=None):
         """Create a Resolver.
 
         Args:
@@ -46,6 +102,8 @@ class Resolver(object):
             building: True if we're resolving for a build.
             caching: If True, cache(s) may be used to speed the resolve. If
                 False, caches will not be used.
+            seed_variants (list of `Variant`): Variants of a previous resolve,
+                see `Solver`.
         """
         self.package_requests = package_requests
         self.package_paths = package_paths
@@ -55,6 +113,7 @@ class Resolver(object):
         self.building = building
         self.verbosity = verbosity
         self.caching = caching
+        self.seed_variants = seed_variants
         self.buf = buf
 
         # store hash of pre-timestamp-combined package filter. This is used in
@@ -81,6 +140,7 @@ class Resolver(object):
         self.graph_ = None
         self.from_cache = False
         self.memcached_servers = config.memcached_uri if config.resolve_caching else None
+        self.cache_backend = config.resolve_cache_backend if config.resolve_caching else None
 
         self.solve_time = 0.0  # time spent solving
         self.load_time = 0.0   # time spent loading package resources
@@ -91,12 +151,17 @@ class Resolver(object):
     def solve(self):
         """Perform the solve.
         """
-        solver_dict = self._get_cached_solve()
+        with stats.timer("resolve_cache.get"):
+            solver_dict = self._get_cached_solve()
+
         if solver_dict:
             self.from_cache = True
+            stats.incr("resolve_cache.hits")
             self._set_result(solver_dict)
         else:
             self.from_cache = False
+            if self._cache_enabled():
+                stats.incr("resolve_cache.misses")
             solver = self._solve()
             solver_dict = self._solver_to_dict(solver)
             self._set_result(solver_dict)
@@ -173,7 +238,7 @@ class Resolver(object):
         consider a workflow where a work area is tied down to a particular
         timestamp in order to 'lock' it from any further software releases).
         """
-        if not (self.caching and self.memcached_servers):
+        if not (self.caching and self._cache_enabled()):
             return None
 
         def _hit(data):
@@ -185,25 +250,40 @@ class Resolver(object):
             return None
 
         def _delete_cache_entry(key):
-            with self._memcached_client() as client:
+            with self._cache_client() as client:
                 client.delete(key)
             self._print("Discarded entry: %r", key)
 
+        # both entries are fetched in one round trip, if there is a timestamp
+        keys = [self._memcache_key(timestamped=False)]
+        if self.timestamp:
+            keys.append(self._memcache_key(timestamped=True))
+
+        self._print("Retrieving memcache keys: %r", keys)
+        with self._cache_client() as client:
+            entries = client.get_multi(keys)
+
         def _retrieve(timestamped):
-            key = self._memcache_key(timestamped=timestamped)
-            self._print("Retrieving memcache key: %r", key)
-            with self._memcached_client() as client:
-                data = client.get(key)
-            return key, data
+            key = keys[1] if timestamped else keys[0]
+            return key, entries.get(key)
+
+        # release times are fetched in bulk, and shared between entries
+        release_times = {}
+
+        def _get_release_times(release_times_dict):
+            names = [x for x in release_times_dict if x not in release_times]
+            if names:
+                release_times.update(
+                    get_last_release_times(names, self.package_paths))
+            return release_times
 
         def _packages_changed(key, data):
             solver_dict, _, variant_states_dict = data
-            for variant_handle in solver_dict.get("variant_handles", []):
-                variant = get_variant(variant_handle)
-                old_state = variant_states_dict.get(variant.name)
-                repo = variant.resource._repository
-                new_state = repo.get_variant_state_handle(variant.resource)
+            variants = [get_variant(x)
+                        for x in solver_dict.get("variant_handles", [])]
 
+            for variant, new_state in self._get_variant_states(variants):
+                old_state = variant_states_dict.get(variant.name)
                 if old_state != new_state:
                     self._print("%r has been modified", variant.qualified_name)
                     return True
@@ -211,8 +291,10 @@ class Resolver(object):
 
         def _releases_since_solve(key, data):
             _, release_times_dict, _ = data
+            times = _get_release_times(release_times_dict)
+
             for package_name, release_time in release_times_dict.iteritems():
-                time_ = get_last_release_time(package_name, self.package_paths)
+                time_ = times[package_name]
                 if time_ != release_time:
                     self._print(
                         "A newer version of %r (%d) has been released since the "
@@ -263,11 +345,20 @@ class Resolver(object):
                 return _hit(data)
 
     @contextmanager
-    def _memcached_client(self):
-        with memcached_client(self.memcached_servers,
-                              debug=config.debug_memcache) as client:
+    def _cache_client(self):
+        func = resolve_cache_backends.get(self.cache_backend)
+        if func is None:
+            raise ConfigurationError("Unknown resolve cache backend: %r"
+                                     % self.cache_backend)
+        with func() as client:
             yield client
 
+    def _cache_enabled(self):
+        if not self.cache_backend:
+            return False
+        with self._cache_client() as client:
+            return bool(client)
+
     def _set_cached_solve(self, solver_dict):
         """Store a solve to memcached.
 
@@ -283,38 +374,75 @@ class Resolver(object):
         if self.status_ != ResolverStatus.solved:
             return  # don't cache failed solves
 
-        if not (self.caching and self.memcached_servers):
+        if not (self.caching and self._cache_enabled()):
             return
 
+        entry = self._get_cache_entry(solver_dict)
+        if entry is None:
+            return
+
+        key, data = entry
+        with self._cache_client() as client:
+            client.set(key, data)
+        self._print("Sent memcache key: %r", key)
+
+    def _get_cache_entry(self, solver_dict):
+        """Get the cache entry of a solve.
+
+        Returns:
+            2-tuple: Key and data of the entry, or None if the solve cannot
+            be cached.
+        """
         # most recent release times get stored with solve result in the cache
         releases_since_solve = False
         release_times_dict = {}
         variant_states_dict = {}
 
-        for variant in self.resolved_packages_:
-            time_ = get_last_release_time(variant.name, self.package_paths)
+        times = get_last_release_times((x.name for x in self.resolved_packages_),
+                                       self.package_paths)
+        variant_states = self._get_variant_states(self.resolved_packages_)
+
+        for variant, state in variant_states:
+            time_ = times[variant.name]
 
             # don't cache if a release time isn't known
             if time_ == 0:
                 self._print("Did not send memcache key: a repository could "
                             "not provide a most recent release time for %r",
                             variant.name)
-                return
+                return None
 
             if self.timestamp and self.timestamp < time_:
                 releases_since_solve = True
 
             release_times_dict[variant.name] = time_
-            repo = variant.resource._repository
-            variant_states_dict[variant.name] = \
-                repo.get_variant_state_handle(variant.resource)
+            variant_states_dict[variant.name] = state
 
         timestamped = (self.timestamp and releases_since_solve)
         key = self._memcache_key(timestamped=timestamped)
         data = (solver_dict, release_times_dict, variant_states_dict)
-        with self._memcached_client() as client:
-            client.set(key, data)
-        self._print("Sent memcache key: %r", key)
+        return key, data
+
+    @classmethod
+    def _get_variant_states(cls, variants):
+        """Get the state handles of variants, in bulk per repository.
+
+        Returns:
+            List of (`Variant`, state handle) tuples, in the order given.
+        """
+        repo_variants = {}
+        for variant in variants:
+            repo = variant.resource._repository
+            repo_variants.setdefault(repo, []).append(variant)
+
+        states = {}
+        for repo, variants_ in repo_variants.iteritems():
+            handles = repo.get_variant_state_handles(
+                [x.resource for x in variants_])
+            for variant, handle in zip(variants_, handles):
+                states[id(variant)] = handle
+
+        return [(x, states[id(x)]) for x in variants]
 
     def _memcache_key(self, timestamped=False):
         """Makes a key suitable as a memcache entry."""
@@ -331,6 +459,11 @@ class Resolver(object):
              self.building,
              config.prune_failed_graph]
 
+        # a seeded resolve can differ from an unseeded one
+        if self.seed_variants:
+            t.append(tuple(sorted(x.qualified_name
+                                  for x in self.seed_variants)))
+
         if timestamped and self.timestamp:
             t.append(self.timestamp)
 
@@ -345,6 +478,7 @@ class Resolver(object):
                         building=self.building,
                         verbosity=self.verbosity,
                         prune_unfailed=config.prune_failed_graph,
+                        seed_variants=self.seed_variants,
                         buf=self.buf)
         solver.solve()
 
@@ -182,6 +182,11 @@ class ActionManager(object):
         self.formatter = formatter or str
         self.actions = []
 
+        # set to a list to record calls to the action methods, see `replay`
+        self.recorded_calls = None
+        # set when the environment is read, such as with `getenv`
+        self.environ_accessed = False
+
         self._env_sep_map = env_sep_map if env_sep_map is not None \
             else config.env_var_separators
 
@@ -206,6 +211,19 @@ class ActionManager(object):
     def _env_sep(self, name):
         return self._env_sep_map.get(name, os.pathsep)
 
+    def _record(self, name, *nargs, **kwargs):
+        if self.recorded_calls is not None:
+            self.recorded_calls.append((name, nargs, kwargs))
+
+    def replay(self, calls):
+        """Replay calls recorded with `recorded_calls`.
+
+        Args:
+            calls (list): Recorded calls.
+        """
+        for name, nargs, kwargs in calls:
+            getattr(self, name)(*nargs, **kwargs)
+
     def _is_verbose(self, command):
         if isinstance(self.verbose, (list, tuple)):
             return command in self.verbose
@@ -242,6 +260,7 @@ class ActionManager(object):
     # -- Commands
 
     def undefined(self, key):
+        self.environ_accessed = True
         _, expanded_key = self._key(key)
         return (expanded_key not in self.environ
                 and expanded_key not in self.parent_environ)
@@ -250,6 +269,7 @@ class ActionManager(object):
         return not self.undefined(key)
 
     def getenv(self, key):
+        self.environ_accessed = True
         _, expanded_key = self._key(key)
         try:
             return self.environ[expanded_key] if expanded_key in self.environ \
@@ -259,6 +279,7 @@ class ActionManager(object):
                 "Referenced undefined environment variable: %s" % expanded_key)
 
     def setenv(self, key, value):
+        self._record("setenv", key, value)
         unexpanded_key, expanded_key = self._key(key)
         unexpanded_value, expanded_value = self._value(value)
 
@@ -273,6 +294,7 @@ class ActionManager(object):
         self.interpreter.setenv(key, value)
 
     def unsetenv(self, key):
+        self._record("unsetenv", key)
         unexpanded_key, expanded_key = self._key(key)
         self.actions.append(Unsetenv(unexpanded_key))
 
@@ -285,6 +307,7 @@ class ActionManager(object):
         self.interpreter.unsetenv(key)
 
     def resetenv(self, key, value, friends=None):
+        self._record("resetenv", key, value, friends=friends)
         unexpanded_key, expanded_key = self._key(key)
         unexpanded_value, expanded_value = self._value(value)
 
@@ -353,40 +376,48 @@ class ActionManager(object):
             self.interpreter.setenv(key, value)
 
     def prependenv(self, key, value):
+        self._record("prependenv", key, value)
         self._pendenv(key, value, Prependenv, self.interpreter.prependenv,
                       lambda x, y: [x] + y)
 
     def appendenv(self, key, value):
+        self._record("appendenv", key, value)
         self._pendenv(key, value, Appendenv, self.interpreter.appendenv,
                       lambda x, y: y + [x])
 
     def alias(self, key, value):
+        self._record("alias", key, value)
         key = str(self._format(key))
         value = str(self._format(value))
         self.actions.append(Alias(key, value))
         self.interpreter.alias(key, value)
 
     def info(self, value=''):
+        self._record("info", value)
         value = self._format(value)
         self.actions.append(Info(value))
         self.interpreter.info(value)
 
     def error(self, value):
+        self._record("error", value)
         value = self._format(value)
         self.actions.append(Error(value))
         self.interpreter.error(value)
 
     def command(self, value):
+        self._record("command", value)
         # Note: Value is deliberately not formatted in commands
         self.actions.append(Command(value))
         self.interpreter.command(value)
 
     def comment(self, value):
+        self._record("comment", value)
         value = str(self._format(value))
         self.actions.append(Comment(value))
         self.interpreter.comment(value)
 
     def source(self, value):
+        self._record("source", value)
         value = str(self._format(value))
         self.actions.append(Source(value))
         self.interpreter.source(value)
@@ -907,6 +938,7 @@ class EnvironmentDict(UserDict.DictMixin):
                                for k in manager.parent_environ.iterkeys())
 
     def keys(self):
+        self.manager.environ_accessed = True
         return self._var_cache.keys()
 
     def __repr__(self):
@@ -921,6 +953,7 @@ class EnvironmentDict(UserDict.DictMixin):
         self[key].set(value)
 
     def __contains__(self, key):
+        self.manager.environ_accessed = True
         return (key in self._var_cache)
 
 
@@ -1087,6 +1120,9 @@ class RexExecutor(object):
         if system.rez_bin_path:
             self.env.PATH.append(system.rez_bin_path)
 
+    # compiled code objects, keyed on (code, filename)
+    compiled_code = {}
+
     @classmethod
     def compile_code(cls, code, filename=None, exec_namespace=None):
         """Compile and possibly execute rex code.
@@ -1105,8 +1141,29 @@ class RexExecutor(object):
         error_class = Exception if config.catch_rex_errors else None
 
         # compile
+        pyc = cls.compiled_code.get((code, filename))
+        if pyc is None:
+            pyc = cls._compile(code, filename, error_class)
+            if config.cache_rex_commands:
+                cls.compiled_code[(code, filename)] = pyc
+
+        # execute
+        if exec_namespace is not None:
+            try:
+                exec pyc in exec_namespace
+            except error_class as e:
+                # trim trace down to only what's interesting
+                import traceback
+                frames = traceback.extract_tb(sys.exc_traceback)
+                frames = [x for x in frames if x[0] == filename]
+                cls._patch_frames(frames, code, filename)
+                cls._raise_rex_error(frames, e)
+        return pyc
+
+    @classmethod
+    def _compile(cls, code, filename, error_class):
         try:
-            pyc = compile(code, filename, 'exec')
+            return compile(code, filename, 'exec')
         except error_class as e:
             # trim trace down to only what's interesting
             msg = str(e)
@@ -1122,19 +1179,6 @@ class RexExecutor(object):
                     pass
             raise RexError(msg)
 
-        # execute
-        if exec_namespace is not None:
-            try:
-                exec pyc in exec_namespace
-            except error_class as e:
-                # trim trace down to only what's interesting
-                import traceback
-                frames = traceback.extract_tb(sys.exc_traceback)
-                frames = [x for x in frames if x[0] == filename]
-                cls._patch_frames(frames, code, filename)
-                cls._raise_rex_error(frames, e)
-        return pyc
-
     def execute_code(self, code, filename=None):
         """Execute code within the execution context.
 
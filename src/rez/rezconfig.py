@@ -25,6 +25,15 @@ expansions are supported:
 The following variables are provided if you are using rezconfig.py files:
 - 'rez_version': The current version of rez.
 
+To speed up startup, a snapshot of the loaded and validated settings is kept in
+a per-user directory in the system temp dir (or in $REZ_CONFIG_SNAPSHOT_DIR, if
+set). The snapshot is discarded whenever a config file, a $REZ_XXX override, or
+an environment variable referenced by either, changes. Settings that expand a
+system attribute (such as "{system.platform}") are never kept in the snapshot.
+Settings in rezconfig.py files may be computed from anything, so no
+snapshot is kept if any config file other than this one is a rezconfig.py. Set
+$REZ_CONFIG_SNAPSHOT_DIR to an empty string to disable snapshots altogether.
+
 Paths should use the path separator appropriate for the operating system
 (based on Python's os.path.sep).  So for Linux paths, / should be used. On
 Windows \ (unescaped) should be used.
@@ -86,6 +95,36 @@ resolve_caching = True
 # Cache package file reads
 cache_package_files = True
 
+# Cache evaluated package definition files (such as package.py) on local disk,
+# so that each rez process does not need to evaluate them again. Entries are
+# keyed on the file's path and stat, so changes to a file are seen immediately.
+local_package_file_cache = True
+
+# Directory that the local package file cache is stored in. Entries are only
+# read from it if it is owned by the current user, and is not writable by anyone
+# else, so this should not be a shared location.
+local_package_file_cache_path = "~/.rez/cache/package_files"
+
+# Maximum size of the local package file cache, in megabytes. The least recently
+# used entries are discarded beyond this size. Zero means unlimited.
+local_package_file_cache_max_size = 200
+
+# Cache package commands. Commands are compiled once per process, and the
+# actions made by some commands are recorded, so that repeated activations of a
+# context replay them rather than running the commands again. Commands are only
+# recorded if they:
+# - only refer to the rex actions (setenv, appendenv, alias, info and so on),
+#   'env', 'this', 'version', 'root', 'base', 'literal', 'expandable', and the
+#   builtins True, False, None, str, int, len, list, tuple, dict, set, range,
+#   enumerate, zip, sorted, reversed, isinstance and basestring;
+# - do not import anything, or use exec;
+# - do not read the environment (with getenv, env.FOO.value() and so on);
+# - do not define any globals.
+# Strings given to recorded actions are still expanded when replayed. If the
+# local package file cache is enabled, recorded actions (but never code) are
+# also stored there.
+cache_rex_commands = False
+
 # Cache directory traversals
 cache_listdir = True
 
@@ -115,6 +154,61 @@ memcached_listdir_min_compress_len = 16384
 # means never compress.
 memcached_resolve_min_compress_len = 1
 
+# Number of entries in the in-process cache that is checked before memcached,
+# for cached package files and directory listings. This saves a round trip to
+# the server when a process asks for the same entry more than once. Zero
+# disables the in-process cache.
+memcached_l1_size = 1000
+
+# Seconds after which entries in the in-process memcached cache expire. Zero
+# means never.
+memcached_l1_ttl = 300
+
+# If True, entries are stored to memcached by a background thread, rather than
+# making the caller wait on the server (and on compressing the entry). This
+# keeps cache population off the critical path - for example, a slow resolve is
+# not slowed further by storing its result. Pending entries are flushed when
+# the process exits.
+memcached_write_behind = False
+
+# Maximum number of entries waiting to be stored by the memcached write-behind
+# thread. Beyond this, entries are stored synchronously.
+memcached_write_behind_queue_size = 1000
+
+# Timeout, in seconds, of each memcached connection attempt and operation. A
+# server that does not respond in time is treated as having failed.
+memcached_socket_timeout = 0.5
+
+# Seconds for which a memcached server is skipped after it fails, rather than
+# every cache access waiting on it. The interval doubles with each consecutive
+# failure, up to 'memcached_max_retry_interval' seconds.
+memcached_retry_interval = 30
+memcached_max_retry_interval = 300
+
+# If True, memcached connections are kept open when no longer in use, and
+# reused later in the process. Enable this in long running processes (such as
+# GUIs and daemons), so that each resolve does not reconnect.
+memcached_keep_connections = False
+
+# If True, the hit/miss statistics of each memcached function are added to
+# counters on the memcached server(s) when a rez process exits, and can be
+# viewed with 'rez-memcache --functions'. This costs a round trip to the
+# server(s) on exit, so enable it only while tuning the cache.
+memcached_function_stats = False
+
+# Where resolves are cached, when resolve_caching is enabled. One of:
+# - "memcached": cache resolves on the memcached server(s) in memcached_uri;
+# - "local": cache resolves in the directory resolve_cache_path. Use this on
+#   hosts that do not have access to a memcached server.
+resolve_cache_backend = "memcached"
+
+# Directory that resolves are cached in, when resolve_cache_backend is "local".
+resolve_cache_path = "~/.rez/cache/resolves"
+
+# Maximum size of the local resolve cache, in megabytes. The least recently used
+# resolves are discarded beyond this size. Zero means unlimited.
+resolve_cache_max_size = 100
+
 
 ###############################################################################
 # Package Resolution
@@ -142,6 +236,24 @@ prune_failed_graph = True
 #   packages that are present in the request.
 variant_select_mode = "version_priority"
 
+# If true, the solver records the choices that lead to each failed phase of a
+# solve, and discards later phases that repeat those choices without solving
+# them. This greatly reduces the number of solve steps for requests that have
+# many conflicting combinations of packages, and does not change the result of
+# the solve.
+solver_learn_nogoods = True
+
+# Number of worker processes that the solver uses to speculatively solve
+# alternative phases of a solve, while the current phase is being solved. This
+# can reduce the wall time of large, difficult resolves on machines with spare
+# cores. The result of the solve is the same as that of a serial solve. Zero
+# disables parallel solving. This is only supported on posix platforms.
+# Note that when a worker finds that every phase it solved failed, those failures
+# are reported by the solver as a single failure, so a resolve can go beyond
+# its 'max_fails' limit, and failures other than the first may not be listed
+# individually (such as in 'rez-env --fail-graph' output).
+solver_parallel_workers = 0
+
 # Package filter. One or more filters can be listed, each with a list of
 # exclusion and inclusion rules. These filters are applied to each package
 # during a resolve, and if any filter excludes a package, that package is not
@@ -259,6 +371,13 @@ rez_tools_visibility = "append"
 # scripts (such as .bashrc). If False, package commands are sourced after.
 package_commands_sourced_first = True
 
+# Write context files (aka .rxt files) in a binary format, rather than yaml.
+# Binary contexts are much faster to load, which speeds up tools such as
+# rez-context within a resolved shell, and suite tools. They are not human
+# readable however, and can only be read by the same major version of python
+# - use "rez-context --convert" to convert between the formats.
+context_binary_format = False
+
 
 ###############################################################################
 # Debugging
@@ -360,6 +479,15 @@ release_hooks = []
 # clash with the wrapped tools" own commandline arguments.
 suite_alias_prefix_char = "+"
 
+# Bake the environment of each context when a suite is saved. This lets suite
+# tools run without re-interpreting their context and spawning a shell, which
+# makes them much faster to start. A baked environment is discarded
+# automatically if any package in its context changes. Only enable this if your
+# packages' commands do not depend on the parent environment, since commands
+# are run once, in the environment of the process saving the suite. Contexts
+# whose packages source scripts or run commands are never baked.
+suite_bake_environments = False
+
 
 ###############################################################################
 # Appearance
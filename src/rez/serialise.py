@@ -6,12 +6,15 @@ from rez.utils.data_utils import SourceCode
 from rez.utils.logging_ import print_debug
 from rez.utils.filesystem import TempDirs
 from rez.exceptions import ResourceError
-from rez.utils.memcached import memcached
+from rez.utils.memcached import memcached, DoNotCache
+from rez.utils.local_cache import LocalCache
+from rez.utils.stats import stats
 from rez.config import config
 from rez.vendor.enum import Enum
 from rez.vendor import yaml
 from contextlib import contextmanager
 from inspect import isfunction
+from hashlib import sha1
 from StringIO import StringIO
 import sys
 import os
@@ -24,6 +27,14 @@ tmpdir_manager = TempDirs(config.tmpdir, prefix="rez_write_")
 file_cache = {}
 
 
+# {filepath: ((st_ino, st_mtime, st_size), digest)}, see _get_file_digest
+file_digests = {}
+
+
+# {(path, max_size): LocalCache}, see _get_local_cache
+local_caches = {}
+
+
 class FileFormat(Enum):
     py = ("py",)
     yaml = ("yaml",)
@@ -60,6 +71,7 @@ def open_file_for_write(filepath):
     file_cache[filepath] = cache_filepath
 
 
+@stats.timed("package_file.load")
 def load_from_file(filepath, format_=FileFormat.py, update_data_callback=None):
     """Load data from a file.
 
@@ -84,15 +96,150 @@ def load_from_file(filepath, format_=FileFormat.py, update_data_callback=None):
         return _load_file(filepath=cache_filepath,
                           format_=format_,
                           update_data_callback=update_data_callback)
+    elif config.local_package_file_cache:
+        return _load_from_local_cache(filepath=filepath,
+                                      format_=format_,
+                                      update_data_callback=update_data_callback)
     else:
         return _load_from_file(filepath=filepath,
                                format_=format_,
                                update_data_callback=update_data_callback)
 
 
-def _load_from_file__key(filepath, *nargs, **kwargs):
+@stats.timed("package_file.load_multi")
+def load_from_files(entries, update_data_callback=None):
+    """Load data from several files.
+
+    This is equivalent to calling `load_from_file` on each file, except that
+    files not found in the local cache are fetched from memcached in a single
+    round trip, rather than one per file.
+
+    Args:
+        entries (list of tuple): (filepath, `FileFormat`) for each file.
+        update_data_callback (callable): Used to change data before it is
+            returned or cached.
+
+    Returns:
+        List of dict, in the same order as `entries`.
+    """
+    results = [None] * len(entries)
+    misses = []
+
+    for i, (filepath, format_) in enumerate(entries):
+        filepath = os.path.realpath(filepath)
+        if filepath in file_cache:
+            results[i] = load_from_file(filepath, format_, update_data_callback)
+            continue
+
+        local_entry = None
+        if config.local_package_file_cache:
+            local_entry = _get_local_cache_entry(filepath, format_,
+                                                 update_data_callback)
+            cache, key, _ = local_entry
+            result = cache.get(key)
+            if result is not cache.miss:
+                results[i] = result
+                continue
+
+        misses.append((i, filepath, format_, local_entry))
+
+    loaded = _load_from_file.call_multi(
+        [(x[1], x[2], update_data_callback) for x in misses])
+
+    for (i, filepath, _, local_entry), result in zip(misses, loaded):
+        if local_entry:
+            _set_local_cache_entry(local_entry, filepath, result)
+        results[i] = result
+    return results
+
+
+def _load_from_local_cache(filepath, format_, update_data_callback):
+    local_entry = _get_local_cache_entry(filepath, format_,
+                                         update_data_callback)
+    cache, key, _ = local_entry
+
+    result = cache.get(key)
+    if result is not cache.miss:
+        return result
+
+    result = _load_from_file(filepath=filepath,
+                             format_=format_,
+                             update_data_callback=update_data_callback)
+
+    _set_local_cache_entry(local_entry, filepath, result)
+    return result
+
+
+def _get_local_cache_entry(filepath, format_, update_data_callback):
+    # the local cache is checked before memcached, and is keyed on file stat,
+    # so that a hit does not need to read the file
     st = os.stat(filepath)
-    return str(("package_file", filepath, st.st_ino, st.st_atime, st.st_mtime))
+    callback_name = getattr(update_data_callback, "__name__", None)
+    key = str(("package_file", filepath, st.st_ino, st.st_mtime, st.st_size,
+               format_.extension, callback_name))
+
+    return _get_local_cache(), key, st
+
+
+def _get_local_cache():
+    # one instance is kept per cache directory, rather than one per load
+    path = config.local_package_file_cache_path
+    max_size = config.local_package_file_cache_max_size * 1024 * 1024
+
+    cache = local_caches.get((path, max_size))
+    if cache is None:
+        cache = LocalCache(path, max_size=max_size)
+        local_caches[(path, max_size)] = cache
+    return cache
+
+
+def _set_local_cache_entry(local_entry, filepath, result):
+    cache, key, st = local_entry
+
+    # don't cache if the file changed while it was loaded
+    st_ = os.stat(filepath)
+    if (st_.st_ino, st_.st_mtime, st_.st_size) == \
+            (st.st_ino, st.st_mtime, st.st_size):
+        cache.set(key, result)
+
+
+def _get_file_digest(filepath):
+    """Get a digest of a file's contents.
+
+    Digests are cached, and only recalculated if the file's inode, mtime or size
+    changes. They are also stored in the local package file cache (if enabled),
+    so that a new process only has to stat the file.
+    """
+    st = os.stat(filepath)
+    stat_key = (st.st_ino, st.st_mtime, st.st_size)
+
+    entry = file_digests.get(filepath)
+    if entry and entry[0] == stat_key:
+        return entry[1]
+
+    cache = _get_local_cache() if config.local_package_file_cache else None
+    if cache:
+        key = str(("file_digest", filepath) + stat_key)
+        digest = cache.get(key)
+        if digest is not cache.miss:
+            file_digests[filepath] = (stat_key, digest)
+            return digest
+
+    with open(filepath, "rb") as f:
+        digest = sha1(f.read()).hexdigest()
+
+    file_digests[filepath] = (stat_key, digest)
+    if cache:
+        cache.set(key, digest)
+    return digest
+
+
+def _load_from_file__key(filepath, format_, update_data_callback):
+    # keyed on file contents rather than path, so that identical files (such as
+    # in mirrored repositories) share an entry
+    callback_name = getattr(update_data_callback, "__name__", None)
+    return str(("package_file", _get_file_digest(filepath), format_.extension,
+                callback_name))
 
 
 @memcached(servers=config.memcached_uri if config.cache_package_files else None,
@@ -100,9 +247,16 @@ def _load_from_file__key(filepath, *nargs, **kwargs):
            key=_load_from_file__key,
            debug=config.debug_memcache)
 def _load_from_file(filepath, format_, update_data_callback):
-    return _load_file(filepath, format_, update_data_callback)
+    entry = file_digests.get(filepath)
+    result = _load_file(filepath, format_, update_data_callback)
+
+    # don't cache if the file changed since its digest was taken
+    if entry and _get_file_digest(filepath) != entry[1]:
+        return DoNotCache(result)
+    return result
 
 
+@stats.timed("package_file.evaluate")
 def _load_file(filepath, format_, update_data_callback):
     load_func = load_functions[format_]
 
@@ -209,6 +363,7 @@ def load_txt(stream, **kwargs):
 def clear_file_caches():
     """Clear any cached files."""
     _load_from_file.forget()
+    file_digests.clear()
 
 
 load_functions = {FileFormat.py:      load_py,
@@ -127,11 +127,16 @@ from rez.vendor.version.version import Version, VersionRange
 from rez.vendor.version.requirement import VersionedObject, Requirement, \
     RequirementList
 from rez.vendor.enum import Enum
-from rez.packages_ import iter_packages
+from rez.packages_ import iter_packages, preload_packages
+from rez.utils.formatting import PackageRequest
+from rez.utils.memcached import reset_memcached_clients
+from rez.utils.stats import stats
 from itertools import groupby
+import multiprocessing
 import copy
 import time
 import sys
+import os
 
 
 class VariantSelectMode(Enum):
@@ -363,6 +368,25 @@ class Cycle(FailureReason):
         return " --> ".join(map(str, stmts))
 
 
+class KnownConflict(FailureReason):
+    """The phase contains the split decisions of an earlier failure (a nogood),
+    so was discarded without being solved."""
+    def __init__(self, nogood_reason):
+        self.nogood_reason = nogood_reason
+
+    def involved_requirements(self):
+        return self.nogood_reason.involved_requirements()
+
+    def description(self):
+        return "The phase contains a known conflict: %s" % str(self)
+
+    def __eq__(self, other):
+        return (self.nogood_reason == other.nogood_reason)
+
+    def __str__(self):
+        return str(self.nogood_reason)
+
+
 class PackageVariant(_Common):
     """A variant of a package."""
     def __init__(self, name, version, requires, index=None, userdata=None):
@@ -381,6 +405,8 @@ class PackageVariant(_Common):
         self.index = index
         self.userdata = userdata
         self.requires_list = RequirementList(requires)
+        self._sort_key = None
+        self._sort_key_requests = None
 
         if self.requires_list.conflict:
             raise ResolveError(("The package %s has an internal "
@@ -398,6 +424,46 @@ class PackageVariant(_Common):
     def get(self, pkg_name):
         return self.requires_list.get(pkg_name)
 
+    def get_sort_key(self, package_requests):
+        """Get the key this variant sorts by, with respect to a request.
+
+        See `_PackageVariantTable.get_sorted_indices` for the sort rules.
+        Ranges are compared via their `VersionRange.sort_key`, and the key is
+        cached, since the package requests a solver sorts by do not change
+        during a solve.
+        """
+        if self._sort_key_requests is package_requests:
+            return self._sort_key
+
+        requested_key = []
+        names = set()
+        for i, request in enumerate(package_requests):
+            if not request.conflict:
+                req = self.requires_list.get(request.name)
+                if req is not None:
+                    requested_key.append((-i, req.range.sort_key()))
+                    names.add(req.name)
+
+        additional_key = tuple((x.range.sort_key(), x.name)
+                               for x in self.requires_list
+                               if not x.conflict and x.name not in names)
+
+        if config.variant_select_mode == VariantSelectMode.version_priority:
+            k = (tuple(requested_key),
+                 -len(additional_key),
+                 additional_key,
+                 self.index)
+        else:  # VariantSelectMode.intersection_priority
+            k = (len(requested_key),
+                 tuple(requested_key),
+                 -len(additional_key),
+                 additional_key,
+                 self.index)
+
+        self._sort_key = k
+        self._sort_key_requests = package_requests
+        return k
+
     def __eq__(self, other):
         return (self.name == other.name
                 and self.version == other.version
@@ -451,6 +517,12 @@ class _PackageVariantList(_Common):
         """
         variants = []
 
+        # load unexpanded packages in bulk, where the repository supports it
+        packages = [x[1] for x in self.entries
+                    if not isinstance(x[1], list) and x[0] in range]
+        if len(packages) > 1:
+            preload_packages(packages)
+
         for entry in self.entries:
             version, value = entry
             if version not in range:
@@ -470,25 +542,50 @@ class _PackageVariantList(_Common):
                                         % (package.qualified_name, str(rule)))
                         continue
 
-                # expand package entry into list of variants
-                if self.package_load_callback:
-                    self.package_load_callback(package)
-
-                variants_ = []
-                for var in package.iter_variants():
-                    requires = var.get_requires(build_requires=self.building)
-                    userdata = var.handle.to_dict()
-                    variant = PackageVariant(name=self.package_name,
-                                             version=var.version,
-                                             requires=requires,
-                                             index=var.index,
-                                             userdata=userdata)
-                    variants_.append(variant)
+                # expand package entry into list of variants, using the
+                # repository's variant index if it has one
+                variants_ = self._get_indexed_variants(package)
+
+                if variants_ is None:
+                    if self.package_load_callback:
+                        self.package_load_callback(package)
+
+                    variants_ = []
+                    for var in package.iter_variants():
+                        requires = var.get_requires(build_requires=self.building)
+                        userdata = var.handle.to_dict()
+                        variant = PackageVariant(name=self.package_name,
+                                                 version=var.version,
+                                                 requires=requires,
+                                                 index=var.index,
+                                                 userdata=userdata)
+                        variants_.append(variant)
+
                 entry[1] = variants_
                 variants.extend(variants_)
 
         return variants or None
 
+    def _get_indexed_variants(self, package):
+        repo = package.resource._repository
+        entries = repo.get_indexed_variants(package.resource)
+        if entries is None:
+            return None
+
+        variants = []
+        for handle, requires, build_requires in entries:
+            if self.building:
+                requires = requires + build_requires
+
+            requires = [PackageRequest(x) for x in requires]
+            variant = PackageVariant(name=self.package_name,
+                                     version=package.version,
+                                     requires=requires,
+                                     index=handle.get("index"),
+                                     userdata=handle.to_dict())
+            variants.append(variant)
+        return variants
+
     def dump(self):
         print self.package_name
         for version, variants in self.entries:
@@ -515,25 +612,233 @@ def _short_req_str(package_request):
     return str(package_request)
 
 
-class _PackageVariantSlice(_Common):
-    """A subset of a variant list, but with more dependency-related info."""
-    def __init__(self, package_name, variants, printer=None):
+def _iter_bits(mask):
+    """Iterate over the indices of the set bits in `mask`, lowest first."""
+    i = 0
+    while mask:
+        if not (mask & 0xff):
+            mask >>= 8
+            i += 8
+            continue
+        if mask & 1:
+            yield i
+        mask >>= 1
+        i += 1
+
+
+class _BitRegistry(object):
+    """Maps hashable items (such as package family names) to bits, so that
+    sets of items can be stored as integer bitsets.
+    """
+    def __init__(self):
+        self.bits = {}
+        self.items = []
+
+    def get_bits(self, items):
+        """Get the bitset of the given items."""
+        mask = 0
+        for item in items:
+            bit = self.bits.get(item)
+            if bit is None:
+                bit = 1 << len(self.items)
+                self.bits[item] = bit
+                self.items.append(item)
+            mask |= bit
+        return mask
+
+    def get_items(self, mask):
+        """Get the set of items in the given bitset."""
+        return set(self.items[i] for i in _iter_bits(mask))
+
+
+class _PackageVariantTable(_Common):
+    """An immutable list of package variants, which variant slices index into.
+
+    Variants are in descending version order. A slice of the table is stored as
+    an integer bitmask, where bit N represents variant N in the table. Per-variant
+    dependency families are precomputed as bitsets (see `_BitRegistry`),
+    so that slice operations are mostly integer operations.
+
+    Variants are also assigned a bit in a registry shared by all tables of the
+    same family, so that slices of different tables can be compared (see
+    `_PackageVariantSlice.variant_ids`).
+    """
+    def __init__(self, package_name, variants, family_bits, variant_bits):
         self.package_name = package_name
         self.variants = variants
+        self.family_bits = family_bits
+        self.mask = (1 << len(variants)) - 1
+        self.variant_ids = {}  # {mask: family-wide variant bitset}
+        self.variant_id_bits = [variant_bits.get_bits([(x.version, x.index)])
+                                for x in variants]
+        self.variant_indices = dict(((x.version, x.index), i)
+                                    for i, x in enumerate(variants))
+
+        # [(version, mask)], in descending version order
+        self.version_masks = []
+
+        # per-variant family bitsets
+        self.request_fam_bits = []
+        self.requires_fam_bits = []
+
+        # {family-bit: mask of variants requiring that family}
+        self.fam_masks = {}
+
+        self._sorted_key = None
+        self._sorted_indices = None
+
+        for i, variant in enumerate(variants):
+            bit = 1 << i
+            if self.version_masks and \
+                    self.version_masks[-1][0] == variant.version:
+                version, mask = self.version_masks[-1]
+                self.version_masks[-1] = (version, mask | bit)
+            else:
+                self.version_masks.append((variant.version, bit))
+
+            request_bits = family_bits.get_bits(variant.request_fams)
+            conflict_bits = family_bits.get_bits(variant.conflict_request_fams)
+            requires_bits = request_bits | conflict_bits
+            self.request_fam_bits.append(request_bits)
+            self.requires_fam_bits.append(requires_bits)
+
+            for fam_bit in (1 << j for j in _iter_bits(requires_bits)):
+                self.fam_masks[fam_bit] = self.fam_masks.get(fam_bit, 0) | bit
+
+    def get_variant_ids(self, mask):
+        """Get the family-wide variant bitset of the variants in the mask."""
+        ids = self.variant_ids.get(mask)
+        if ids is None:
+            ids = 0
+            for i in _iter_bits(mask):
+                ids |= self.variant_id_bits[i]
+            self.variant_ids[mask] = ids
+        return ids
+
+    def get_sorted_indices(self, package_requests):
+        """Get the indices of all variants, sorted from most correct to
+        consume, to least.
+
+        Sort rules:
+
+        version_priority:
+        - sort by highest versions of packages shared with request;
+        - THEN least number of additional packages added to solve;
+        - THEN highest versions of additional packages;
+        - THEN alphabetical on name of additional packages;
+        - THEN variant index.
+
+        intersection_priority:
+        - sort by highest number of packages shared with request;
+        - THEN sort according to version_priority
+
+        Note:
+            In theory 'variant.index' should never factor into the sort unless
+            two variants are identical (which shouldn't happen) - this is jusst
+            here as a safety measure so that sorting is guaranteed repeatable
+            regardless.
+
+        Note:
+            Variants are only sorted within a version, versions remain in
+            descending order. The result is cached, since the package requests
+            a solver sorts by do not change during a solve.
+        """
+        if self._sorted_key is package_requests:
+            return self._sorted_indices
+
+        def key(index):
+            return self.variants[index].get_sort_key(package_requests)
+
+        indices = []
+        for _, mask in self.version_masks:
+            version_indices = list(_iter_bits(mask))
+            if len(version_indices) != 1:
+                version_indices.sort(key=key, reverse=True)
+            indices.extend(version_indices)
+
+        self._sorted_key = package_requests
+        self._sorted_indices = indices
+        return indices
+
+    def __len__(self):
+        return len(self.variants)
+
+    def __str__(self):
+        return "%s[%s]" % (self.package_name,
+                           ','.join(str(x) for x in self.variants))
+
+
+class _ReductionMemo(object):
+    """Results of variant slice reductions, shared by all phases of a solve.
+
+    The same slice is often reduced by the same request many times - in
+    successive phases, and in sibling phases after a split. Entries are keyed
+    on the slice (its table and mask) and the request, and store the mask of
+    the reduced variants and the list of `Reduction` objects.
+    """
+    def __init__(self):
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+
+class _PackageVariantSlice(_Common):
+    """A subset of a variant table, but with more dependency-related info.
+
+    The subset is stored as a bitmask into the table, and dependency families
+    are tracked as bitsets, see `_PackageVariantTable`.
+
+    Variants are in table order until the slice is split, after which they are
+    in sorted order (see `_PackageVariantTable.get_sorted_indices`). Variant
+    order decides the order of reductions, and the family that is extracted
+    next, so it must not change.
+    """
+    def __init__(self, package_name, table, mask=None, printer=None,
+                 reduction_memo=None):
+        self.package_name = package_name
+        self.table = table
+        self.mask = table.mask if mask is None else mask
         self.pr = printer
+        self.reduction_memo = reduction_memo
         self.range = None
+        self.sort_requests = None  # set once the slice is split
 
-        # family tracking
-        self.extracted_fams = set()
-        self.fam_requires = None
-        self.common_fams = None
+        # family tracking, as family bitsets
+        self.extracted_fam_bits = 0
+        self.fam_requires_bits = 0
+        self.common_fam_bits = 0
 
+        self._len = 0
         self._update()
 
+    @property
+    def variants(self):
+        """List of `PackageVariant`, in descending version order."""
+        variants = self.table.variants
+        return [variants[i] for i in self._indices()]
+
+    @property
+    def variant_ids(self):
+        """Bitset of the variants in the slice, comparable across all slices
+        of the same package family."""
+        return self.table.get_variant_ids(self.mask)
+
+    @property
+    def extracted_fams(self):
+        return self.table.family_bits.get_items(self.extracted_fam_bits)
+
+    @property
+    def fam_requires(self):
+        return self.table.family_bits.get_items(self.fam_requires_bits)
+
+    @property
+    def common_fams(self):
+        return self.table.family_bits.get_items(self.common_fam_bits)
+
     @property
     def extractable(self):
         """True if there are possible remaining extractions."""
-        return not self.extracted_fams.issuperset(self.common_fams)
+        return bool(self.common_fam_bits & ~self.extracted_fam_bits)
 
     def intersect(self, range):
         """Remove variants whos version fall outside of the given range."""
@@ -543,17 +848,20 @@ class _PackageVariantSlice(_Common):
         if range.is_any():
             return self
 
-        variants = []
-        it = groupby(self.variants, lambda x: x.version)
-        it2 = range.contains_versions(it, key=lambda x: x[0], descending=True)
-        for contains, (_, variants_) in it2:
+        mask = 0
+        version_masks = [x for x in self.table.version_masks
+                         if x[1] & self.mask]
+        it = range.contains_versions(version_masks, key=lambda x: x[0],
+                                     descending=True)
+        for contains, (_, version_mask) in it:
             if contains:
-                variants.extend(variants_)
+                mask |= version_mask
+        mask &= self.mask
 
-        if not variants:
+        if not mask:
             return None
-        elif len(variants) < len(self.variants):
-            return self._copy(variants)
+        elif mask != self.mask:
+            return self._copy(mask)
         else:
             return self
 
@@ -565,21 +873,56 @@ class _PackageVariantSlice(_Common):
             (VariantSlice, [Reduction]) tuple, where slice may be None if all
             variants were reduced.
         """
-        if (package_request.range is None) or \
-                (package_request.name not in self.fam_requires):
+        if package_request.range is None:
+            return (self, [])
+
+        fam_bit = self.table.family_bits.bits.get(package_request.name, 0)
+        if not (fam_bit & self.fam_requires_bits):
             return (self, [])
 
         if self.pr:
             reqstr = _short_req_str(package_request)
             self.pr("reducing %s wrt %s...", self, reqstr)
 
-        variants = []
+        memo = self.reduction_memo
+        if memo is None:
+            reduced_mask, reductions = self._reduce_by(fam_bit, package_request)
+        else:
+            key = (self.table, self.mask, package_request,
+                   self.sort_requests is None)
+            entry = memo.entries.get(key)
+            if entry is None:
+                memo.misses += 1
+                entry = self._reduce_by(fam_bit, package_request)
+                memo.entries[key] = entry
+            else:
+                memo.hits += 1
+                if self.pr and entry[1]:
+                    self.pr("removed %d variants (memoized)", len(entry[1]))
+            reduced_mask, reductions = entry
+
+        mask = self.mask & ~reduced_mask
+        if not mask:
+            return (None, reductions)
+        elif reductions:
+            return (self._copy(mask), reductions)
+        else:
+            return (self, [])
+
+    def _reduce_by(self, fam_bit, package_request):
+        # only variants that require the family can be reduced
+        reduced_mask = 0
         reductions = []
-        fn = lambda x: x.get(package_request.name)
+        variants = self.table.variants
+        fn = lambda i: variants[i].get(package_request.name)
+        fam_mask = self.table.fam_masks[fam_bit]
+        it = (i for i in self._indices() if fam_mask & (1 << i))
 
-        for req, variants_ in groupby(self.variants, fn):
+        for req, indices in groupby(it, fn):
             if req and req.conflicts_with(package_request):
-                for variant in variants_:
+                for i in indices:
+                    variant = variants[i]
+                    reduced_mask |= (1 << i)
                     red = Reduction(name=variant.name,
                                     version=variant.version,
                                     variant_index=variant.index,
@@ -591,15 +934,8 @@ class _PackageVariantSlice(_Common):
                                 red.reducee_str(),
                                 red.dependency,
                                 red.conflicting_request)
-            else:
-                variants.extend(variants_)
 
-        if not variants:
-            return (None, reductions)
-        elif reductions:
-            return (self._copy(variants), reductions)
-        else:
-            return (self, [])
+        return (reduced_mask, reductions)
 
     def extract(self):
         """Extract a common dependency.
@@ -608,17 +944,25 @@ class _PackageVariantSlice(_Common):
         resolved via reduction.
         """
         if self.extractable:
-            extractable = self.common_fams - self.extracted_fams
-            fam = iter(extractable).next()
+            # The family is chosen exactly as a set of family names would
+            # order it, since the order of extractions (and so the scopes
+            # they add) changes the path the solve takes.
+            variants = self.variants
+            common_fams = set(variants[0].request_fams)
+            for variant in variants:
+                common_fams &= variant.request_fams
+
+            fam = iter(common_fams - self.extracted_fams).next()
+            fam_bit = self.table.family_bits.bits[fam]
             ranges = []
 
-            for variant in self.variants:
+            for variant in variants:
                 req = variant.get(fam)
                 if not ranges or req.range != ranges[-1]:
                     ranges.append(req.range)
 
             slice_ = copy.copy(self)
-            slice_.extracted_fams = self.extracted_fams | set([fam])
+            slice_.extracted_fam_bits = self.extracted_fam_bits | fam_bit
 
             range_ = ranges[0].union(ranges[1:])
             common_req = Requirement.construct(fam, range_)
@@ -628,20 +972,20 @@ class _PackageVariantSlice(_Common):
 
     def split(self, package_requests):
         """Split the slice."""
-        if len(self.variants) == 1:
+        if self._len == 1:
             return None
 
-        self.sort_variants(package_requests)
-        it = enumerate(self.variants)
-        latest_variant = it.next()[1]
+        self.sort_requests = package_requests
+        indices = self._indices()
+        request_fam_bits = self.table.request_fam_bits
         split_fams = None
         nleading = 1
 
-        if len(self.variants) > 2:
-            fams = latest_variant.request_fams - self.extracted_fams
+        if len(indices) > 2:
+            fams = request_fam_bits[indices[0]] & ~self.extracted_fam_bits
             if fams:
-                for j, variant in it:
-                    next_fams = variant.request_fams & fams
+                for j in range(1, len(indices)):
+                    next_fams = request_fam_bits[indices[j]] & fams
                     if next_fams:
                         fams = next_fams
                     else:
@@ -649,8 +993,12 @@ class _PackageVariantSlice(_Common):
                         nleading = j
                         break
 
-        slice_ = self._copy(self.variants[:nleading])
-        next_slice = self._copy(self.variants[nleading:])
+        leading_mask = 0
+        for i in indices[:nleading]:
+            leading_mask |= (1 << i)
+
+        slice_ = self._copy(leading_mask)
+        next_slice = self._copy(self.mask & ~leading_mask)
 
         if self.pr:
             s = "split %s into %s and %s"
@@ -658,102 +1006,78 @@ class _PackageVariantSlice(_Common):
             if split_fams is None:
                 s += " on leading variant"
             else:
+                fams = self.table.family_bits.get_items(split_fams)
                 s += " on %d leading variants with common dependencies: %s"
-                a.extend([nleading, ", ".join(split_fams)])
+                a.extend([nleading, ", ".join(fams)])
             self.pr(s, *a)
 
         return (slice_, next_slice)
 
-    def sort_variants(self, package_requests):
-        """Sort variants from most correct to consume, to least.
+    def split_on(self, version, index):
+        """Split the slice into the given variant, and the remaining variants.
 
-        Sort rules:
+        Returns:
+            A (_PackageVariantSlice, _PackageVariantSlice) tuple, or None if
+            the variant is not in the slice, or is the only variant.
+        """
+        if self._len == 1:
+            return None
 
-        version_priority:
-        - sort by highest versions of packages shared with request;
-        - THEN least number of additional packages added to solve;
-        - THEN highest versions of additional packages;
-        - THEN alphabetical on name of additional packages;
-        - THEN variant index.
+        i = self.table.variant_indices.get((version, index))
+        if i is None or not (self.mask & (1 << i)):
+            return None
 
-        intersection_priority:
-        - sort by highest number of packages shared with request;
-        - THEN sort according to version_priority
+        slice_ = self._copy(1 << i)
+        next_slice = self._copy(self.mask & ~(1 << i))
 
-        Note:
-            In theory 'variant.index' should never factor into the sort unless
-            two variants are identical (which shouldn't happen) - this is jusst
-            here as a safety measure so that sorting is guaranteed repeatable
-            regardless.
+        if self.pr:
+            self.pr("split %s into %s and %s on seed variant",
+                    self, slice_, next_slice)
 
-        Note:
-            Assumes self.variants is already in version-descending order.
-        """
-        def key(variant):
-            requested_key = []
-            names = set()
-            for i, request in enumerate(package_requests):
-                if not request.conflict:
-                    req = variant.requires_list.get(request.name)
-                    if req is not None:
-                        requested_key.append((-i, req.range))
-                        names.add(req.name)
-
-            additional_key = []
-            for request in variant.requires_list:
-                if not request.conflict and request.name not in names:
-                    additional_key.append((request.range, request.name))
-
-            if config.variant_select_mode == VariantSelectMode.version_priority:
-                k = (requested_key,
-                     -len(additional_key),
-                     additional_key,
-                     variant.index)
-            else:  # VariantSelectMode.intersection_priority
-                k = (len(requested_key),
-                     requested_key,
-                     -len(additional_key),
-                     additional_key,
-                     variant.index)
-
-            return k
-
-        resorted_variants = []
-        for _, it in groupby(self.variants, lambda x: x.version):
-            version_variants = list(it)
-            if len(version_variants) != 1:
-                version_variants.sort(key=key, reverse=True)
-            resorted_variants.extend(version_variants)
-
-        self.variants = resorted_variants
+        return (slice_, next_slice)
 
     def dump(self):
         print self.package_name
         print '\n'.join(map(str, self.variants))
 
-    def _copy(self, new_variants):
+    def _indices(self):
+        # indices of the slice's variants in the table, in variant order
+        if self.sort_requests is None:
+            return list(_iter_bits(self.mask))
+        return [i for i in self.table.get_sorted_indices(self.sort_requests)
+                if self.mask & (1 << i)]
+
+    def _copy(self, new_mask):
         slice_ = copy.copy(self)
-        slice_.variants = new_variants
-        slice_.extracted_fams = set()
+        slice_.mask = new_mask
+        slice_.extracted_fam_bits = 0
         slice_._update()
         return slice_
 
     def _update(self):
         # range
-        versions = set(x.version for x in self.variants)
+        versions = [version for version, mask in self.table.version_masks
+                    if mask & self.mask]
         self.range = VersionRange.from_versions(versions)
 
         # family-related
-        self.common_fams = set(self.variants[0].request_fams)
-        self.fam_requires = set()
+        request_fam_bits = self.table.request_fam_bits
+        requires_fam_bits = self.table.requires_fam_bits
+        common_fam_bits = -1
+        fam_requires_bits = 0
+        n = 0
+
+        for i in _iter_bits(self.mask):
+            common_fam_bits &= request_fam_bits[i]
+            fam_requires_bits |= requires_fam_bits[i]
+            n += 1
 
-        for variant in self.variants:
-            self.common_fams &= variant.request_fams
-            self.fam_requires |= (variant.request_fams |
-                                  variant.conflict_request_fams)
+        self.common_fam_bits = common_fam_bits
+        self.fam_requires_bits = fam_requires_bits
+        self._len = n
 
     def __len__(self):
-        return len(self.variants)
+        return self._len
 
     def __str__(self):
         """
@@ -765,17 +1089,18 @@ class _PackageVariantSlice(_Common):
         [foo==2] means a resolved package (no variants in the package).
         [foo=2[0]] means a resolved package (zeroeth variant).
         """
-        nvariants = len(self.variants)
+        variants = self.variants
+        nvariants = len(variants)
         if nvariants == 1:
-            variant = self.variants[0]
+            variant = variants[0]
             s_idx = "" if variant.index is None else "[%d]" % variant.index
             s = "[%s==%s%s]" % (self.package_name, str(variant.version), s_idx)
         else:
-            nversions = len(set(x.version for x in self.variants))
+            nversions = len(set(x.version for x in variants))
             if nversions == 1:
-                indexes = sorted([x.index for x in self.variants])
+                indexes = sorted([x.index for x in variants])
                 s_idx = ','.join(str(x) for x in indexes)
-                verstr = str(self.variants[0].version)
+                verstr = str(variants[0].version)
                 s = "[%s==%s[%s]]" % (self.package_name, verstr, s_idx)
             else:
                 verstr = "%d" % nvariants if (nversions == nvariants) \
@@ -796,6 +1121,10 @@ class PackageVariantCache(object):
         self.building = building
         self.package_load_callback = package_load_callback
         self.variant_lists = {}  # {package-name: _PackageVariantList}
+        self.variant_tables = {}  # {(package-name, range): _PackageVariantTable}
+        self.family_bits = _BitRegistry()
+        self.variant_bits = {}  # {package-name: _BitRegistry}
+        self.reduction_memo = _ReductionMemo()
 
     def get_variant_slice(self, package_name, range):
         """Get a list of variants from the cache.
@@ -807,21 +1136,38 @@ class PackageVariantCache(object):
         Returns:
             `_PackageVariantSlice` object.
         """
-        variant_list = self.variant_lists.get(package_name)
-        if variant_list is None:
-            variant_list = _PackageVariantList(
-                package_name,
-                package_paths=self.package_paths,
-                package_filter=self.package_filter,
-                building=self.building,
-                package_load_callback=self.package_load_callback)
-            self.variant_lists[package_name] = variant_list
-
-        variants = variant_list.get_intersection(range)
-        if not variants:
-            return None
+        key = (package_name, range)
+        table = self.variant_tables.get(key)
+
+        if table is None:
+            variant_list = self.variant_lists.get(package_name)
+            if variant_list is None:
+                variant_list = _PackageVariantList(
+                    package_name,
+                    package_paths=self.package_paths,
+                    package_filter=self.package_filter,
+                    building=self.building,
+                    package_load_callback=self.package_load_callback)
+                self.variant_lists[package_name] = variant_list
+
+            variants = variant_list.get_intersection(range)
+            if not variants:
+                return None
+
+            variant_bits = self.variant_bits.get(package_name)
+            if variant_bits is None:
+                variant_bits = _BitRegistry()
+                self.variant_bits[package_name] = variant_bits
 
-        slice_ = _PackageVariantSlice(package_name, variants=variants)
+            table = _PackageVariantTable(package_name,
+                                         variants=variants,
+                                         family_bits=self.family_bits,
+                                         variant_bits=variant_bits)
+            self.variant_tables[key] = table
+
+        slice_ = _PackageVariantSlice(package_name,
+                                      table=table,
+                                      reduction_memo=self.reduction_memo)
         return slice_
 
 
@@ -836,6 +1182,10 @@ class _PackageScope(_Common):
         self.variant_slice = None
         self.pr = solver.pr
 
+        # the split decisions that this scope's state follows from, as a set
+        # of (package-name, variant-ids) tuples. See `Solver._find_nogood`.
+        self.decisions = frozenset()
+
         if package_request.conflict:
             self.package_request = package_request
         else:
@@ -948,13 +1298,42 @@ class _PackageScope(_Common):
             return None
         else:
             r = self.variant_slice.split(package_requests)
-            if r is None:
-                return None
-            else:
-                slice, next_slice = r
-                scope = self._copy(slice)
-                next_scope = self._copy(next_slice)
-                return (scope, next_scope)
+            return self._split(r)
+
+    def split_seed(self, seed_variants):
+        """Split the scope on its seed variant.
+
+        Args:
+            seed_variants (dict): Seed variants, see `Solver`.
+
+        Returns:
+            A (_PackageScope, _PackageScope) tuple, where the first scope
+            contains only the seed variant. Or None, if there is no seed variant
+            for this package, or it is not in the scope.
+        """
+        key = seed_variants.get(self.package_name)
+        if key is None or self.package_request.conflict:
+            return None
+        else:
+            r = self.variant_slice.split_on(*key)
+            return self._split(r)
+
+    def _split(self, r):
+        if r is None:
+            return None
+        else:
+            slice, next_slice = r
+            scope = self._copy(slice)
+            scope.decisions = self._get_decisions(slice)
+            next_scope = self._copy(next_slice)
+            next_scope.decisions = self._get_decisions(next_slice)
+            return (scope, next_scope)
+
+    def _get_decisions(self, new_slice):
+        # a previous decision on this package is implied by the new one
+        decisions = set(x for x in self.decisions if x[0] != self.package_name)
+        decisions.add((self.package_name, new_slice.variant_ids))
+        return frozenset(decisions)
 
     def _copy(self, new_slice):
         scope = copy.copy(self)
@@ -1027,6 +1406,7 @@ class _ResolvePhase(_Common):
     def __init__(self, package_requests, solver):
         self.package_requests = package_requests
         self.failure_reason = None
+        self.failure_decisions = None
         self.extractions = {}
         self.solver = solver
         self.pr = solver.pr
@@ -1050,6 +1430,7 @@ class _ResolvePhase(_Common):
 
         scopes = self.scopes[:]
         failure_reason = None
+        failure_decisions = None
         extractions = {}
         pending_reducts = self.pending_reducts.copy()
 
@@ -1057,6 +1438,7 @@ class _ResolvePhase(_Common):
             phase = copy.copy(self)
             phase.scopes = scopes
             phase.failure_reason = failure_reason
+            phase.failure_decisions = failure_decisions
             phase.extractions = extractions
             phase.pending_reducts = set()
 
@@ -1072,6 +1454,7 @@ class _ResolvePhase(_Common):
             while True:
                 self.pr.subheader("EXTRACTING:")
                 common_requests = []
+                extraction_decisions = {}
 
                 for i in range(len(scopes)):
                     while True:
@@ -1080,6 +1463,10 @@ class _ResolvePhase(_Common):
                             common_requests.append(common_request)
                             k = (scopes[i].package_name, common_request.name)
                             extractions[k] = common_request
+                            extraction_decisions[common_request.name] = \
+                                extraction_decisions.get(common_request.name,
+                                                         frozenset()) \
+                                | scopes[i].decisions
                             scopes[i] = scope_
                         else:
                             break
@@ -1091,6 +1478,8 @@ class _ResolvePhase(_Common):
                         req1, req2 = request_list.conflict
                         conflict = DependencyConflict(req1, req2)
                         failure_reason = DependencyConflicts([conflict])
+                        failure_decisions = extraction_decisions[req1.name] \
+                            | extraction_decisions[req2.name]
                         return _create_phase(SolverStatus.failed)
                     else:
                         if self.pr:
@@ -1112,13 +1501,17 @@ class _ResolvePhase(_Common):
                         if req is not None:
                             scope_ = scope.intersect(req.range)
                             req_fams.append(req.name)
+                            decisions = scope.decisions \
+                                | extraction_decisions[req.name]
 
                             if scope_ is None:
                                 conflict = DependencyConflict(
                                     req, scope.package_request)
                                 failure_reason = DependencyConflicts([conflict])
+                                failure_decisions = decisions
                                 return _create_phase(SolverStatus.failed)
                             elif scope_ is not scope:
+                                scope_.decisions = decisions
                                 scopes[i] = scope_
                                 for j in range(len(scopes)):
                                     if j != i:
@@ -1133,6 +1526,7 @@ class _ResolvePhase(_Common):
                         n = len(scopes)
                         for req in new_reqs:
                             scope = _PackageScope(req, solver=self.solver)
+                            scope.decisions = extraction_decisions[req.name]
                             scopes.append(scope)
                             if self.pr:
                                 self.pr("added %s", scope)
@@ -1171,10 +1565,14 @@ class _ResolvePhase(_Common):
                 for i, j in sorted(pending_reducts):
                     new_scope, reductions = scopes[j].reduce_by(
                         scopes[i].package_request)
+                    decisions = scopes[j].decisions | scopes[i].decisions
+
                     if new_scope is None:
                         failure_reason = TotalReduction(reductions)
+                        failure_decisions = decisions
                         return _create_phase(SolverStatus.failed)
                     elif new_scope is not scopes[j]:
+                        new_scope.decisions = decisions
                         scopes[j] = new_scope
                         for i in range(len(scopes)):
                             if i != j:
@@ -1244,28 +1642,32 @@ class _ResolvePhase(_Common):
         dependency can now be intersected with the current resolve, thus
         progressing it.
 
+        If the solver has seed variants, a scope containing its seed variant is
+        split first instead, into that variant and the rest.
+
         Returns:
             A 2-tuple of _ResolvePhase objects, where the first phase is the
             best contender for resolving.
         """
         assert(self.status == SolverStatus.exhausted)
 
-        scopes = []
-        next_scopes = []
+        scopes = self.scopes[:]
+        next_scopes = self.scopes[:]
         split = None
+        seed_variants = self.solver.seed_variants
 
-        for i, scope in enumerate(self.scopes):
-            if split is None:
-                r = scope.split(self.solver.package_requests)
+        def _split(fn):
+            for i, scope in enumerate(self.scopes):
+                r = fn(scope)
                 if r is not None:
-                    scope_, next_scope = r
-                    scopes.append(scope_)
-                    next_scopes.append(next_scope)
-                    split = i
-                    continue
+                    scopes[i], next_scopes[i] = r
+                    return i
+            return None
 
-            scopes.append(scope)
-            next_scopes.append(scope)
+        if seed_variants:
+            split = _split(lambda x: x.split_seed(seed_variants))
+        if split is None:
+            split = _split(lambda x: x.split(self.solver.package_requests))
 
         phase = copy.copy(self)
         phase.scopes = scopes
@@ -1582,9 +1984,14 @@ class Solver(_Common):
     """
     max_verbosity = 3
 
+    # seconds between callbacks, while waiting for a speculative solve
+    speculative_poll_interval = 0.1
+
     def __init__(self, package_requests, package_paths, package_filter=None,
                  callback=None, building=False, optimised=True, verbosity=0,
-                 buf=None, package_load_callback=None, prune_unfailed=True):
+                 buf=None, package_load_callback=None, prune_unfailed=True,
+                 learn_nogoods=None, parallel_workers=None,
+                 seed_variants=None):
         """Create a Solver.
 
         Args:
@@ -1609,6 +2016,29 @@ class Solver(_Common):
             prune_unfailed (bool): If the solve failed, and `prune_unfailed` is
                 True, any packages unrelated to the conflict are removed from
                 the graph.
+            learn_nogoods (bool): If True, record the split decisions that
+                lead to each failed phase, and discard later phases that contain
+                the same decisions without solving them. If None, the
+                'solver_learn_nogoods' config setting is used.
+            parallel_workers (int): Number of worker processes used to solve
+                phases speculatively, while the current phase is being solved.
+                The result of the solve is identical to a serial solve. Zero
+                disables parallel solving. If None, the
+                'solver_parallel_workers' config setting is used. Note that a
+                worker that finds that every phase it solved failed reports a
+                single failure, so failed_phase_list contains one phase for all
+                of those failures, and the callback is called once for them.
+                num_fails still counts every failure, but `max_fails` (see
+                `ResolvedContext`) can be exceeded by that many failures. The
+                callback is also called while waiting for a worker, so that
+                time limits and aborts take effect without waiting for it.
+            seed_variants (list): Variants of a previous resolve, such as
+                `PackageVariant` or `Variant` objects. The solver tries these
+                first wherever they are still possible, so that re-resolving
+                after a small change to a request only revisits the packages
+                the change affects. Note that the result is then biased towards
+                the seed - a package is not moved to a newer version unless the
+                seed version is no longer possible.
         """
         self.package_requests = package_requests
         self.package_paths = package_paths
@@ -1619,11 +2049,30 @@ class Solver(_Common):
         self.prune_unfailed = prune_unfailed
         self.request_list = None
 
+        if learn_nogoods is None:
+            learn_nogoods = config.solver_learn_nogoods
+        self.learn_nogoods = learn_nogoods
+
+        if parallel_workers is None:
+            parallel_workers = config.solver_parallel_workers
+        if os.name != "posix":
+            parallel_workers = 0  # worker processes are forked
+        self.parallel_workers = parallel_workers
+
+        # {package-name: (version, index)}
+        self.seed_variants = dict((x.name, (x.version, x.index))
+                                  for x in (seed_variants or []))
+
         self.phase_stack = None
         self.failed_phase_list = None
         self.abort_reason = None
         self.callback_return = None
         self.solve_count = None
+        self.prune_count = None
+        self.speculative_fail_count = None
+        self.speculative_solves = None
+        self.callback_stopped = None
+        self.nogoods = None
         self.depth_counts = None
         self.solve_time = None
         self.load_time = None
@@ -1697,11 +2146,31 @@ class Solver(_Common):
     def num_fails(self):
         """Return the number of failed solve steps that have been executed.
         Note that num_solves is inclusive of failures."""
-        n = len(self.failed_phase_list)
+        n = len(self.failed_phase_list) + self.speculative_fail_count
         if self.phase_stack[-1].status in (SolverStatus.failed, SolverStatus.cyclic):
             n += 1
         return n
 
+    @property
+    def num_pruned(self):
+        """Return the number of phases that were discarded without being
+        solved, because they contained a learned nogood. Pruned phases are
+        included in num_fails, but not in num_solves."""
+        return self.prune_count
+
+    @property
+    def num_reductions(self):
+        """Return the number of variant slice reductions performed, including
+        those found in the reduction memo."""
+        memo = self.package_cache.reduction_memo
+        return memo.hits + memo.misses
+
+    @property
+    def num_memoized_reductions(self):
+        """Return the number of variant slice reductions that were found in
+        the reduction memo, rather than being recomputed."""
+        return self.package_cache.reduction_memo.hits
+
     @property
     def cyclic_fail(self):
         """Return True if the solve failed due to a cycle, False otherwise."""
@@ -1723,6 +2192,7 @@ class Solver(_Common):
         if not self.request_list.conflict:
             phase = _ResolvePhase(self.request_list.requirements, solver=self)
             self.pr("resetting...")
+            self._cancel_speculative_solves()
             self._init()
             self._push_phase(phase)
 
@@ -1736,10 +2206,26 @@ class Solver(_Common):
         self.load_time = 0.0
 
         # iteratively solve phases
-        while self.status == SolverStatus.unsolved:
-            self.solve_step()
-            if self.status == SolverStatus.unsolved and not self._do_callback():
-                break
+        try:
+            while self.status == SolverStatus.unsolved:
+                self.solve_step()
+                if self.callback_stopped:
+                    break
+                if self.status == SolverStatus.unsolved and not self._do_callback():
+                    break
+        finally:
+            self._cancel_speculative_solves()
+            self._update_stats()
+
+    def _update_stats(self):
+        stats.add_time("solver.solve", self.solve_time)
+        stats.add_time("solver.load", self.load_time)
+        stats.incr("solver.solves", self.num_solves)
+        stats.incr("solver.pruned", self.num_pruned)
+        stats.incr("solver.reductions", self.num_reductions)
+        stats.incr("solver.memoized_reductions", self.num_memoized_reductions)
+        if self.phase_stack:
+            stats.incr("solver.fails", self.num_fails)
 
     def solve_step(self):
         """Perform a single solve step.
@@ -1758,19 +2244,45 @@ class Solver(_Common):
             self.failed_phase_list.append(phase)
             phase = self._pop_phase()
 
+        result = self._get_speculative_result(phase)
+        if self.callback_stopped:
+            # stopped while waiting for a speculative solve
+            self._push_phase(phase)
+            self.solve_time += (time.time() - start_time)
+            return
+
         if phase.status == SolverStatus.exhausted:
             self.pr.subheader("SPLITTING:")
             phase, next_phase = phase.split()
+            stats.incr("solver.splits")
             self._push_phase(next_phase)
             if self.pr:
                 self.pr("new phase: %s", phase)
 
-        new_phase = phase.solve()
-        self.solve_count += 1
-        self.pr.subheader("RESULT:")
+        failure_reason = None
+        if result is None:
+            failure_reason = self._find_nogood(phase)
+
+        if result is not None:
+            new_phase = self._apply_speculative_result(phase, result)
+            self.pr.subheader("RESULT:")
+        elif failure_reason is not None:
+            new_phase = copy.copy(phase)
+            new_phase.status = SolverStatus.failed
+            new_phase.failure_reason = failure_reason
+            new_phase.failure_decisions = None
+            self.prune_count += 1
+            self.pr.subheader("RESULT:")
+            self.pr("phase pruned, it contains a known conflict: %s",
+                    failure_reason)
+        else:
+            new_phase = phase.solve()
+            self.solve_count += 1
+            self.pr.subheader("RESULT:")
 
         if new_phase.status == SolverStatus.failed:
             self.pr("phase failed to resolve")
+            self._add_nogood(new_phase)
             self._push_phase(new_phase)
             if self.pr and len(self.phase_stack) == 1:
                 self.pr.header("FAIL: there is no solution")
@@ -1786,6 +2298,10 @@ class Solver(_Common):
                     self.pr.header("SUCCESS")
                     self.pr("solve time: %.2f seconds", self.solve_time)
                     self.pr("load time: %.2f seconds", self.load_time)
+                    self.pr("reductions: %d (%d memoized)",
+                            self.num_reductions,
+                            self.num_memoized_reductions)
+                    self.pr("pruned phases: %d", self.num_pruned)
         else:
             assert(new_phase.status == SolverStatus.exhausted)
             self._push_phase(new_phase)
@@ -1793,6 +2309,11 @@ class Solver(_Common):
                 s = SolverState(self.num_solves, self.num_fails, new_phase)
                 self.pr.important(str(s))
 
+        if self.status == SolverStatus.unsolved:
+            self._start_speculative_solves()
+        else:
+            self._cancel_speculative_solves()
+
         end_time = time.time()
         self.solve_time += (end_time - start_time)
 
@@ -1807,6 +2328,8 @@ class Solver(_Common):
                   the cycle) is used;
                 - If a callback has caused a failure, the most recent fail is used;
                 - Otherwise, the first fail is used.
+                Phases that were pruned, rather than solved (see `num_pruned`),
+                are not included.
 
         Returns:
             A `FailureReason` subclass instance describing the failure.
@@ -1895,6 +2418,12 @@ class Solver(_Common):
         self.phase_stack = []
         self.failed_phase_list = []
         self.solve_count = 0
+        self.prune_count = 0
+        self.speculative_fail_count = 0
+        self.speculative_solves = {}  # {id(phase): (Process, Connection)}
+        self.callback_stopped = False
+        self.nogoods = {}  # {frozenset(decisions): FailureReason}
+        self.nogood_index = {}  # see _index_nogood
         self.depth_counts = {}
         self.solve_time = 0.0
         self.load_time = 0.0
@@ -1929,6 +2458,222 @@ class Solver(_Common):
 
         return keep_going
 
+    def _add_nogood(self, phase):
+        """Record the split decisions that lead to a failed phase.
+
+        A failure follows from the request, plus the decisions made when
+        splitting the phases that lead to it - each decision restricts a
+        package to a subset of its variants. Any other phase whose packages
+        are restricted to those same subsets (or smaller) has no solution.
+        """
+        if self.learn_nogoods and phase.failure_decisions is not None:
+            self._index_nogood(phase.failure_decisions, phase.failure_reason)
+
+    def _index_nogood(self, decisions, failure_reason):
+        # each nogood is indexed on its most restrictive decision, as
+        # {package-name: {variant-ids: [(decisions, FailureReason)]}}, so that
+        # only nogoods whose indexed decision a phase satisfies are checked
+        if decisions in self.nogoods:
+            return
+        self.nogoods[decisions] = failure_reason
+
+        if not decisions:
+            package_name, variant_ids = None, None
+        else:
+            package_name, variant_ids = min(
+                decisions, key=lambda x: bin(x[1]).count("1"))
+
+        entries = self.nogood_index.setdefault(package_name, {})
+        entries.setdefault(variant_ids, []).append((decisions, failure_reason))
+
+    def _find_nogood(self, phase):
+        """Returns a `KnownConflict` for a nogood contained in `phase`, or
+        None."""
+        if not self.nogoods or phase.status != SolverStatus.pending:
+            return None
+
+        scopes = dict((x.package_name, x) for x in phase.scopes
+                      if not x.package_request.conflict)
+
+        def _contains(package_name, variant_ids):
+            scope = scopes.get(package_name)
+            return (scope is not None and
+                    not (scope.variant_slice.variant_ids & ~variant_ids))
+
+        for package_name, entries in self.nogood_index.iteritems():
+            if package_name is not None and package_name not in scopes:
+                continue
+
+            for variant_ids, nogoods in entries.iteritems():
+                if package_name is not None \
+                        and not _contains(package_name, variant_ids):
+                    continue
+
+                for decisions, failure_reason in nogoods:
+                    if all(_contains(*x) for x in decisions):
+                        return KnownConflict(failure_reason)
+        return None
+
+    def _start_speculative_solves(self):
+        """Solve pending phases lower in the phase stack, in worker processes.
+
+        Each worker solves its phase, and all the phases it splits into, in
+        the same order that solve_step would. When the phase is later popped
+        from the stack, the worker's result is used in place of solving it.
+        """
+        if not self.parallel_workers:
+            return
+
+        for phase in reversed(self.phase_stack[:-1]):
+            if len(self.speculative_solves) >= self.parallel_workers:
+                break
+            if phase.status != SolverStatus.pending \
+                    or id(phase) in self.speculative_solves:
+                continue
+
+            conn, child_conn = multiprocessing.Pipe(duplex=False)
+            proc = multiprocessing.Process(target=self._speculative_solve,
+                                           args=(phase, child_conn))
+            proc.daemon = True
+            proc.start()
+            child_conn.close()
+            self.speculative_solves[id(phase)] = (proc, conn)
+            if self.pr:
+                self.pr("started speculative solve of %s", phase)
+
+    def _speculative_solve(self, phase, conn):
+        # this runs in a forked worker process
+        reset_memcached_clients()
+        self.pr.verbosity = 0
+        nogoods = set(self.nogoods.iterkeys())
+        try:
+            result = self._solve_subtree(phase)
+        except Exception:
+            result = None  # the phase will be solved serially instead
+        else:
+            # return the nogoods learned here, for the parent to use
+            new_nogoods = dict((k, v) for k, v in self.nogoods.iteritems()
+                               if k not in nogoods)
+            result = result + (new_nogoods,)
+        conn.send(result)
+        conn.close()
+
+    def _solve_subtree(self, phase):
+        """Solve a phase, and the phases it splits into, depth first.
+
+        Returns:
+            A (status, path, num_solves, num_fails, failure_reason) tuple. If
+            status is solved or cyclic, path is a tuple of split choices leading
+            to the final phase - 0 for the first phase of a split, 1 for the
+            next phase. Failure_reason is that of the last phase that failed
+            to solve, or of the last pruned phase if all were pruned.
+        """
+        stack = [(phase, ())]
+        num_solves = 0
+        num_fails = 0
+        failure_reason = None
+        known_conflict = None
+
+        while stack:
+            phase, path = stack.pop()
+            if phase.status == SolverStatus.exhausted:
+                phase, next_phase = phase.split()
+                stack.append((next_phase, path + (1,)))
+                path = path + (0,)
+
+            known_conflict_ = self._find_nogood(phase)
+            if known_conflict_ is not None:
+                num_fails += 1
+                known_conflict = known_conflict_
+                continue
+
+            new_phase = phase.solve()
+            num_solves += 1
+
+            if new_phase.status == SolverStatus.failed:
+                self._add_nogood(new_phase)
+                num_fails += 1
+                failure_reason = new_phase.failure_reason
+            elif new_phase.status == SolverStatus.solved:
+                final_phase = new_phase.finalise()
+                return (final_phase.status, path, num_solves, num_fails,
+                        failure_reason)
+            else:
+                stack.append((new_phase, path))
+
+        return (SolverStatus.failed, None, num_solves, num_fails,
+                failure_reason or known_conflict)
+
+    def _get_speculative_result(self, phase):
+        entry = self.speculative_solves.pop(id(phase), None)
+        if entry is None:
+            return None
+
+        # the callback is checked while waiting, so that time limits and
+        # aborts are not delayed until the worker has finished
+        proc, conn = entry
+        result = None
+        try:
+            while not conn.poll(self.speculative_poll_interval):
+                if not self._do_callback():
+                    self.callback_stopped = True
+                    break
+            else:
+                result = conn.recv()
+        except EOFError:
+            pass
+
+        conn.close()
+        if result is None:
+            proc.terminate()
+        proc.join()
+        return result
+
+    def _apply_speculative_result(self, phase, result):
+        """Get the phase that solve_step would have arrived at, given the
+        result of a speculative solve of `phase`."""
+        status, path, num_solves, num_fails, failure_reason, nogoods = result
+        self.solve_count += num_solves
+        for decisions, failure_reason_ in nogoods.iteritems():
+            self._index_nogood(decisions, failure_reason_)
+
+        if status == SolverStatus.failed:
+            # the phase, and every phase it splits into, failed
+            self.speculative_fail_count += max(num_fails - 1, 0)
+            new_phase = copy.copy(phase)
+            new_phase.status = SolverStatus.failed
+            new_phase.failure_reason = failure_reason
+            new_phase.failure_decisions = None
+            if self.pr:
+                self.pr("speculative solve failed after %d solves", num_solves)
+            return new_phase
+
+        # replay the splits leading to the solved phase
+        self.speculative_fail_count += num_fails
+        if self.pr:
+            self.pr("speculative solve succeeded after %d solves, replaying "
+                    "%d splits...", num_solves, len(path))
+
+        for choice in path:
+            phase = phase.solve()
+            assert(phase.status == SolverStatus.exhausted)
+            phase, next_phase = phase.split()
+            if choice:
+                phase = next_phase
+            else:
+                self._push_phase(next_phase)
+
+        new_phase = phase.solve()
+        assert(new_phase.status == SolverStatus.solved)
+        return new_phase
+
+    def _cancel_speculative_solves(self):
+        for proc, conn in self.speculative_solves.itervalues():
+            conn.close()
+            proc.terminate()
+            proc.join()
+        self.speculative_solves = {}
+
     def _get_variant_slice(self, package_name, range):
         start_time = time.time()
         slice_ = self.package_cache.get_variant_slice(package_name=package_name,
@@ -1966,6 +2711,10 @@ class Solver(_Common):
         if st in (SolverStatus.failed, SolverStatus.cyclic):
             fails = fails + self.phase_stack[-1:]
 
+        # pruned phases repeat an earlier failure, and were never solved
+        fails = [x for x in fails
+                 if not isinstance(x.failure_reason, KnownConflict)]
+
         if index is None:
             if st == SolverStatus.cyclic:
                 index = -1
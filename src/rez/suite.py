@@ -7,7 +7,9 @@ from rez.utils.colorize import warning, critical, Printer, alias as alias_col
 from rez.vendor import yaml
 from rez.vendor.yaml.error import YAMLError
 from rez.utils.yaml import dump_yaml
+from rez.config import config
 from collections import defaultdict
+import marshal
 import os
 import os.path
 import shutil
@@ -412,13 +414,16 @@ class Suite(object):
             s.next_priority = 1
         return s
 
-    def save(self, path, verbose=False):
+    def save(self, path, verbose=False, bake=None):
         """Save the suite to disk.
 
         Args:
             path (str): Path to save the suite to. If a suite is already saved
                 at `path`, then it will be overwritten. Otherwise, if `path`
                 exists, an error is raised.
+            bake (bool): If True, bake the environment of each context, so
+                that tools start faster (see `ResolvedContext.get_baked_environ`).
+                If None, the 'suite_bake_environments' config setting is used.
         """
         path = os.path.realpath(path)
         if os.path.exists(path):
@@ -441,6 +446,9 @@ class Suite(object):
             f.write(dump_yaml(data))
 
         # write contexts
+        if bake is None:
+            bake = config.suite_bake_environments
+
         for context_name in self.context_names:
             context = self.context(context_name)
             context._set_parent_suite(path, context_name)
@@ -449,6 +457,9 @@ class Suite(object):
                 print "writing %r..." % filepath
             context.save(filepath)
 
+            if bake:
+                self._bake_context(context, context_name, path, verbose)
+
         # create alias wrappers
         tools_path = os.path.join(path, "bin")
         os.makedirs(tools_path)
@@ -669,6 +680,27 @@ class Suite(object):
         filepath = os.path.join(suite_path, "contexts", "%s.rxt" % name)
         return filepath
 
+    @classmethod
+    def _baked_environ_path(cls, name, suite_path):
+        return os.path.join(suite_path, "contexts", "%s.baked" % name)
+
+    def _bake_context(self, context, name, suite_path, verbose=False):
+        try:
+            data = context.get_baked_environ_data()
+        except ResolvedContextError as e:
+            data = None
+            if verbose:
+                print "not baking %r: %s" % (name, str(e))
+
+        if data is None:
+            return
+
+        filepath = self._baked_environ_path(name, suite_path)
+        if verbose:
+            print "writing %r..." % filepath
+        with open(filepath, "wb") as f:
+            f.write(marshal.dumps(data, 2))
+
     def _sorted_contexts(self):
         return sorted(self.contexts.values(), key=lambda x: x["priority"])
 
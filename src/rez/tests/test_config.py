@@ -8,6 +8,8 @@ from rez.config import Config, get_module_root_config
 from rez.system import system
 from rez.utils.data_utils import RO_AttrDictWrapper
 from rez.packages_ import get_developer_package
+import tempfile
+import shutil
 import os
 import os.path
 
@@ -180,6 +182,84 @@ class TestConfig(TestBase):
         with self.assertRaises(ConfigurationError):
             _ = c.debug_all
 
+    def test_6(self):
+        """Test config snapshots."""
+        path = tempfile.mkdtemp(prefix="rez_selftest_")
+        try:
+            conf = os.path.join(self.config_path, "test1.yaml")
+            conf2 = os.path.join(path, "test2.yaml")
+            snapshot_path = os.path.join(path, "snapshots", "config")
+            filepaths = [self.root_config_file, conf, conf2]
+
+            c = Config(filepaths, snapshot_path=snapshot_path)
+            self.assertEqual(c.warn_all, True)
+            self.assertEqual(c._snapshot["validated"], {"warn_all": True})
+            c._save_snapshot()
+
+            # settings are read from the snapshot
+            c2 = Config(filepaths, snapshot_path=snapshot_path)
+            _ = c2._data
+            self.assertNotEqual(c2._snapshot, None)
+            self.assertEqual(c2.sourced_filepaths, c.sourced_filepaths)
+            self.assertEqual(c2.warn_all, True)
+            self._test_basic(c2)
+            self._test_overrides(c2)
+
+            # an env-var override invalidates the snapshot
+            REZ_WARN_ALL_ = os.environ.get("REZ_WARN_ALL")
+            os.environ["REZ_WARN_ALL"] = "0"
+            try:
+                c3 = Config(filepaths, snapshot_path=snapshot_path)
+                self.assertEqual(c3.warn_all, False)
+                self.assertEqual(c3._snapshot["validated"], {"warn_all": False})
+            finally:
+                if REZ_WARN_ALL_:
+                    os.environ["REZ_WARN_ALL"] = REZ_WARN_ALL_
+                else:
+                    del os.environ["REZ_WARN_ALL"]
+
+            # so does a change to a config file
+            with open(conf2, 'w') as f:
+                f.write("dot_image_format: svg\n")
+            c4 = Config(filepaths, snapshot_path=snapshot_path)
+            self.assertEqual(c4.dot_image_format, "svg")
+            self.assertFalse("warn_all" in c4._snapshot["validated"])
+
+            # settings from a rezconfig.py are never snapshotted
+            conf3 = os.path.join(path, "test3.py")
+            with open(conf3, 'w') as f:
+                f.write("dot_image_format = 'png'\n")
+            snapshot_path2 = os.path.join(path, "snapshots", "config2")
+            c5 = Config(filepaths + [conf3], snapshot_path=snapshot_path2)
+            self.assertEqual(c5.dot_image_format, "png")
+            self.assertEqual(c5._snapshot, None)
+            c5._save_snapshot()
+            self.assertFalse(os.path.exists(snapshot_path2))
+
+            # env-vars referenced in env-var overrides invalidate the snapshot
+            environ = os.environ.copy()
+            snapshot_path3 = os.path.join(path, "snapshots", "config3")
+            try:
+                os.environ["REZ_PACKAGES_PATH"] = "$MYV/pk"
+                for value in ("a", "b"):
+                    os.environ["MYV"] = value
+                    c6 = Config(filepaths, snapshot_path=snapshot_path3)
+                    self.assertEqual(c6.packages_path, ["%s/pk" % value])
+                    c6._save_snapshot()
+            finally:
+                os.environ.clear()
+                os.environ.update(environ)
+
+            # values expanded with system attributes are not snapshotted
+            conf4 = os.path.join(path, "test4.yaml")
+            with open(conf4, 'w') as f:
+                f.write("documentation_url: docs/{system.platform}\n")
+            c7 = Config(filepaths + [conf4], snapshot_path=snapshot_path3)
+            self.assertEqual(c7.documentation_url, "docs/%s" % system.platform)
+            self.assertFalse("documentation_url" in c7._snapshot["validated"])
+        finally:
+            shutil.rmtree(path)
+
 
 if __name__ == '__main__':
     unittest.main()
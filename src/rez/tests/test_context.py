@@ -3,10 +3,23 @@ test resolved contexts
 """
 from rez.tests.util import TestBase, TempdirMixin
 from rez.resolved_context import ResolvedContext
+from rez.utils.local_cache import LocalCache
+from rez.utils.memcached import LRUCache, Client, WriteBehindQueue, \
+    flush_memcached_writes, memcached_client, scoped_instance_manager, \
+    server_health, CachedFunction, cached_functions, _push_function_stats
+from rez.utils.stats import stats
+from rez.utils.data_utils import SourceCode
+from rez.utils import wire_format
+from rez.resolver import ResolverStatus
+from rez.package_repository import package_repository_manager
+from rez.packages_ import get_last_release_time, get_last_release_times
+from rez.config import config
 from rez.bind import hello_world
 from rez.utils.platform_ import platform_
 import rez.vendor.unittest2 as unittest
+from StringIO import StringIO
 import subprocess
+import time
 import os.path
 import os
 
@@ -62,6 +75,280 @@ class TestContext(TestBase, TempdirMixin):
         r2 = ResolvedContext.load(file)
         self.assertEqual(r.resolved_packages, r2.resolved_packages)
 
+    def test_serialize_binary(self):
+        """Test save/load of context in binary format."""
+        file = os.path.join(self.root, "test_binary.rxt")
+        r = ResolvedContext(["hello_world"])
+        r.save(file, binary=True)
+
+        with open(file, 'rb') as f:
+            self.assertTrue(f.read().startswith(ResolvedContext.binary_header))
+
+        # variants are not loaded until needed
+        r2 = ResolvedContext.load(file)
+        self.assertEqual(r2._resolved_packages_, None)
+        self.assertEqual(r.resolved_packages, r2.resolved_packages)
+
+        # convert back to yaml
+        file2 = os.path.join(self.root, "test_yaml.rxt")
+        ResolvedContext.load(file).save(file2, binary=False)
+        r3 = ResolvedContext.load(file2)
+        self.assertEqual(r.resolved_packages, r3.resolved_packages)
+        self.assertEqual(r.to_dict(), r3.to_dict())
+
+    def test_recorded_commands(self):
+        """Test recording and replay of package commands."""
+        cache_path = os.path.join(self.root, "package_file_cache")
+        config.override("local_package_file_cache_path", cache_path)
+        config.override("cache_rex_commands", True)
+        ResolvedContext._recorded_commands.clear()
+
+        r = ResolvedContext(["hello_world"])
+        environ = r.get_environ()
+        self.assertEqual(len(ResolvedContext._recorded_commands), 1)
+        self.assertEqual(r.get_environ(), environ)
+
+        # replay from the local cache
+        ResolvedContext._recorded_commands.clear()
+        self.assertEqual(r.get_environ(), environ)
+        self.assertEqual(len(ResolvedContext._recorded_commands), 1)
+
+        # only commands that cannot differ between contexts are recorded
+        def _recordable(source):
+            pyc = compile(source, "<string>", "exec")
+            return ResolvedContext._commands_are_recordable(pyc)
+
+        self.assertTrue(_recordable("env.PATH.append('{root}/bin')"))
+        self.assertTrue(_recordable("alias('foo', str(len(this.version)))"))
+        self.assertFalse(_recordable("if building:\n    env.FOO = 1"))
+        self.assertFalse(_recordable("env.FOO = resolve.bah.root"))
+        self.assertFalse(_recordable("import time\nenv.FOO = time.time()"))
+        self.assertFalse(_recordable("env.FOO = open('/etc/hosts').read()"))
+
+        # only rex actions are replayed
+        self.assertTrue(ResolvedContext._calls_are_replayable(
+            [("setenv", ("FOO", "1"), {})]))
+        self.assertFalse(ResolvedContext._calls_are_replayable(
+            [("get_output", (), {})]))
+
+    def test_stats(self):
+        """Test timing and counter statistics of a resolve."""
+        r = ResolvedContext(["hello_world"])
+        stats = r.get_stats()
+        self.assertEqual(stats["resolve"]["counts"]["resolve"], 1)
+        self.assertTrue("solver.solve" in stats["resolve"]["times"])
+        self.assertTrue("resolve" in stats["process"]["times"])
+
+        buf = StringIO()
+        r.print_stats(buf=buf)
+        lines = buf.getvalue().split('\n')
+        self.assertTrue("resolve stats:" in lines)
+        self.assertTrue("process stats:" in lines)
+        self.assertTrue(any(x.startswith("solver.solve ") for x in lines))
+
+    def test_local_resolve_cache(self):
+        """Test resolve caching in a local directory."""
+        cache_path = os.path.join(self.root, "resolve_cache")
+        config.override("resolve_caching", True)
+        config.override("resolve_cache_backend", "local")
+        config.override("resolve_cache_path", cache_path)
+
+        r = ResolvedContext(["hello_world"])
+        self.assertFalse(r.from_cache)
+        r2 = ResolvedContext(["hello_world"])
+        self.assertTrue(r2.from_cache)
+        self.assertEqual(r.resolved_packages, r2.resolved_packages)
+        r3 = ResolvedContext(["hello_world"], timestamp=(r.created + 1))
+        self.assertTrue(r3.from_cache)
+
+        # a cached resolve is discarded if a package in it changes
+        variant = r.resolved_packages[0]
+        t = int(os.path.getmtime(variant.parent.uri)) + 10
+        os.utime(variant.parent.uri, (t, t))
+        package_repository_manager.clear_caches()
+        r4 = ResolvedContext(["hello_world"])
+        self.assertFalse(r4.from_cache)
+
+        # cached resolves are validated with bulk release time queries
+        self.assertEqual(get_last_release_times(["hello_world", "missing"]),
+                         {"hello_world": get_last_release_time("hello_world"),
+                          "missing": 0})
+
+        # least recently used entries are evicted beyond the maximum size
+        max_size = 256 * 1000
+        cache = LocalCache(cache_path, max_size=max_size)
+        cache.evict_interval = 1
+        cache.flush()
+        for i in range(1000):
+            cache.set(str(i), 'x' * 500)
+        self.assertEqual(cache.get("999"), 'x' * 500)
+        self.assertFalse(cache.get("missing"))
+        self.assertTrue(cache.get_size() <= max_size)
+
+        # shards are only checked on some sets
+        cache.evict_interval = 1000000
+        cache.set("big", 'x' * max_size)
+        self.assertTrue(cache.get_size() > max_size)
+        cache.evict_interval = 1
+        cache.set("big", 'x' * 500)
+
+        # a hit only updates the entry's mtime if it is old
+        filepath = cache._get_filepath(cache._qualified_key("999"))
+        t = int(time.time()) - 10
+        os.utime(filepath, (t, t))
+        cache.get("999")
+        self.assertEqual(int(os.path.getmtime(filepath)), t)
+        os.utime(filepath, (0, 0))
+        cache.get("999")
+        self.assertTrue(os.path.getmtime(filepath) > t)
+
+        # the cache is private, and is ignored if anyone else can write to it
+        self.assertFalse(os.stat(cache_path).st_mode & 0077)
+        os.chmod(cache_path, 0777)
+        try:
+            cache = LocalCache(cache_path)
+            self.assertFalse(cache.get("999"))
+            cache.set("foo", 1)
+            self.assertFalse(cache.get("foo"))
+        finally:
+            os.chmod(cache_path, 0700)
+        self.assertEqual(LocalCache(cache_path).get("999"), 'x' * 500)
+
+    def test_lru_cache(self):
+        """Test the in-process cache used in front of memcached."""
+        cache = LRUCache(2)
+        value = ["a"]
+        cache.set("a", value)
+        value.append("b")
+        self.assertEqual(cache.get("a"), ["a"])
+
+        # least recently used entries are evicted
+        cache.set("b", 1)
+        cache.get("a")
+        cache.set("c", 2)
+        self.assertEqual(cache.get("b"), cache.miss)
+        self.assertEqual(cache.get("a"), ["a"])
+        self.assertEqual(cache.get("c"), 2)
+
+        # entries expire
+        cache.ttl = -1
+        cache.set("d", 3)
+        self.assertEqual(cache.get("d"), cache.miss)
+
+    def test_write_behind(self):
+        """Test storing memcached values in the background."""
+        queue = WriteBehindQueue(max_size=10)
+        queue.flush()  # nothing queued
+
+        # no server is listening, so writes fail, but must not raise
+        start = stats.counts.get("memcache.write_behind.set", 0)
+        for i in range(3):
+            self.assertTrue(queue.put(["127.0.0.1:1"], "set",
+                                      dict(key=str(i), val=i)))
+        queue.flush()
+        self.assertEqual(stats.counts["memcache.write_behind.set"], start + 3)
+
+        # (key, value) entries are encoded by the queue's thread
+        kwargs = dict(key="foo", val=("foo", {"a": 1}))
+        self.assertTrue(queue.put(["127.0.0.1:1"], "set", kwargs, pack=True))
+        queue.flush()
+        self.assertEqual(kwargs["val"], Client._pack("foo", {"a": 1}))
+
+        # a client with write-behind queues its sets
+        client = Client(["127.0.0.1:1"], write_behind=True)
+        start = stats.counts.get("memcache.write_behind.queued", 0)
+        client.set("foo", 1)
+        self.assertEqual(client.set_multi({"foo": 1, "bah": 2}), [])
+        self.assertEqual(stats.counts["memcache.write_behind.queued"], start + 2)
+        flush_memcached_writes()
+
+    def test_function_stats(self):
+        """Test pushing memcached function statistics on exit."""
+        func = CachedFunction("test_function_stats", ["127.0.0.1:1"])
+        func.counts["hits"] = 2
+        cached_functions[func.name] = func
+
+        try:
+            # disabled by default - nothing is sent to the server
+            _push_function_stats()
+            self.assertEqual(func.counts["hits"], 2)
+
+            config.override("memcached_function_stats", True)
+            _push_function_stats()
+            self.assertEqual(func.counts["hits"], 0)
+        finally:
+            config.remove_override("memcached_function_stats")
+            del cached_functions[func.name]
+
+    def test_wire_format(self):
+        """Test the encoding of cache entries."""
+        data = {"status": ResolverStatus.solved,
+                "commands": [SourceCode("env.FOO = 1")],
+                "handles": [{"location": "/packages", "name": u"foo"},
+                            {"location": "/packages", "name": "bah"}],
+                "times": (1, 2L, 3.5, None, True),
+                "names": set(["foo", "bah"])}
+        value = ("key", data)
+        self.assertEqual(wire_format.loads(wire_format.dumps(value)), value)
+        self.assertEqual(wire_format.loads(wire_format.dumps(SourceCode("x"))),
+                         SourceCode("x"))
+
+        # the resolve graph is stored
+        r = ResolvedContext(["hello_world"])
+        graph = r.graph()
+        graph_ = wire_format.loads(wire_format.dumps({"graph": graph}))["graph"]
+        self.assertEqual(sorted(graph_.nodes()), sorted(graph.nodes()))
+        self.assertEqual(sorted(graph_.edges()), sorted(graph.edges()))
+
+        # other objects are not encoded, and the client pickles them instead
+        for value_ in (object(), [Exception()], (SourceCode("x"),)):
+            self.assertRaises(ValueError, wire_format.dumps, value_)
+        self.assertEqual(Client._unpack(Client._pack("key", object))[1], object)
+        self.assertEqual(Client._unpack(Client._pack("key", data)), value)
+
+        self.assertRaises(ValueError, wire_format.loads, "not encoded")
+        self.assertEqual(Client._unpack("not encoded"), None)
+
+    def test_server_health(self):
+        """Test that failed memcached servers are skipped."""
+        server = "127.0.0.1:1"  # nothing is listening
+        server_health.reset()
+        self.addCleanup(server_health.reset)
+
+        client = Client([server])
+        self.assertEqual(client.get("foo"), client.miss)
+        self.assertTrue(server_health.is_down(server))
+        self.assertEqual(server_health.get_status(server)["failures"], 1)
+
+        # other clients skip the server, rather than trying it again
+        start = stats.counts.get("memcache.server_failures", 0)
+        self.assertEqual(Client([server]).get("foo"), client.miss)
+        self.assertEqual(stats.counts["memcache.server_failures"], start)
+
+        # the back-off interval doubles with each failure, up to a maximum
+        config.override("memcached_retry_interval", 10)
+        config.override("memcached_max_retry_interval", 30)
+        server_health.reset()
+        intervals = []
+        for i in range(4):
+            server_health.record_failure(server, "test")
+            down_until = server_health.get_status(server)["down_until"]
+            intervals.append(int(round(down_until - time.time())))
+        self.assertEqual(intervals, [10, 20, 30, 30])
+
+        server_health.record_success(server)
+        self.assertFalse(server_health.is_down(server))
+
+        # connections can be kept between scopes
+        config.override("memcached_keep_connections", True)
+        with memcached_client([server]) as client:
+            pass
+        with memcached_client([server]) as client_:
+            self.assertTrue(client_ is client)
+        key = ((server,), config.debug_memcache)
+        self.assertTrue(key in scoped_instance_manager.clients)
+        del scoped_instance_manager.clients[key]
+
 
 if __name__ == '__main__':
     unittest.main()
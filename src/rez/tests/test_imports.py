@@ -3,6 +3,10 @@ test importing of all source
 """
 from rez.tests.util import TestBase
 import rez.vendor.unittest2 as unittest
+import subprocess
+import sys
+import os.path
+import os
 
 
 class TestImports(TestBase):
@@ -50,6 +54,27 @@ class TestImports(TestBase):
         import rez.utils.memcached
         import rez.utils.yaml
 
+    def test_2(self):
+        """Test that heavy modules are not imported on startup."""
+        import rez
+        env = os.environ.copy()
+        env["PYTHONPATH"] = os.path.dirname(rez.module_root_path)
+
+        code = ("import sys; sys.argv = ['rez', 'env', '--help']; "
+                "from rez.cli._main import run\n"
+                "try: run()\n"
+                "except SystemExit: pass\n"
+                "print >> sys.stderr, ' '.join(sys.modules)")
+        p = subprocess.Popen([sys.executable, "-c", code], env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        _, err = p.communicate()
+        modules = err.split()
+
+        self.assertTrue("rez.cli.env" in modules)
+        for module in ("rez.vendor.yaml", "rez.vendor.pyparsing",
+                       "rez.resolved_context"):
+            self.assertFalse(module in modules)
+
 
 if __name__ == '__main__':
     unittest.main()
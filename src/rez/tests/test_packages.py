@@ -2,14 +2,22 @@
 test package iteration and serialization
 """
 from rez.packages_ import iter_package_families, iter_packages, get_package, \
-    create_package, get_developer_package
+    create_package, get_developer_package, preload_packages
 from rez.package_resources_ import package_release_keys
-from rez.package_repository import create_memory_package_repository
+from rez.package_repository import create_memory_package_repository, \
+    package_repository_manager
+from rez.solver import Solver, SolverStatus
+from rez.serialise import FileFormat, load_from_file, load_from_files, \
+    _load_from_file__key, _get_local_cache, file_digests
+from rez.utils.local_cache import LocalCache
+from rez.config import config
 from rez.tests.util import TestBase, TempdirMixin
 from rez.utils.formatting import PackageRequest
 from rez.utils.data_utils import SourceCode
+from rez.utils.stats import stats
 import rez.vendor.unittest2 as unittest
 from rez.vendor.version.version import Version
+import shutil
 import os.path
 import os
 
@@ -259,6 +267,173 @@ class TestPackages(TestBase, TempdirMixin):
             data_ = _data(installed_package)
             self.assertDictEqual(data, data_)
 
+        # installing should have indexed the package's variants
+        repo = package_repository_manager.get_repository(repo_path)
+        installed_package = get_package("foo", "3.0.1", paths=[repo_path])
+        entries = repo.get_indexed_variants(installed_package.resource)
+        self.assertEqual(len(entries), len(installed_package.variants))
+
+    def test_8(self):
+        """test the filesystem repository variant index."""
+        repo_path = os.path.join(self.root, "indexed_packages")
+        if os.path.exists(repo_path):
+            shutil.rmtree(repo_path)
+        shutil.copytree(self.solver_packages_path, repo_path)
+        shutil.copytree(os.path.join(self.py_packages_path, "variants_py"),
+                        os.path.join(repo_path, "variants_py"))
+
+        repo = package_repository_manager.get_repository(repo_path)
+        repo.clear_caches()
+        package = get_package("variants_py", "2.0", paths=[repo_path])
+        self.assertEqual(repo.get_indexed_variants(package.resource), None)
+
+        repo.update_variant_index()
+        repo.clear_caches()
+
+        # check index entries match the variants loaded from disk
+        for package in iter_packages("variants_py", paths=[repo_path]):
+            entries = repo.get_indexed_variants(package.resource)
+            variants = list(package.iter_variants())
+            self.assertEqual(len(entries), len(variants))
+
+            for (handle, requires, _), variant in zip(entries, variants):
+                self.assertEqual(handle, variant.handle)
+                self.assertEqual(requires, [str(x) for x in variant.requires])
+
+        # resolve from the index, without loading any packages
+        loaded = []
+        reqs = [PackageRequest("pyfoo"), PackageRequest("pybah")]
+        s = Solver(reqs, [repo_path], package_load_callback=loaded.append)
+        s.solve()
+        self.assertEqual(s.status, SolverStatus.solved)
+        self.assertEqual(loaded, [])
+
+        s_ = Solver(reqs, [self.solver_packages_path])
+        s_.solve()
+        self.assertEqual([str(x) for x in s.resolved_packages],
+                         [str(x) for x in s_.resolved_packages])
+
+        # an in-place edit to a package invalidates its index entry..
+        def _resolve(reqs):
+            s = Solver([PackageRequest(x) for x in reqs], [repo_path])
+            s.solve()
+            return [str(x) for x in s.resolved_packages]
+
+        self.assertEqual(_resolve(["pyfoo"]),
+                         ["python-2.6.8[]", "pyfoo-3.1.0[]"])
+        with open(os.path.join(repo_path, "pyfoo", "3.1.0", "package.py"),
+                  'w') as f:
+            f.write("name = 'pyfoo'\nversion = '3.1.0'\n"
+                    "requires = ['python-2.7.0']\n")
+        package_repository_manager.clear_caches()
+        self.assertEqual(_resolve(["pyfoo"]),
+                         ["python-2.7.0[]", "pyfoo-3.1.0[]"])
+
+        # ..but only for that package, the rest of the family is still indexed
+        repo.clear_caches()
+        package = get_package("pyfoo", "3.1.0", paths=[repo_path])
+        self.assertEqual(repo.get_indexed_variants(package.resource), None)
+        package = get_package("pyfoo", "3.0.0", paths=[repo_path])
+        self.assertNotEqual(repo.get_indexed_variants(package.resource), None)
+
+        repo.update_variant_index()
+        repo.clear_caches()
+        package = get_package("pyfoo", "3.1.0", paths=[repo_path])
+        self.assertEqual(repo.get_indexed_variants(package.resource)[0][1],
+                         ["python-2.7.0"])
+
+        # a change to a family invalidates its index entry
+        os.utime(os.path.join(repo_path, "pyfoo"), (0, 0))
+        repo.clear_caches()
+        package = get_package("pyfoo", "3.1.0", paths=[repo_path])
+        self.assertEqual(repo.get_indexed_variants(package.resource), None)
+
+    def test_9(self):
+        """test package file cache keys."""
+        def _key(filepath):
+            return _load_from_file__key(filepath, format_=FileFormat.py,
+                                        update_data_callback=None)
+
+        config.override("local_package_file_cache_path",
+                        os.path.join(self.root, "digest_cache"))
+
+        def _write(filepath, content):
+            with open(filepath, 'w') as f:
+                f.write(content)
+
+        filepath = os.path.join(self.root, "package_a.py")
+        filepath2 = os.path.join(self.root, "package_b.py")
+        _write(filepath, "name = 'foo'\n")
+        _write(filepath2, "name = 'foo'\n")
+
+        # identical files share a key, and reading or touching a file does not
+        # change its key
+        key = _key(filepath)
+        self.assertEqual(_key(filepath2), key)
+        os.utime(filepath, (0, 0))
+        self.assertEqual(_key(filepath), key)
+
+        # digests are kept in the local cache, so a new process does not have
+        # to read the file
+        file_digests.clear()
+        hits = stats.counts.get("local_cache.hits", 0)
+        self.assertEqual(_key(filepath), key)
+        self.assertEqual(stats.counts["local_cache.hits"], hits + 1)
+
+        # a change in content does
+        _write(filepath, "name = 'bah'\n")
+        os.utime(filepath, (1, 1))
+        self.assertNotEqual(_key(filepath), key)
+
+    def test_10(self):
+        """test the local package file cache."""
+        cache_path = os.path.join(self.root, "package_file_cache")
+        config.override("local_package_file_cache_path", cache_path)
+
+        filepath = os.path.join(self.root, "package_c.py")
+        with open(filepath, 'w') as f:
+            f.write("name = 'foo'\ndef commands():\n    env.FOO = 1\n")
+
+        data = load_from_file(filepath, FileFormat.py)
+        self.assertTrue(LocalCache(cache_path).get_size() > 0)
+        self.assertTrue(_get_local_cache() is _get_local_cache())
+        self.assertEqual(_get_local_cache().path, cache_path)
+        self.assertEqual(load_from_file(filepath, FileFormat.py), data)
+
+        # a change to the file is seen
+        with open(filepath, 'w') as f:
+            f.write("name = 'bah'\n")
+        os.utime(filepath, (1, 1))
+        self.assertEqual(load_from_file(filepath, FileFormat.py),
+                         {"name": "bah"})
+
+    def test_11(self):
+        """test bulk loading of package files."""
+        config.override("memcached_uri", ["127.0.0.1:11211"])
+        packages = list(iter_packages("pyfoo",
+                                      paths=[self.solver_packages_path]))
+        entries = [(x.resource.filepath, x.resource.file_format)
+                   for x in packages]
+        self.assertTrue(len(entries) > 1)
+
+        results = load_from_files(entries)
+        self.assertEqual(results, [load_from_file(*x) for x in entries])
+
+        repo = package_repository_manager.get_repository(
+            self.solver_packages_path)
+        repo.clear_caches()
+        packages = list(iter_packages("pyfoo",
+                                      paths=[self.solver_packages_path]))
+        preload_packages(packages)
+        for package in packages:
+            self.assertTrue("_preloaded_data" in package.resource.__dict__)
+
+        # preloaded data is used on first access
+        resource = packages[0].resource
+        data = load_from_file(resource.filepath, resource.file_format)
+        self.assertEqual(resource._data, data)
+        self.assertFalse("_preloaded_data" in resource.__dict__)
+
 
 class TestMemoryPackages(TestBase):
     def test_1_memory_variant_parent(self):
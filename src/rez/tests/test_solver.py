@@ -2,10 +2,16 @@
 test dependency resolving algorithm
 """
 from rez.vendor.version.requirement import Requirement
-from rez.solver import Solver, Cycle, SolverStatus
+from rez.vendor.version.version import VersionRange
+from rez.solver import Solver, Cycle, SolverStatus, PackageVariantCache, \
+    SolverCallbackReturn, KnownConflict
+from rez.benchmark import BenchmarkRepository, run_benchmark
 import rez.vendor.unittest2 as unittest
 from rez.tests.util import TestBase
 import itertools
+import time
+import tempfile
+import shutil
 import os.path
 
 
@@ -195,6 +201,323 @@ class TestSolver(TestBase):
         s = self._fail("pymum-2")
         self.assertFalse(isinstance(s.failure_reason(), Cycle))
 
+    def test_9(self):
+        """Variant slice operations."""
+        cache = PackageVariantCache(self.packages_path)
+        slice_ = cache.get_variant_slice("pybah", VersionRange())
+        self.assertEqual(len(slice_), 2)
+        self.assertEqual(str(slice_.range), "==4|==5")
+        self.assertEqual(slice_.common_fams, set(["python"]))
+        self.assertTrue(slice_.extractable)
+
+        # slices of the same range share the same variant table
+        slice2 = cache.get_variant_slice("pybah", VersionRange())
+        self.assertTrue(slice2.table is slice_.table)
+
+        slice2 = slice_.intersect(VersionRange("5"))
+        self.assertEqual([str(x) for x in slice2.variants], ["pybah-5[]"])
+        self.assertTrue(slice_.intersect(VersionRange("6")) is None)
+
+        slice2, reductions = slice_.reduce_by(Requirement("python-2.6"))
+        self.assertEqual([str(x) for x in slice2.variants], ["pybah-4[]"])
+        self.assertEqual(len(reductions), 1)
+        self.assertTrue(slice_.reduce_by(Requirement("foo-1"))[0] is slice_)
+
+        slice2, req = slice_.extract()
+        self.assertEqual(str(req), "python-2.5|2.6")
+        self.assertFalse(slice2.extractable)
+
+        slice2, next_slice = slice_.split([Requirement("pybah")])
+        self.assertEqual(str(slice2), "[pybah==5]*")
+        self.assertEqual(str(next_slice), "[pybah==4]*")
+
+    def test_10(self):
+        """Reduction memo."""
+        cache = PackageVariantCache(self.packages_path)
+        slice_ = cache.get_variant_slice("pybah", VersionRange())
+        slice2, reductions = slice_.reduce_by(Requirement("python-2.6"))
+        self.assertEqual(cache.reduction_memo.hits, 0)
+
+        # an equivalent slice reduced by an equal request hits the memo
+        slice_ = cache.get_variant_slice("pybah", VersionRange())
+        slice3, reductions2 = slice_.reduce_by(Requirement("python-2.6"))
+        self.assertEqual(cache.reduction_memo.hits, 1)
+        self.assertEqual(slice3.variants, slice2.variants)
+        self.assertEqual(reductions2, reductions)
+
+        s = self._solve(["pyfoo", "pybah"],
+                        ["python-2.6.8[]", "pyfoo-3.1.0[]", "pybah-4[]"])
+        self.assertTrue(s.num_reductions >= s.num_memoized_reductions)
+
+    def _write_hard_repository(self, packages_path, n=5):
+        # a 'hard' repository - every combination of 'a' and 'b' versions
+        # conflicts, except a-1/b-1, and b-1 conflicts with all but c-1. Each
+        # version of 'c' therefore repeats the same failures.
+        def _write(name, version, requires):
+            path = os.path.join(packages_path, name, version)
+            os.makedirs(path)
+            with open(os.path.join(path, "package.py"), 'w') as f:
+                f.write("name = %r\nversion = %r\nrequires = %r\n"
+                        % (name, version, requires))
+
+        for i in range(1, n + 1):
+            conflicts = ["!m%d" % x for x in range(2, n + 1)]
+            _write("a", str(i), ["m%d" % i])
+            _write("b", str(i), conflicts + (["e"] if i == 1 else ["!m1"]))
+            _write("c", str(i), ["n%d" % i])
+            _write("m%d" % i, "1", [])
+            _write("n%d" % i, "1", [])
+        _write("e", "1", ["!n%d" % x for x in range(2, n + 1)])
+
+    def test_11(self):
+        """Nogood learning."""
+        packages_path = tempfile.mkdtemp(prefix="rez_selftest_")
+        try:
+            self._write_hard_repository(packages_path)
+            reqs = [Requirement(x) for x in ("c", "a", "b")]
+            s1 = Solver(reqs, [packages_path], learn_nogoods=True)
+            s2 = Solver(reqs, [packages_path], learn_nogoods=False)
+            s1.solve()
+            s2.solve()
+        finally:
+            shutil.rmtree(packages_path)
+
+        self.assertEqual(s1.status, SolverStatus.solved)
+        resolve = [str(x) for x in s1.resolved_packages]
+        self.assertEqual(resolve, [str(x) for x in s2.resolved_packages])
+        self.assertEqual(set(resolve), set(["a-1[]", "b-1[]", "c-1[]", "e-1[]",
+                                            "m1-1[]", "n1-1[]"]))
+        self.assertTrue(s1.num_pruned > 0)
+        self.assertEqual(s2.num_pruned, 0)
+        self.assertTrue(s1.num_solves < s2.num_solves)
+
+        # each nogood is indexed once
+        indexed = [x[0] for entries in s1.nogood_index.itervalues()
+                   for nogoods in entries.itervalues() for x in nogoods]
+        self.assertEqual(len(indexed), len(s1.nogoods))
+        self.assertEqual(set(indexed), set(s1.nogoods))
+
+        # pruned phases refer to the nogood that pruned them, and are not
+        # reported as failures
+        pruned = [x for x in s1.failed_phase_list
+                  if isinstance(x.failure_reason, KnownConflict)]
+        self.assertEqual(len(pruned), s1.num_pruned)
+        num_failures = s1.num_fails - s1.num_pruned
+        for i in range(num_failures):
+            self.assertFalse(isinstance(s1.failure_reason(i), KnownConflict))
+            s1.get_fail_graph(i)
+        with self.assertRaises(IndexError):
+            s1.failure_reason(num_failures)
+
+    def test_12(self):
+        """Parallel solving gives the same results as serial solving."""
+        def _solve(packages_path, reqs, **kwargs):
+            s = Solver([Requirement(x) for x in reqs], [packages_path],
+                       **kwargs)
+            s.solve()
+            resolve = [str(x) for x in (s.resolved_packages or [])]
+            fail = s.failure_description() if resolve == [] else None
+            return s.status, resolve, fail
+
+        def _test(packages_path, reqs):
+            expected = _solve(packages_path, reqs, parallel_workers=0)
+            for learn_nogoods in (True, False):
+                result = _solve(packages_path, reqs, parallel_workers=2,
+                                learn_nogoods=learn_nogoods)
+                self.assertEqual(result, expected)
+
+        packages_path = tempfile.mkdtemp(prefix="rez_selftest_")
+        try:
+            self._write_hard_repository(packages_path)
+            _test(packages_path, ["c", "a", "b"])
+            _test(packages_path, ["c-2+", "a", "b"])
+        finally:
+            shutil.rmtree(packages_path)
+
+        _test(self.packages_path[0], ["pyfoo", "pybah"])
+        _test(self.packages_path[0], ["pymum-1"])
+        _test(self.packages_path[0], ["pymum-2"])
+        _test(self.packages_path[0], ["python", "bahish", "pybah"])
+
+    def test_13(self):
+        """Solver benchmark."""
+        repo = BenchmarkRepository(num_families=12, num_versions=4,
+                                   num_variants=2, seed=1)
+        requests = repo.get_requests(num_requests=4, request_size=3)
+        self.assertEqual(repo.data, BenchmarkRepository(
+            num_families=12, num_versions=4, num_variants=2, seed=1).data)
+
+        path = repo.create_memory_repository()
+        result = run_benchmark([path], requests)
+        self.assertEqual(len(result["requests"]), 4)
+        self.assertEqual(result["totals"]["num_solves"],
+                         sum(x["num_solves"] for x in result["requests"]))
+
+        packages_path = tempfile.mkdtemp(prefix="rez_selftest_")
+        try:
+            repo.write_filesystem_repository(packages_path)
+            result2 = run_benchmark([packages_path], requests)
+        finally:
+            shutil.rmtree(packages_path)
+
+        statuses = [x["status"] for x in result["requests"]]
+        self.assertEqual(statuses, [x["status"] for x in result2["requests"]])
+
+    def test_14(self):
+        """Seeded solving."""
+        def _solve(reqs, seed_variants=None):
+            s = Solver([Requirement(x) for x in reqs], self.packages_path,
+                       seed_variants=seed_variants)
+            s.solve()
+            self.assertEqual(s.status, SolverStatus.solved)
+            return s
+
+        s = _solve(["pyfoo", "pybah"])
+        seed_variants = s.resolved_packages
+
+        # the seed variant is preferred over the latest version...
+        s2 = _solve(["python"], seed_variants)
+        self.assertEqual([str(x) for x in s2.resolved_packages],
+                         ["python-2.6.8[]"])
+
+        # ...unless the request excludes it
+        s2 = _solve(["python-2.7"], seed_variants)
+        self.assertEqual([str(x) for x in s2.resolved_packages],
+                         ["python-2.7.0[]"])
+
+        # a seeded solve of a changed request is still a valid resolve
+        s2 = _solve(["pyfoo", "pybah", "bahish"], seed_variants)
+        s3 = _solve(["pyfoo", "pybah", "bahish"])
+        self.assertEqual([str(x) for x in s2.resolved_packages],
+                         [str(x) for x in s3.resolved_packages])
+
+    def test_15(self):
+        """Resolves match the list-based solver on a benchmark corpus."""
+        # results recorded from the solver before variant tables were added,
+        # for requests whose resolve depends on the order of extractions
+        corpus = [
+            (dict(num_families=25, num_versions=8, conflict_density=0.2,
+                  seed=0),
+             "pkg002 pkg004 pkg008 pkg010",
+             "pkg024-8.0[] pkg023-8.0[] pkg022-8.0[] pkg021-8.0[] "
+             "pkg008-8.0[] pkg020-7.0[] pkg005-7.0[] pkg018-8.0[] "
+             "pkg016-8.0[] pkg014-8.0[] pkg019-7.0[] pkg007-8.0[] "
+             "pkg003-6.0[] pkg002-8.0[] pkg004-8.0[] pkg017-8.0[] "
+             "pkg015-8.0[] pkg013-7.0[] pkg010-7.0[]"),
+            (dict(num_families=25, num_versions=8, conflict_density=0.2,
+                  seed=2),
+             "pkg002 pkg006 pkg008 pkg010",
+             "pkg024-8.0[] pkg023-6.0[] pkg022-8.0[] pkg021-8.0[] "
+             "pkg019-8.0[] pkg013-8.0[] pkg020-8.0[] pkg018-5.0[] "
+             "pkg016-7.0[] pkg015-8.0[] pkg002-8.0[] pkg011-7.0[] "
+             "pkg007-8.0[] pkg006-8.0[] pkg008-8.0[] pkg017-8.0[] "
+             "pkg010-8.0[]"),
+            (dict(num_families=25, num_versions=8, conflict_density=0.2,
+                  seed=2),
+             "pkg000 pkg001 pkg002 pkg003",
+             "pkg024-8.0[] pkg023-8.0[] pkg022-8.0[] pkg021-8.0[] "
+             "pkg019-3.0[] pkg018-7.0[] pkg016-8.0[] pkg020-8.0[] "
+             "pkg008-8.0[] pkg000-8.0[] pkg011-8.0[] pkg007-8.0[] "
+             "pkg001-8.0[] pkg013-8.0[] pkg015-8.0[] pkg002-8.0[] "
+             "pkg014-8.0[] pkg012-5.0[] pkg003-8.0[]"),
+            (dict(num_families=30, num_versions=6, num_variants=3,
+                  conflict_density=0.8, seed=1),
+             "pkg006 pkg007 pkg008 pkg009",
+             "The following package conflicts occurred: "
+             "(pkg027-3 <--!--> pkg027==4.0|==5.0|==6.0)")]
+
+        for kwargs, request, expected in corpus:
+            packages_path = tempfile.mkdtemp(prefix="rez_selftest_")
+            try:
+                repo = BenchmarkRepository(**kwargs)
+                repo.write_filesystem_repository(packages_path)
+                s = Solver([Requirement(x) for x in request.split()],
+                           [packages_path])
+                s.solve()
+            finally:
+                shutil.rmtree(packages_path)
+
+            if s.status == SolverStatus.solved:
+                result = ' '.join(str(x) for x in s.resolved_packages)
+            else:
+                result = s.failure_description()
+            self.assertEqual(result, expected)
+
+    def test_16(self):
+        """Parallel solving reports failed subtrees as single failures."""
+        def _solve(packages_path, reqs, parallel_workers):
+            callback_fails = []
+
+            def _callback(state):
+                callback_fails.append(state.num_fails)
+                return SolverCallbackReturn.keep_going, ''
+
+            s = Solver([Requirement(x) for x in reqs], [packages_path],
+                       parallel_workers=parallel_workers, learn_nogoods=False,
+                       callback=_callback)
+            s.solve()
+            return s, callback_fails
+
+        packages_path = tempfile.mkdtemp(prefix="rez_selftest_")
+        try:
+            self._write_hard_repository(packages_path)
+            for reqs in (["c", "a", "b"], ["c-2+", "a", "b"]):
+                s, callback_fails = _solve(packages_path, reqs, 0)
+                s2, callback_fails2 = _solve(packages_path, reqs, 2)
+
+                # every failure is counted...
+                self.assertEqual(s2.status, s.status)
+                self.assertEqual(s2.num_solves, s.num_solves)
+                self.assertEqual(s2.num_fails, s.num_fails)
+                self.assertEqual(s2.failure_description(0),
+                                 s.failure_description(0))
+
+                # ...but failed subtrees are single failed phases and callbacks
+                self.assertTrue(len(s2.failed_phase_list)
+                                < len(s.failed_phase_list))
+                self.assertTrue(len(callback_fails2) < len(callback_fails))
+        finally:
+            shutil.rmtree(packages_path)
+
+    def test_17(self):
+        """Parallel solving keeps worker nogoods, and checks the callback."""
+        class _SlowSolver(Solver):
+            speculative_poll_interval = 0.01
+
+            def _solve_subtree(self, phase):
+                time.sleep(10)
+                return Solver._solve_subtree(self, phase)
+
+        def _callback(state):
+            callbacks.append(state)
+            if len(callbacks) > 5:
+                return SolverCallbackReturn.abort, "stopped"
+            return SolverCallbackReturn.keep_going, ''
+
+        packages_path = tempfile.mkdtemp(prefix="rez_selftest_")
+        try:
+            self._write_hard_repository(packages_path, n=7)
+            reqs = [Requirement(x) for x in ("c", "a", "b")]
+
+            # nogoods learned by workers are used by the parent
+            s = Solver(reqs, [packages_path], parallel_workers=0)
+            s2 = Solver(reqs, [packages_path], parallel_workers=2)
+            s.solve()
+            s2.solve()
+            self.assertEqual(set(s2.nogoods), set(s.nogoods))
+
+            # the callback can stop the solve while a worker is busy
+            callbacks = []
+            start_time = time.time()
+            s3 = _SlowSolver(reqs, [packages_path], parallel_workers=2,
+                             callback=_callback)
+            s3.solve()
+            self.assertTrue(time.time() - start_time < 5)
+            self.assertEqual(s3.status, SolverStatus.unsolved)
+            self.assertEqual(s3.abort_reason, "stopped")
+        finally:
+            shutil.rmtree(packages_path)
+
 
 if __name__ == '__main__':
     unittest.main()
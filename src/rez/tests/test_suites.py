@@ -5,6 +5,7 @@ from rez.tests.util import TestBase, TempdirMixin
 from rez.resolved_context import ResolvedContext
 from rez.suite import Suite
 import rez.vendor.unittest2 as unittest
+import marshal
 import uuid
 import os.path
 
@@ -135,6 +136,38 @@ class TestRezSuites(TestBase, TempdirMixin):
 
         self._test_serialization(s)
 
+    def test_4(self):
+        """Test baked environments in a suite."""
+        c_foo = ResolvedContext(["foo"])
+        s = Suite()
+        s.add_context("foo", c_foo)
+
+        path = os.path.join(self.root, "suite_baked")
+        s.save(path, bake=True)
+        filepath = Suite._baked_environ_path("foo", path)
+        self.assertTrue(os.path.isfile(filepath))
+        with open(filepath, "rb") as f:
+            data = marshal.loads(f.read())
+
+        parent_environ = {"PATH": "/usr/bin", "HOME": "/home/foo"}
+        context = Suite.load(path).context("foo")
+        environ = context.get_baked_environ(data, parent_environ)
+        expected_environ = context.get_environ(parent_environ)
+        self.assertEqual(environ["HOME"], "/home/foo")
+        for key, value in expected_environ.iteritems():
+            self.assertEqual(environ[key], value)
+
+        # a change to any package invalidates the baked environment
+        data["variant_states"] = ["0"] * len(data["variant_states"])
+        self.assertEqual(context.get_baked_environ(data, parent_environ), None)
+
+        # aliases need a shell, so a context that defines any is not baked
+        packages_path = os.path.join(os.path.dirname(__file__), "data",
+                                     "commands", "packages")
+        c_rextest = ResolvedContext(["rextest-1.3"],
+                                    package_paths=[packages_path])
+        self.assertEqual(c_rextest.get_baked_environ_data(), None)
+
 
 if __name__ == '__main__':
     unittest.main()
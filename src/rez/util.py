@@ -8,7 +8,6 @@ import os
 import os.path
 import copy
 from rez.exceptions import RezError
-from rez.utils.yaml import dump_yaml
 from rez.vendor.progress.bar import Bar
 
 
@@ -82,6 +81,7 @@ def create_forwarding_script(filepath, module, func_name, *nargs, **kwargs):
     if kwargs:
         doc["kwargs"] = kwargs
 
+    from rez.utils.yaml import dump_yaml
     body = dump_yaml(doc)
     create_executable_script(filepath, body, "_rez_fwd")
 
@@ -186,8 +186,13 @@ def deep_update(dict1, dict2):
 
 @atexit.register
 def _atexit():
+    # if no context was used, there are no tmpdirs to clear, and importing
+    # resolved_context here would only slow down exit
+    module = sys.modules.get("rez.resolved_context")
+    if module is None:
+        return
+
     try:
-        from rez.resolved_context import ResolvedContext
-        ResolvedContext.tmpdir_manager.clear()
+        module.ResolvedContext.tmpdir_manager.clear()
     except RezError:
         pass
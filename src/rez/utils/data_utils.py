@@ -3,6 +3,7 @@ Utilities related to managing data types.
 """
 from rez.vendor.schema.schema import Schema, Optional
 from rez.exceptions import RexError
+from rez.utils import wire_format
 from collections import MutableMapping
 from inspect import getsourcelines, getargspec
 from threading import Lock
@@ -71,6 +72,11 @@ class SourceCode(object):
         return "%s(%r)" % (self.__class__.__name__, self.source)
 
 
+wire_format.register_type(SourceCode, "SourceCode",
+                          to_state=lambda x: x.source,
+                          from_state=SourceCode)
+
+
 class cached_property(object):
     """Simple property caching descriptor.
 
@@ -0,0 +1,281 @@
+"""
+A persistent key/value cache stored in a local directory.
+"""
+from rez.config import config
+from rez.utils.memcached import cache_interface_version
+from rez.utils.stats import stats
+from hashlib import md5
+import cPickle
+import random
+import time
+import zlib
+import errno
+import stat
+import os
+import os.path
+
+
+class LocalCache(object):
+    """A key/value cache in a local directory.
+
+    This has the same interface as the memcached `Client`, so it can be used in
+    its place where there is no memcached server, such as for resolve caching.
+
+    Entries are stored one per file, in 256 shard directories, keyed on a hash
+    of the key. Entries are written atomically, so the cache can be shared by
+    concurrent processes. Each shard is limited to an equal part of `max_size`;
+    when a shard is full, its least recently used entries are removed. To keep
+    sets cheap, a shard is only checked on one in every `evict_interval` sets
+    (on average), so the cache can briefly exceed `max_size`. Similarly, an
+    entry's mtime (which eviction is based on) is only updated on a hit if it is
+    older than `touch_interval` seconds.
+
+    Entries are unpickled when read, so anyone who can write to the cache can
+    run code in the processes reading it. The cache directory is created
+    private to the current user, and entries are not read or written unless
+    the directory is owned by the current user, and is not writable by anyone
+    else.
+    """
+    class _Miss(object):
+        def __nonzero__(self): return False
+    miss = _Miss()
+
+    evict_interval = 16
+    touch_interval = 3600
+
+    logger = config.debug_printer("memcache")
+
+    def __init__(self, path, max_size=0):
+        """Create a local cache.
+
+        Args:
+            path (str): Directory to store cache entries in. It is created if
+                it does not exist.
+            max_size (int): Maximum size of the cache, in bytes. Zero means
+                unlimited.
+        """
+        self.path = os.path.expanduser(path)
+        self.max_size = max_size
+        self._trusted = None
+
+    def __nonzero__(self):
+        return bool(self.path)
+
+    def set(self, key, val, time=0, min_compress_len=0):
+        """Store a value.
+
+        Args:
+            key (str): Key.
+            val (object): Value, this must be picklable.
+            time: Ignored, entries do not expire.
+            min_compress_len (int): Bytecount beyond which the entry is
+                compressed. Zero means never compress.
+        """
+        key = self._qualified_key(key)
+        filepath = self._get_filepath(key)
+
+        try:
+            data = cPickle.dumps((key, val), cPickle.HIGHEST_PROTOCOL)
+        except (cPickle.PicklingError, TypeError) as e:
+            self.logger("SET FAILED: %s (%s)", key, str(e))
+            return
+
+        if min_compress_len and len(data) > min_compress_len:
+            data = 'z' + zlib.compress(data)
+        else:
+            data = 'p' + data
+
+        dirpath = os.path.dirname(filepath)
+        tmp_filepath = "%s.%d.tmp" % (filepath, os.getpid())
+
+        try:
+            try:
+                os.makedirs(dirpath, 0700)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+            if not self._is_trusted():
+                self.logger("SET FAILED: %s (untrusted cache directory %s)",
+                            key, self.path)
+                return
+
+            with open(tmp_filepath, 'wb') as f:
+                f.write(data)
+            os.rename(tmp_filepath, filepath)
+        except (IOError, OSError) as e:
+            self.logger("SET FAILED: %s (%s)", key, str(e))
+            return
+
+        self.logger("SET: %s", key)
+        stats.incr("local_cache.sets")
+        if self.max_size and random.randint(1, self.evict_interval) == 1:
+            self._evict(dirpath)
+
+    def get(self, key):
+        """Retrieve a value.
+
+        Returns:
+            object: A value if cached, else `self.miss`.
+        """
+        key = self._qualified_key(key)
+        filepath = self._get_filepath(key)
+
+        try:
+            if not self._is_trusted():
+                raise IOError("untrusted cache directory")
+
+            with open(filepath, 'rb') as f:
+                st = os.fstat(f.fileno())
+                # don't trust an entry written by another user
+                if hasattr(os, "getuid") and st.st_uid != os.getuid():
+                    raise IOError("untrusted cache entry")
+                data = f.read()
+        except IOError:
+            self.logger("MISS: %s", key)
+            stats.incr("local_cache.misses")
+            return self.miss
+
+        try:
+            if data[:1] == 'z':
+                data = zlib.decompress(data[1:])
+            else:
+                data = data[1:]
+            key_, result = cPickle.loads(data)
+        except Exception:
+            # corrupt entry
+            self._remove(filepath)
+            self.logger("MISS: %s", key)
+            stats.incr("local_cache.misses")
+            return self.miss
+
+        if key_ != key:
+            self.logger("MISS: %s", key)
+            stats.incr("local_cache.misses")
+            return self.miss
+
+        # update mtime, so eviction is least recently used
+        if st.st_mtime < time.time() - self.touch_interval:
+            try:
+                os.utime(filepath, None)
+            except OSError:
+                pass
+
+        self.logger("HIT: %s", key)
+        stats.incr("local_cache.hits")
+        return result
+
+    def get_multi(self, keys):
+        """Retrieve several values.
+
+        Returns:
+            dict: {key: value} for each key that is cached.
+        """
+        results = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not self.miss:
+                results[key] = value
+        return results
+
+    def delete(self, key):
+        """Remove a value."""
+        key = self._qualified_key(key)
+        self._remove(self._get_filepath(key))
+
+    def flush(self, hard=False):
+        """Remove all entries from the cache.
+
+        Args:
+            hard: Ignored, a local cache is always flushed completely.
+        """
+        for dirpath, filenames in self._iter_shards():
+            for filename in filenames:
+                self._remove(os.path.join(dirpath, filename))
+
+    def get_size(self):
+        """Get the total size of the cache.
+
+        Returns:
+            int: Size in bytes.
+        """
+        size = 0
+        for dirpath, filenames in self._iter_shards():
+            for filename in filenames:
+                try:
+                    size += os.path.getsize(os.path.join(dirpath, filename))
+                except OSError:
+                    pass
+        return size
+
+    def _evict(self, dirpath):
+        max_shard_size = self.max_size / 256
+        entries = []
+        shard_size = 0
+
+        for filename in os.listdir(dirpath):
+            filepath = os.path.join(dirpath, filename)
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, filepath))
+            shard_size += st.st_size
+
+        if shard_size <= max_shard_size:
+            return
+
+        entries.sort()
+        for _, size, filepath in entries:
+            self._remove(filepath)
+            self.logger("EVICTED: %s", filepath)
+            shard_size -= size
+            if shard_size <= max_shard_size:
+                break
+
+    def _is_trusted(self):
+        # True if the cache directory is owned by the current user, and no one
+        # else can write to it. Not remembered until the directory exists.
+        if self._trusted is not None:
+            return self._trusted
+        if not hasattr(os, "getuid"):
+            self._trusted = True
+            return True
+
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+
+        self._trusted = (st.st_uid == os.getuid()
+                         and not st.st_mode & (stat.S_IWGRP | stat.S_IWOTH))
+        if not self._trusted:
+            self.logger("Ignoring cache directory %s: it is not owned by the "
+                        "current user, or is writable by others", self.path)
+        return self._trusted
+
+    def _iter_shards(self):
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            return
+
+        for name in names:
+            dirpath = os.path.join(self.path, name)
+            if os.path.isdir(dirpath):
+                yield dirpath, os.listdir(dirpath)
+
+    def _get_filepath(self, key):
+        h = md5(key).hexdigest()
+        return os.path.join(self.path, h[:2], h)
+
+    @classmethod
+    def _remove(cls, filepath):
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+    @classmethod
+    def _qualified_key(cls, key):
+        return "%s:%s" % (cache_interface_version, key)
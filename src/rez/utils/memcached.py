@@ -1,24 +1,159 @@
 from rez.config import config
-from rez.vendor.memcache.memcache import Client as Client_, SERVER_MAX_KEY_LENGTH
-from threading import local
+from rez.utils.stats import stats
+from rez.utils import wire_format
+from rez.vendor.memcache.memcache import Client as Client_, _Host as _Host_, \
+    SERVER_MAX_KEY_LENGTH
+from threading import local, Lock, Thread
+from collections import OrderedDict
+from Queue import Queue, Full
 from contextlib import contextmanager
 from functools import update_wrapper
 from inspect import getargspec, isgeneratorfunction
 from hashlib import md5
 from uuid import uuid4
+import cPickle
+import atexit
+import time as time_
+import os
 
 
 # this version should be changed if and when the caching interface changes
 cache_interface_version = 1
 
 
+class ServerHealth(object):
+    """The health of memcached servers, shared by all clients in the process.
+
+    A server that fails - a connection or socket error, including a timeout -
+    is skipped until a back-off interval has passed, after which it is tried
+    again. The interval starts at 'memcached_retry_interval' seconds, and
+    doubles with each consecutive failure, up to
+    'memcached_max_retry_interval'. A successful connection resets it. This
+    stops a slow or down server from costing a timeout on every cache access.
+    """
+    logger = config.debug_printer("memcache")
+
+    def __init__(self):
+        self.servers = {}
+        self.lock = Lock()
+
+    def is_down(self, server):
+        """Returns:
+            bool: True if the server should not be used.
+        """
+        entry = self.servers.get(server)
+        return bool(entry) and entry["down_until"] > time_.time()
+
+    def record_failure(self, server, reason):
+        with self.lock:
+            entry = self._entry(server)
+            entry["failures"] += 1
+            entry["total_failures"] += 1
+            entry["last_error"] = str(reason)
+
+            interval = min(config.memcached_retry_interval
+                           * 2 ** min(entry["failures"] - 1, 16),
+                           config.memcached_max_retry_interval)
+            entry["down_until"] = time_.time() + interval
+
+        stats.incr("memcache.server_failures")
+        self.logger("SERVER DOWN: %s (%s), retry in %d secs",
+                    server, reason, interval)
+
+    def record_success(self, server):
+        entry = self.servers.get(server)
+        if entry and entry["failures"]:
+            with self.lock:
+                entry["failures"] = 0
+                entry["down_until"] = 0
+            self.logger("SERVER UP: %s", server)
+
+    def get_status(self, server):
+        """Get the health of a server.
+
+        Returns:
+            dict: Containing 'down_until' (time until which the server is
+            skipped, zero if it is not), 'failures' (consecutive failures),
+            'total_failures' and 'last_error'.
+        """
+        with self.lock:
+            return self.servers.get(server, self._new_entry()).copy()
+
+    def reset(self):
+        """Forget all server failures."""
+        with self.lock:
+            self.servers.clear()
+
+    def _entry(self, server):
+        entry = self.servers.get(server)
+        if entry is None:
+            entry = self._new_entry()
+            self.servers[server] = entry
+        return entry
+
+    @classmethod
+    def _new_entry(cls):
+        return dict(down_until=0, failures=0, total_failures=0,
+                    last_error=None)
+
+
+server_health = ServerHealth()
+
+
+class _Host(_Host_):
+    # a server connection that uses, and updates, the process-wide
+    # `server_health`, rather than tracking dead servers per client
+    def __init__(self, host, *nargs, **kwargs):
+        super(_Host, self).__init__(host, *nargs, **kwargs)
+        self.uri = host[0] if isinstance(host, tuple) else host
+
+    def _check_dead(self):
+        if server_health.is_down(self.uri):
+            stats.incr("memcache.server_skips")
+            return 1
+        return 0
+
+    def mark_dead(self, reason):
+        server_health.record_failure(self.uri, reason)
+        super(_Host, self).mark_dead(reason)
+
+    def _get_socket(self):
+        connected = (self.socket is not None)
+        socket_ = super(_Host, self)._get_socket()
+        if socket_ is not None and not connected:
+            server_health.record_success(self.uri)
+        return socket_
+
+
+class _NativeClient(Client_):
+    def set_servers(self, servers):
+        self.servers = [_Host(x, self.debug,
+                              socket_timeout=self.socket_timeout,
+                              flush_on_reconnect=self.flush_on_reconnect)
+                        for x in servers]
+        self._init_buckets()
+
+
+def create_native_client(servers):
+    """Create a `memcache.Client`.
+
+    The client uses the 'memcached_socket_timeout' setting, and skips servers
+    that have recently failed - see `ServerHealth`.
+    """
+    return _NativeClient(servers,
+                         socket_timeout=config.memcached_socket_timeout)
+
+
 class Client(object):
     """Wrapper for memcache.Client instance.
 
     Adds the features:
     - unlimited key length;
     - hard/soft flushing;
-    - ability to cache None.
+    - ability to cache None;
+    - optional write-behind, where values are stored by a background thread;
+    - compact encoding of values, see `rez.utils.wire_format`. Values that
+      cannot be encoded are pickled instead.
     """
     class _Miss(object):
         def __nonzero__(self): return False
@@ -26,7 +161,7 @@ class Client(object):
 
     logger = config.debug_printer("memcache")
 
-    def __init__(self, servers, debug=False):
+    def __init__(self, servers, debug=False, write_behind=None):
         """Create a memcached client.
 
         Args:
@@ -34,6 +169,10 @@ class Client(object):
             debug (bool): If True, quasi human readable keys are used. This helps
                 debugging - run 'memcached -vv' in the foreground to see the keys
                 being get/set/stored.
+            write_behind (bool): If True, `set` and `set_multi` return
+                immediately, and values are stored by a background thread. See
+                `WriteBehindQueue`. Defaults to the 'memcached_write_behind'
+                setting.
         """
         self.servers = [servers] if isinstance(servers, basestring) else servers
         self.key_hasher = self._debug_key_hash if debug else self._key_hash
@@ -41,6 +180,10 @@ class Client(object):
         self.debug = debug
         self.current = ''
 
+        if write_behind is None:
+            write_behind = config.memcached_write_behind
+        self.write_behind = write_behind
+
     def __nonzero__(self):
         return bool(self.servers)
 
@@ -52,7 +195,7 @@ class Client(object):
             `memcache.Client` instance.
         """
         if self._client is None:
-            self._client = Client_(self.servers)
+            self._client = create_native_client(self.servers)
         return self._client
 
     def test_servers(self):
@@ -63,7 +206,7 @@ class Client(object):
         """
         responders = set()
         for server in self.servers:
-            client = Client_([server])
+            client = create_native_client([server])
             key = uuid4().hex
             client.set(key, 1)
             if client.get(key) == 1:
@@ -77,14 +220,44 @@ class Client(object):
 
         key = self._qualified_key(key)
         hashed_key = self.key_hasher(key)
-        val = (key, val)
 
-        self.client.set(key=hashed_key,
-                        val=val,
-                        time=time,
-                        min_compress_len=min_compress_len)
+        self._store("set",
+                    key=hashed_key,
+                    val=(key, val),
+                    time=time,
+                    min_compress_len=min_compress_len)
         self.logger("SET: %s", key)
 
+    def set_multi(self, mapping, time=0, min_compress_len=0):
+        """Store several values in a single round trip.
+
+        Args:
+            mapping (dict): {key: value} to store.
+
+        Returns:
+            list: Keys that failed to be stored. This is always empty if the
+            values were queued for write-behind.
+        """
+        if not self.servers or not mapping:
+            return []
+
+        hashed_mapping = {}
+        hashed_keys = {}
+        for key, val in mapping.iteritems():
+            key_ = self._qualified_key(key)
+            hashed_key = self.key_hasher(key_)
+            hashed_mapping[hashed_key] = (key_, val)
+            hashed_keys[hashed_key] = key
+
+        failed = self._store("set_multi",
+                             mapping=hashed_mapping,
+                             time=time,
+                             min_compress_len=min_compress_len)
+
+        for hashed_key, key in hashed_keys.iteritems():
+            self.logger("SET: %s", self._qualified_key(key))
+        return [hashed_keys[x] for x in (failed or [])]
+
     def get(self, key):
         """See memcache.Client.
 
@@ -98,17 +271,84 @@ class Client(object):
 
         key = self._qualified_key(key)
         hashed_key = self.key_hasher(key)
-        entry = self.client.get(hashed_key)
+        with stats.timer("memcache.get"):
+            entry = self.client.get(hashed_key)
+        entry = self._unpack(entry)
 
-        if isinstance(entry, tuple) and len(entry) == 2:
-            key_, result = entry
-            if key_ == key:
-                self.logger("HIT: %s", key)
-                return result
+        if entry and entry[0] == key:
+            self.logger("HIT: %s", key)
+            stats.incr("memcache.hits")
+            return entry[1]
 
         self.logger("MISS: %s", key)
+        stats.incr("memcache.misses")
         return self.miss
 
+    def get_multi(self, keys):
+        """Retrieve several values in a single round trip.
+
+        Returns:
+            dict: {key: value} for each key that is cached. Missed keys are not
+            present in the dict.
+        """
+        if not self.servers:
+            return {}
+
+        qualified_keys = {}
+        for key in keys:
+            key_ = self._qualified_key(key)
+            qualified_keys[self.key_hasher(key_)] = (key, key_)
+
+        with stats.timer("memcache.get_multi"):
+            entries = self.client.get_multi(qualified_keys.keys())
+        results = {}
+
+        for hashed_key, (key, key_) in qualified_keys.iteritems():
+            entry = self._unpack(entries.get(hashed_key))
+            if entry and entry[0] == key_:
+                self.logger("HIT: %s", key_)
+                stats.incr("memcache.hits")
+                results[key] = entry[1]
+            else:
+                self.logger("MISS: %s", key_)
+                stats.incr("memcache.misses")
+
+        return results
+
+    def incr(self, key, delta=1):
+        """Increment a counter, creating it if it does not exist.
+
+        Counters are not values - read them with `get_counters`.
+        """
+        if not self.servers:
+            return
+
+        hashed_key = self.key_hasher(self._qualified_key(key))
+        if self.client.incr(hashed_key, delta) is None:
+            if not self.client.add(hashed_key, delta):
+                # another process created it first
+                self.client.incr(hashed_key, delta)
+
+    def get_counters(self, keys):
+        """Get the values of counters set by `incr`.
+
+        Returns:
+            dict: {key: value}, where value is zero if the counter does not
+            exist.
+        """
+        if not self.servers:
+            return dict((x, 0) for x in keys)
+
+        hashed_keys = dict((self.key_hasher(self._qualified_key(x)), x)
+                           for x in keys)
+        entries = self.client.get_multi(hashed_keys.keys())
+
+        counters = {}
+        for hashed_key, key in hashed_keys.iteritems():
+            value = entries.get(hashed_key)
+            counters[key] = value if isinstance(value, (int, long)) else 0
+        return counters
+
     def delete(self, key):
         """See memcache.Client."""
         if self.servers:
@@ -154,9 +394,58 @@ class Client(object):
             self._client.disconnect_all()
         #print "Disconnected memcached client %s" % str(self)
 
+    def _store(self, method, **kwargs):
+        # values are (key, value) entries, which are encoded here, or by the
+        # write-behind thread, so that encoding is also kept off the caller's
+        # critical path
+        if self.write_behind:
+            if write_behind_queue.put(self.servers, method, kwargs,
+                                      pack=True):
+                stats.incr("memcache.write_behind.queued")
+                return None
+            # queue is full - store synchronously rather than drop the value
+            stats.incr("memcache.write_behind.overflows")
+
+        self._pack_args(method, kwargs)
+        with stats.timer("memcache." + method):
+            return getattr(self.client, method)(**kwargs)
+
     def _qualified_key(self, key):
         return "%s:%s:%s" % (cache_interface_version, self.current, key)
 
+    @classmethod
+    def _pack_args(cls, method, kwargs):
+        # encode the (key, value) entries in the arguments of a store method
+        with stats.timer("memcache.encode"):
+            if method == "set_multi":
+                kwargs["mapping"] = dict((k, cls._pack(*v)) for k, v
+                                         in kwargs["mapping"].iteritems())
+            else:
+                kwargs["val"] = cls._pack(*kwargs["val"])
+
+    @classmethod
+    def _pack(cls, key, val):
+        # the key is stored with the value, to detect hash collisions
+        try:
+            return wire_format.dumps((key, val))
+        except ValueError:
+            stats.incr("memcache.pickled")
+            return (key, val)
+
+    @classmethod
+    def _unpack(cls, entry):
+        # returns (key, value), or None if not a valid entry
+        if isinstance(entry, str):
+            try:
+                with stats.timer("memcache.decode"):
+                    entry = wire_format.loads(entry)
+            except ValueError:
+                return None
+
+        if isinstance(entry, tuple) and len(entry) == 2:
+            return entry
+        return None
+
     def _get_stats(self, stat_args=None):
         return self.client.get_stats(stat_args=stat_args)
 
@@ -194,7 +483,7 @@ class _ScopedInstanceManager(local):
         assert entry
 
         entry[1] -= 1
-        if not entry[1]:
+        if not entry[1] and not config.memcached_keep_connections:
             client = entry[0]
             del self.clients[key]
             client.disconnect()
@@ -203,6 +492,135 @@ class _ScopedInstanceManager(local):
 scoped_instance_manager = _ScopedInstanceManager()
 
 
+class WriteBehindQueue(object):
+    """Stores memcached values in a background thread.
+
+    Populating the cache (encoding and compressing values) is then kept off the
+    critical path of the caller - a slow resolve does not also wait on storing
+    its result. The thread has its own connections to the memcached server(s),
+    and is started on first use.
+
+    Writes still queued when the process exits are flushed first, so that
+    entries are not lost. If the queue is full, `put` returns False, and the
+    caller should store the value itself.
+    """
+    logger = config.debug_printer("memcache")
+
+    def __init__(self, max_size=0):
+        """Create a write-behind queue.
+
+        Args:
+            max_size (int): Maximum number of queued writes. Defaults to the
+                'memcached_write_behind_queue_size' setting.
+        """
+        self.max_size = max_size
+        self.lock = Lock()
+        self._reset()
+
+    def put(self, servers, method, kwargs, pack=False):
+        """Queue a write.
+
+        Args:
+            servers (list of str): Server URI(s) to write to.
+            method (str): Name of the `memcache.Client` method to call, such
+                as 'set' or 'set_multi'.
+            kwargs (dict): Arguments of the method.
+            pack (bool): If True, the values in `kwargs` are (key, value)
+                entries, which are encoded as `Client` does before they are
+                stored.
+
+        Returns:
+            bool: True if the write was queued, False if the queue is full.
+        """
+        with self.lock:
+            if self.pid != os.getpid():
+                # forked - the parent's thread does not exist in this process
+                self._reset()
+
+            if self.queue is None:
+                max_size = (self.max_size
+                            or config.memcached_write_behind_queue_size)
+                self.queue = Queue(max_size)
+                self.thread = Thread(target=self._run, args=(self.queue,),
+                                     name="memcached-write-behind")
+                self.thread.daemon = True
+                self.thread.start()
+
+            try:
+                self.queue.put_nowait((tuple(servers), method, kwargs, pack))
+            except Full:
+                return False
+            return True
+
+    def flush(self):
+        """Wait for all queued writes to complete."""
+        with self.lock:
+            if self.queue is None or self.pid != os.getpid():
+                return
+            queue = self.queue
+        queue.join()
+
+    def reset(self):
+        """Drop queued writes and the writer thread.
+
+        Call this in a forked child process, so that it does not repeat
+        writes queued by its parent.
+        """
+        with self.lock:
+            self._reset()
+
+    def _reset(self):
+        self.queue = None
+        self.thread = None
+        self.pid = os.getpid()
+
+    def _run(self, queue):
+        clients = {}
+
+        while True:
+            servers, method, kwargs, pack = queue.get()
+            try:
+                if pack:
+                    Client._pack_args(method, kwargs)
+
+                client = clients.get(servers)
+                if client is None:
+                    client = create_native_client(list(servers))
+                    clients[servers] = client
+
+                with stats.timer("memcache.write_behind." + method):
+                    getattr(client, method)(**kwargs)
+            except Exception as e:
+                self.logger("WRITE-BEHIND FAILED: %s (%s)", method, str(e))
+            finally:
+                queue.task_done()
+
+
+write_behind_queue = WriteBehindQueue()
+
+
+@atexit.register
+def flush_memcached_writes():
+    """Wait for values queued for write-behind to be stored.
+
+    This is called at process exit, so write-behind does not lose entries.
+    """
+    write_behind_queue.flush()
+
+
+def reset_memcached_clients():
+    """Drop the connections of all shared memcached clients.
+
+    Call this in a forked child process, so that it does not share memcached
+    sockets with its parent. Connections are not closed, since they still
+    belong to the parent; clients will reconnect on next use. Writes queued
+    for write-behind are also dropped, since the parent will store them.
+    """
+    for client, _ in scoped_instance_manager.clients.itervalues():
+        client._client = None
+    write_behind_queue.reset()
+
+
 @contextmanager
 def memcached_client(servers=config.memcached_uri, debug=config.debug_memcache):
     """Get a shared memcached instance.
@@ -212,7 +630,14 @@ def memcached_client(servers=config.memcached_uri, debug=config.debug_memcache):
     the same time unnecessary extra reconnections are avoided. Typically an
     initial scope (using 'with' construct) is made around parts of code that hit
     the cache server many times - such as a resolve, or executing a context. On
-    exit of the topmost scope, the memcached client is disconnected.
+    exit of the topmost scope, the memcached client is disconnected, unless the
+    'memcached_keep_connections' setting is enabled - then it is kept, and
+    reused by later scopes in the same thread.
+
+    If the 'memcached_write_behind' setting is enabled, values set via the
+    client are stored in the background, and may still be pending after the
+    scope exits. They are flushed at process exit - see
+    `flush_memcached_writes`.
 
     Returns:
         `Client`: Memcached instance.
@@ -226,6 +651,134 @@ def memcached_client(servers=config.memcached_uri, debug=config.debug_memcache):
             scoped_instance_manager.release(key)
 
 
+class LRUCache(object):
+    """A thread-safe in-process cache, bounded by entry count and entry age.
+
+    Values are stored pickled, so that callers cannot modify cached values -
+    the same as a value fetched from memcached.
+    """
+    class _Miss(object):
+        def __nonzero__(self): return False
+    miss = _Miss()
+
+    def __init__(self, max_size, ttl=0):
+        """Create an LRU cache.
+
+        Args:
+            max_size (int): Maximum number of entries.
+            ttl (int): Seconds after which an entry expires. Zero means never.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        """Returns:
+            object: A value if cached, else `self.miss`.
+        """
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                return self.miss
+
+            expiry, data = entry
+            if expiry and expiry < time_.time():
+                return self.miss
+
+            self.entries[key] = entry  # most recently used
+        return cPickle.loads(data)
+
+    def set(self, key, value):
+        data = cPickle.dumps(value, cPickle.HIGHEST_PROTOCOL)
+        expiry = (time_.time() + self.ttl) if self.ttl else 0
+
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (expiry, data)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class CachedFunction(object):
+    """The state of a function decorated with `memcached` - its in-process
+    (L1) cache, and its hit/miss statistics.
+
+    If the 'memcached_function_stats' setting is enabled, statistics are added
+    to counters on the memcached server(s) when the process exits, so they
+    cover all rez processes using the server(s). See `get_function_stats`.
+    """
+    stat_names = ("l1_hits", "hits", "misses")
+
+    def __init__(self, name, servers, debug=False, l1_size=0, l1_ttl=0):
+        self.name = name
+        self.servers = servers
+        self.debug = debug
+        self.l1 = LRUCache(l1_size, l1_ttl) if l1_size else None
+        self.counts = dict((x, 0) for x in self.stat_names)
+
+    def push_stats(self, client):
+        for stat_name, count in self.counts.iteritems():
+            if count:
+                client.incr(self._stat_key(self.name, stat_name), count)
+                self.counts[stat_name] = 0
+
+    @classmethod
+    def _stat_key(cls, name, stat_name):
+        return "function_stats:%s:%s" % (name, stat_name)
+
+
+# {name: CachedFunction}
+cached_functions = {}
+
+
+def get_function_stats(servers=None, debug=None):
+    """Get the hit/miss statistics of memcached functions.
+
+    Note that only functions in modules that have been imported are included.
+
+    Returns:
+        dict: {name: {stat_name: count}}, where stat names are 'l1_hits'
+        (in-process cache hits), 'hits' (memcached hits) and 'misses'.
+    """
+    servers = config.memcached_uri if servers is None else servers
+    debug = config.debug_memcache if debug is None else debug
+    keys = {}
+    for name in cached_functions.iterkeys():
+        for stat_name in CachedFunction.stat_names:
+            keys[CachedFunction._stat_key(name, stat_name)] = (name, stat_name)
+
+    with memcached_client(servers, debug=debug) as client:
+        counters = client.get_counters(keys.keys())
+
+    stats_ = dict((x, {}) for x in cached_functions.iterkeys())
+    for key, (name, stat_name) in keys.iteritems():
+        stats_[name][stat_name] = counters[key]
+    return stats_
+
+
+@atexit.register
+def _push_function_stats():
+    # off by default - this would otherwise connect to the server(s) as every
+    # rez process exits
+    if not config.memcached_function_stats:
+        return
+
+    for cached_function in cached_functions.values():
+        if not any(cached_function.counts.itervalues()):
+            continue
+        try:
+            with memcached_client(cached_function.servers,
+                                  debug=cached_function.debug) as client:
+                cached_function.push_stats(client)
+        except Exception:
+            pass  # stats are not worth failing on exit for
+
+
 def pool_memcached_connections(func):
     """Function decorator to pool memcached connections.
 
@@ -246,7 +799,7 @@ def pool_memcached_connections(func):
 
 
 def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
-              min_compress_len=0, debug=False):
+              min_compress_len=0, debug=False, l1_size=None, l1_ttl=None):
     """memcached memoization function decorator.
 
     The wrapped function is expected to return a value that is stored to a
@@ -269,6 +822,12 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
         `from_cache` and `to_cache` both accept the value as first parameter,
         then the target function's arguments follow.
 
+    Note:
+        The decorated function has a `call_multi` attribute, which takes a list
+        of positional argument tuples, and returns the list of results. Cached
+        results are fetched in a single round trip, and the results of cache
+        misses are stored in another.
+
     Args:
         servers (str or list of str): memcached server uri(s), eg '127.0.0.1:11211'.
             This arg can be None also, in which case memcaching is disabled.
@@ -294,6 +853,11 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
             read them if running a foreground memcached proc with 'memcached -vv'.
             However this increases chances of key clashes so should not be left
             turned on.
+        l1_size (int): Number of entries in the in-process cache that is
+            checked before memcached. Zero disables it. Defaults to the
+            'memcached_l1_size' setting.
+        l1_ttl (int): Seconds after which in-process cache entries expire.
+            Defaults to the 'memcached_l1_ttl' setting.
     """
     def default_key(func, *nargs, **kwargs):
         parts = [func.__module__]
@@ -326,20 +890,45 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
     to_cache = to_cache or identity
 
     def decorator(func):
+        def _cache_key(nargs, kwargs):
+            if key:
+                return key(*nargs, **kwargs)
+            else:
+                return default_key(func, *nargs, **kwargs)
+
         if servers:
+            name = "%s.%s" % (func.__module__, func.__name__)
+            cached_function = CachedFunction(
+                name, servers, debug=debug,
+                l1_size=(config.memcached_l1_size if l1_size is None
+                         else l1_size),
+                l1_ttl=(config.memcached_l1_ttl if l1_ttl is None
+                        else l1_ttl))
+            cached_functions[name] = cached_function
+            l1 = cached_function.l1
+            counts = cached_function.counts
+
             def wrapper(*nargs, **kwargs):
-                with memcached_client(servers, debug=debug) as client:
-                    if key:
-                        cache_key = key(*nargs, **kwargs)
-                    else:
-                        cache_key = default_key(func, *nargs, **kwargs)
+                cache_key = _cache_key(nargs, kwargs)
 
+                # get from the in-process cache
+                if l1 is not None:
+                    result = l1.get(cache_key)
+                    if result is not l1.miss:
+                        counts["l1_hits"] += 1
+                        return from_cache(result, *nargs, **kwargs)
+
+                with memcached_client(servers, debug=debug) as client:
                     # get
                     result = client.get(cache_key)
                     if result is not client.miss:
+                        counts["hits"] += 1
+                        if l1 is not None:
+                            l1.set(cache_key, result)
                         return from_cache(result, *nargs, **kwargs)
 
                     # cache miss - run target function
+                    counts["misses"] += 1
                     result = func(*nargs, **kwargs)
                     if isinstance(result, DoNotCache):
                         return result.result
@@ -350,10 +939,71 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
                                val=cache_result,
                                time=time,
                                min_compress_len=min_compress_len)
+                    if l1 is not None:
+                        l1.set(cache_key, cache_result)
                     return result
+
+            def call_multi(nargs_list):
+                cache_keys = [_cache_key(x, {}) for x in nargs_list]
+                cached = {}
+
+                # get from the in-process cache
+                if l1 is not None:
+                    for cache_key in cache_keys:
+                        result = l1.get(cache_key)
+                        if result is not l1.miss:
+                            counts["l1_hits"] += 1
+                            cached[cache_key] = result
+
+                with memcached_client(servers, debug=debug) as client:
+                    # get
+                    missed_keys = [x for x in cache_keys if x not in cached]
+                    if missed_keys:
+                        cached_ = client.get_multi(missed_keys)
+                        counts["hits"] += len(cached_)
+                        if l1 is not None:
+                            for cache_key, result in cached_.iteritems():
+                                l1.set(cache_key, result)
+                        cached.update(cached_)
+
+                    results = []
+                    to_set = {}
+
+                    for nargs, cache_key in zip(nargs_list, cache_keys):
+                        if cache_key in cached:
+                            result = from_cache(cached[cache_key], *nargs)
+                            results.append(result)
+                            continue
+
+                        # cache miss - run target function
+                        counts["misses"] += 1
+                        result = func(*nargs)
+                        if isinstance(result, DoNotCache):
+                            results.append(result.result)
+                            continue
+
+                        to_set[cache_key] = to_cache(result, *nargs)
+                        results.append(result)
+
+                    # store
+                    client.set_multi(to_set,
+                                     time=time,
+                                     min_compress_len=min_compress_len)
+                    if l1 is not None:
+                        for cache_key, result in to_set.iteritems():
+                            l1.set(cache_key, result)
+                    return results
         else:
+            l1 = None
+
             def wrapper(*nargs, **kwargs):
-                return func(*nargs, **kwargs)
+                result = func(*nargs, **kwargs)
+                if isinstance(result, DoNotCache):
+                    return result.result
+                return result
+
+            def call_multi(nargs_list):
+                return [wrapper(*x) for x in nargs_list]
 
         def forget():
             """Forget entries in the cache.
@@ -363,10 +1013,13 @@ def memcached(servers, key=None, from_cache=None, to_cache=None, time=0,
             that entries set by the current process will no longer be seen during
             this process.
             """
+            if l1 is not None:
+                l1.clear()
             with memcached_client(servers, debug=debug) as client:
                 client.flush()
 
         wrapper.forget = forget
+        wrapper.call_multi = call_multi
         wrapper.__wrapped__ = func
         return update_wrapper(wrapper, func)
     return decorator
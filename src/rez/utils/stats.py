@@ -0,0 +1,111 @@
+"""
+Lightweight timers and counters, for seeing where time goes in rez.
+"""
+from contextlib import contextmanager
+from functools import update_wrapper
+import time
+
+
+class Stats(object):
+    """Timers and counters, accumulated over the life of the process.
+
+    Stats are named after the stage they measure, such as 'package_file.load'
+    or 'memcache.hits'. Each timer also counts the number of times it ran.
+    Stats are cheap enough to always be collected - only coarse operations,
+    such as file loads and cache lookups, are measured.
+    """
+    def __init__(self):
+        self.times = {}
+        self.counts = {}
+
+    def incr(self, name, n=1):
+        """Increment a counter."""
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def add_time(self, name, secs):
+        """Add to a timer."""
+        self.times[name] = self.times.get(name, 0.0) + secs
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block."""
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.time() - start_time)
+
+    def timed(self, name):
+        """Function decorator that times each call of the function."""
+        def decorator(func):
+            def wrapper(*nargs, **kwargs):
+                start_time = time.time()
+                try:
+                    return func(*nargs, **kwargs)
+                finally:
+                    self.add_time(name, time.time() - start_time)
+            return update_wrapper(wrapper, func)
+        return decorator
+
+    def to_dict(self):
+        """Get the current stats.
+
+        Returns:
+            dict: Containing 'times' ({name: seconds}) and 'counts'
+            ({name: count}).
+        """
+        return dict(times=self.times.copy(),
+                    counts=self.counts.copy())
+
+    def diff(self, since):
+        """Get the stats accumulated since a previous call to `to_dict`.
+
+        Args:
+            since (dict): Stats returned from `to_dict`.
+
+        Returns:
+            dict: Stats in the same form as `to_dict`, with unchanged entries
+            removed.
+        """
+        def _diff(current, previous):
+            d = {}
+            for name, value in current.iteritems():
+                value -= previous.get(name, 0)
+                if value:
+                    d[name] = value
+            return d
+
+        return dict(times=_diff(self.times, since["times"]),
+                    counts=_diff(self.counts, since["counts"]))
+
+    def clear(self):
+        """Reset all stats."""
+        self.times.clear()
+        self.counts.clear()
+
+
+def format_stats(stats_dict):
+    """Format stats as a list of lines, suitable for printing.
+
+    Args:
+        stats_dict (dict): Stats, as returned from `Stats.to_dict`.
+
+    Returns:
+        List of str.
+    """
+    times = stats_dict.get("times", {})
+    counts = stats_dict.get("counts", {})
+    lines = []
+
+    for name in sorted(set(times) | set(counts)):
+        count = counts.get(name, 0)
+        if name in times:
+            lines.append("%-40s %10.4f secs  (%d)" % (name, times[name], count))
+        else:
+            lines.append("%-40s %10d" % (name, count))
+    return lines
+
+
+# the process-wide stats
+stats = Stats()
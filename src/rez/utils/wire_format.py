@@ -0,0 +1,170 @@
+"""
+A compact, versioned encoding for cache entries.
+
+Cache entries - such as resolves and package file contents - are mostly dicts,
+lists and strings, with the same strings (package names, repository locations
+and so on) repeated many times. Pickled, each equal string is stored once per
+occurrence, and decoding runs the pickle virtual machine over every object.
+
+This encoding interns strings before storing data with `marshal`, which then
+writes each distinct string once, and refers back to it thereafter - so the
+entry carries its own string table. Decoding is done by `marshal`, in C.
+
+Arbitrary objects are not supported. Types that are found in cache entries
+(such as `SourceCode`) are registered with `register_type`, and are stored as
+their plain data state. An entry whose data contains any other type cannot be
+encoded - `dumps` raises `ValueError`.
+"""
+import marshal
+
+
+# this version should be changed if and when the encoding changes
+format_version = 1
+
+# the marshal format differs between python versions, so is part of the header
+_header = "rezw" + chr(format_version) + chr(marshal.version)
+
+_atomic_types = frozenset((type(None), bool, int, long, float, unicode))
+
+# {type: (name, to_state)}
+_types = {}
+
+# {name: from_state}
+_from_state_functions = {}
+
+
+def register_type(cls, name, to_state, from_state):
+    """Register a type that can be encoded.
+
+    Registered objects may only appear as dict values or list items, not
+    directly within tuples, sets or dict keys.
+
+    Args:
+        cls (type): Type to register. Subclasses are not included.
+        name (str): Unique name of the type in encoded data.
+        to_state (callable): Function that takes an object and returns its
+            state, which must be encodable data, without registered objects.
+        from_state (callable): Function that takes a state and returns an
+            object.
+    """
+    _types[cls] = (name, to_state)
+    _from_state_functions[name] = from_state
+
+
+def dumps(value):
+    """Encode a value.
+
+    Returns:
+        str: Encoded value.
+
+    Raises:
+        `ValueError`: If the value contains data that cannot be encoded.
+    """
+    objects = []
+    if type(value) in _types:
+        data = None
+        _add_object(value, objects, ())
+    else:
+        data = _encode(value, objects, ())
+
+    return _header + marshal.dumps((objects, data), 2)
+
+
+def loads(s):
+    """Decode a value encoded with `dumps`.
+
+    Raises:
+        `ValueError`: If the data is not encoded in this format, was encoded
+        with a different version of it, or contains a registered type that is
+        not known in this process.
+    """
+    if not s.startswith(_header):
+        raise ValueError("Not encoded in rez wire format version %d"
+                         % format_version)
+
+    try:
+        objects, data = marshal.loads(s[len(_header):])
+    except (EOFError, TypeError) as e:
+        raise ValueError("Corrupt rez wire format data: %s" % str(e))
+
+    # restore registered objects, at the paths they were found at
+    for path, name, state in objects:
+        from_state = _from_state_functions.get(name)
+        if from_state is None:
+            raise ValueError("Unknown type in rez wire format data: %s" % name)
+
+        obj = from_state(state)
+        if not path:
+            return obj
+
+        parent = data
+        for key in path[:-1]:
+            parent = parent[key]
+        parent[path[-1]] = obj
+
+    return data
+
+
+def _add_object(value, objects, path):
+    name, to_state = _types[type(value)]
+    state = _encode_data(to_state(value))
+    objects.append((path, name, state))
+
+
+def _encode(value, objects, path):
+    # Strings are interned, so that marshal stores them once. Registered
+    # objects are replaced with None, and recorded in `objects` along with
+    # their path from the root value, so that decoding does not have to
+    # search for them.
+    type_ = type(value)
+
+    if type_ is dict:
+        result = {}
+        for k, v in value.iteritems():
+            k = _encode_data(k)
+            if type(v) in _types:
+                _add_object(v, objects, path + (k,))
+                result[k] = None
+            else:
+                result[k] = _encode(v, objects, path + (k,))
+        return result
+
+    elif type_ is list:
+        result = []
+        for i, v in enumerate(value):
+            if type(v) in _types:
+                _add_object(v, objects, path + (i,))
+                result.append(None)
+            else:
+                result.append(_encode(v, objects, path + (i,)))
+        return result
+
+    elif type_ is tuple:
+        return tuple(_encode(v, objects, path + (i,))
+                     for i, v in enumerate(value))
+
+    return _encode_data(value)
+
+
+def _encode_data(value):
+    # as `_encode`, for data that cannot contain registered objects
+    type_ = type(value)
+
+    if type_ is str:
+        return intern(value)
+
+    elif type_ in _atomic_types:
+        return value
+
+    # strings are checked for inline, since they are the most common value
+    elif type_ is dict:
+        return dict(((intern(k) if type(k) is str else _encode_data(k)),
+                     (intern(v) if type(v) is str else _encode_data(v)))
+                    for k, v in value.iteritems())
+
+    elif type_ in (list, tuple, set, frozenset):
+        return type_([(intern(v) if type(v) is str else _encode_data(v))
+                      for v in value])
+
+    raise ValueError("Cannot encode %s object in rez wire format: %r"
+                     % (type_.__name__, value))
@@ -6,6 +6,10 @@ from rez.vendor import yaml
 from rez.vendor.yaml.error import YAMLError
 from rez.exceptions import RezSystemError, SuiteError
 from rez.config import config
+from rez.backport.shutilwhich import which
+import subprocess
+import marshal
+import atexit
 import os.path
 import sys
 
@@ -82,8 +86,7 @@ class Wrapper(object):
 
     def _run_no_args(self, args):
         cmd = [self.tool_name] + list(args)
-        retcode, _, _ = self.context.execute_shell(command=cmd, block=True)
-        return retcode
+        return self._run_tool(cmd)
 
     def _run(self, prefix_char, args):
         from rez.vendor import argparse
@@ -179,6 +182,8 @@ class Wrapper(object):
             cmd = None
         else:
             cmd = [self.tool_name] + tool_args
+            if context is self.context and not opts.stdin:
+                return self._run_tool(cmd, quiet=opts.quiet)
 
         retcode, _, _ = context.execute_shell(command=cmd,
                                               stdin=opts.stdin,
@@ -186,6 +191,45 @@ class Wrapper(object):
                                               block=True)
         return retcode
 
+    def _run_tool(self, cmd, quiet=False):
+        # run the tool directly in the baked environment if there is one,
+        # rather than interpreting the context and spawning a shell
+        environ = self._get_baked_environ()
+        if environ is not None:
+            path = which(cmd[0], env=environ)
+            if path:
+                if os.name == "posix":
+                    # exec skips exit handlers (such as those that flush
+                    # memcached writes), so run them first
+                    atexit._run_exitfuncs()
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os.execve(path, cmd, environ)
+                return subprocess.call([path] + cmd[1:], env=environ)
+
+        retcode, _, _ = self.context.execute_shell(command=cmd,
+                                                   quiet=quiet,
+                                                   block=True)
+        return retcode
+
+    def _get_baked_environ(self):
+        from rez.suite import Suite
+
+        filepath = Suite._baked_environ_path(self.context_name, self.suite_path)
+        if not os.path.isfile(filepath):
+            return None
+
+        try:
+            with open(filepath, "rb") as f:
+                data = marshal.loads(f.read())
+        except (IOError, EOFError, ValueError, TypeError):
+            return None
+
+        environ = self.context.get_baked_environ(data)
+        if environ is not None and self.context.load_path:
+            environ["REZ_RXT_FILE"] = self.context.load_path
+        return environ
+
     def print_about(self):
         """Print an info message about the tool."""
         filepath = os.path.join(self.suite_path, "bin", self.tool_name)
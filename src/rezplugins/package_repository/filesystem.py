@@ -8,15 +8,19 @@ from rez.package_resources_ import PackageFamilyResource, PackageResource, \
 from rez.serialise import clear_file_caches, open_file_for_write
 from rez.package_serialise import dump_package_data
 from rez.exceptions import PackageMetadataError, ResourceError, RezSystemError, \
-    ConfigurationError, PackageRepositoryError
+    ConfigurationError, PackageRepositoryError, RezError
 from rez.utils.formatting import is_valid_package_name, PackageRequest
 from rez.utils.resources import cached_property
-from rez.serialise import load_from_file, FileFormat
+from rez.utils.logging_ import print_warning
+from rez.serialise import load_from_file, load_from_files, FileFormat
 from rez.config import config
 from rez.utils.memcached import memcached, pool_memcached_connections
+from rez.utils.stats import stats
 from rez.backport.lru_cache import lru_cache
 from rez.vendor.schema.schema import Schema, Optional, And, Use, Or
 from rez.vendor.version.version import Version, VersionRange
+import marshal
+import stat
 import time
 import os.path
 import os
@@ -30,6 +34,12 @@ class PackageDefinitionFileMissing(PackageMetadataError):
     pass
 
 
+# name of the variant index file in the repository root, and the format version
+# written into it. Bump the version if the layout of the index changes.
+variant_index_filename = ".rez_variant_index"
+variant_index_version = 2
+
+
 #------------------------------------------------------------------------------
 # resources
 #------------------------------------------------------------------------------
@@ -55,6 +65,23 @@ class FileSystemPackageFamilyResource(PackageFamilyResource):
             return 0
 
     def iter_packages(self):
+        # use the variant index if it is up to date for this family
+        entries = self._repository._get_family_index(self.name)
+        if entries is not None:
+            for version_str in entries.iterkeys():
+                variables = dict(location=self.location, name=self.name)
+                if version_str:
+                    variables["version"] = version_str
+
+                package = self._repository.get_resource(
+                    FileSystemPackageResource.key, **variables)
+                yield package
+            return
+
+        for package in self._iter_packages_from_dirs():
+            yield package
+
+    def _iter_packages_from_dirs(self):
         # check for unversioned package
         filepath, _ = self._repository._get_file(self.path, "package")
         if filepath:
@@ -131,7 +158,10 @@ class FileSystemPackageResource(PackageResourceHelper):
             raise PackageDefinitionFileMissing(
                 "Missing package definition file: %r" % self)
 
-        data = load_from_file(self.filepath, self.file_format)
+        # see FileSystemPackageRepository.preload_packages
+        data = self.__dict__.pop("_preloaded_data", None)
+        if data is None:
+            data = load_from_file(self.filepath, self.file_format)
 
         if "timestamp" not in data:  # old format support
             data_ = self._load_old_formats()
@@ -364,6 +394,15 @@ class FileSystemPackageRepository(PackageRepository):
                  /pkgB/2.1/package.py
                       /2.2/package.py
 
+    The repository also maintains a variant index file (.rez_variant_index) in
+    its root directory. This stores the versions of each package family, and the
+    requirements of each variant, so that the solver does not have to load the
+    package definition files. Each family entry is validated against the mtime
+    of the family directory, and each package's entry (when its variants are
+    requested) against the mtime of its version directory and package file.
+    Entries are rewritten whenever a variant is installed.
+    Stale or missing entries are ignored, and packages are loaded as normal.
+
     Another supported storage format is to store all package versions within a
     single package family in one file, like so:
 
@@ -389,7 +428,8 @@ class FileSystemPackageRepository(PackageRepository):
                 - python-2.6
     """
     schema_dict = {"file_lock_timeout": int,
-                   "file_lock_dir": Or(None, str)}
+                   "file_lock_dir": Or(None, str),
+                   "variant_index": bool}
 
     @classmethod
     def name(cls):
@@ -418,6 +458,10 @@ class FileSystemPackageRepository(PackageRepository):
         self.get_variants = lru_cache(maxsize=None)(self._get_variants)
         self.get_file = lru_cache(maxsize=None)(self._get_file)
 
+        self._get_variant_index = lru_cache(maxsize=None)(self._load_variant_index)
+        self._get_family_index = lru_cache(maxsize=None)(self._load_family_index)
+        self._get_package_index = lru_cache(maxsize=None)(self._load_package_index)
+
     def _uid(self):
         t = ["filesystem", self.location]
         if os.path.exists(self.location):
@@ -455,6 +499,91 @@ class FileSystemPackageRepository(PackageRepository):
     def get_last_release_time(self, package_family_resource):
         return package_family_resource.get_last_release_time()
 
+    def get_last_release_times(self, names):
+        # a single stat per family both finds it and gets its release time
+        times = {}
+        for name in names:
+            path = os.path.join(self.location, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                st = None
+
+            if st is not None and stat.S_ISDIR(st.st_mode):
+                times[name] = st.st_mtime
+            else:
+                filepath, _ = self.get_file(self.location, name)
+                if filepath:
+                    try:
+                        times[name] = os.path.getmtime(filepath)
+                    except OSError:
+                        times[name] = 0
+        return times
+
+    def get_indexed_variants(self, package_resource):
+        if not isinstance(package_resource, FileSystemPackageResource):
+            return None
+
+        version_str = package_resource.get("version", "")
+        variant_entries = self._get_package_index(package_resource.name,
+                                                  version_str)
+        if variant_entries is None:
+            return None
+
+        result = []
+        for index, requires, build_requires in variant_entries:
+            handle = self.make_resource_handle(
+                FileSystemVariantResource.key,
+                location=self.location,
+                name=package_resource.name,
+                version=version_str,
+                index=index)
+            result.append((handle, requires, build_requires))
+        return result
+
+    def preload_packages(self, package_resources):
+        # only memcached benefits from loading package files in bulk
+        if not (config.memcached_uri and config.cache_package_files):
+            return
+
+        resources = []
+        for resource in package_resources:
+            if isinstance(resource, FileSystemPackageResource) \
+                    and "_data" not in resource.__dict__ \
+                    and resource.filepath \
+                    and self.get_indexed_variants(resource) is None:
+                resources.append(resource)
+
+        if len(resources) < 2:
+            return
+
+        # a failure is left to the individual package load to report
+        entries = [(x.filepath, x.file_format) for x in resources]
+        try:
+            results = load_from_files(entries)
+        except RezError:
+            return
+
+        for resource, data in zip(resources, results):
+            resource._preloaded_data = data
+
+    def update_variant_index(self, family_names=None):
+        """Rebuild entries in the variant index.
+
+        The index is kept up to date as variants are installed, so you only
+        need to call this to index packages that were written to the repository
+        by some other means (for example, an existing repository).
+
+        Args:
+            family_names (list of str): Families to reindex. If None, all
+                families in the repository are reindexed.
+        """
+        if family_names is None:
+            family_names = [x.name for x in self.get_families()
+                            if isinstance(x, FileSystemPackageFamilyResource)]
+
+        self._write_variant_index(family_names)
+
     @cached_property
     def file_lock_dir(self):
         dirname = self.settings.file_lock_dir
@@ -507,6 +636,9 @@ class FileSystemPackageRepository(PackageRepository):
         self.get_packages.cache_clear()
         self.get_variants.cache_clear()
         self.get_file.cache_clear()
+        self._get_variant_index.cache_clear()
+        self._get_family_index.cache_clear()
+        self._get_package_index.cache_clear()
         self._get_family_dirs.forget()
         self._get_version_dirs.forget()
         # unfortunately we need to clear file cache across the board
@@ -525,6 +657,7 @@ class FileSystemPackageRepository(PackageRepository):
                min_compress_len=config.memcached_listdir_min_compress_len,
                key=_get_family_dirs__key,
                debug=config.debug_memcache)
+    @stats.timed("filesystem.list_families")
     def _get_family_dirs(self):
         dirs = []
         if not os.path.isdir(self.location):
@@ -548,6 +681,7 @@ class FileSystemPackageRepository(PackageRepository):
                min_compress_len=config.memcached_listdir_min_compress_len,
                key=_get_version_dirs__key,
                debug=config.debug_memcache)
+    @stats.timed("filesystem.list_versions")
     def _get_version_dirs(self, root):
         dirs = []
         for name in os.listdir(root):
@@ -608,6 +742,133 @@ class FileSystemPackageRepository(PackageRepository):
                 return filepath, format_
         return None, None
 
+    @cached_property
+    def _variant_index_filepath(self):
+        return os.path.join(self.location, variant_index_filename)
+
+    def _load_variant_index(self):
+        if not self.settings.variant_index:
+            return {}
+
+        try:
+            with open(self._variant_index_filepath, "rb") as f:
+                header, families = marshal.load(f)
+        except (IOError, OSError, EOFError, ValueError, TypeError):
+            return {}
+
+        if header != ("rez_variant_index", variant_index_version):
+            return {}
+        return families
+
+    def _load_family_index(self, name):
+        entry = self._get_variant_index().get(name)
+        if entry is None:
+            return None
+
+        mtime, versions = entry
+        path = os.path.join(self.location, name)
+        try:
+            if os.path.getmtime(path) != mtime:
+                return None
+        except OSError:
+            return None
+
+        # {version_str: (variant entries, package state)}. Package states are
+        # only checked as each package's variants are requested, see
+        # _load_package_index
+        return dict((x[0], x[1:]) for x in versions)
+
+    def _load_package_index(self, name, version_str):
+        entries = self._get_family_index(name)
+        if entries is None:
+            return None
+
+        entry = entries.get(version_str)
+        if entry is None:
+            return None
+
+        # packages can be edited in place, which doesn't touch the family dir.
+        # Only this package falls back to loading from disk if so
+        variant_entries, state = entry
+        if self._get_package_state(name, version_str, state[0]) != state:
+            return None
+        return variant_entries
+
+    def _get_package_state(self, name, version_str, filepath):
+        # the package file, its mtime and size, and the mtime of its version
+        # directory (which changes as variants are added), or None
+        path = os.path.join(self.location, name, version_str)
+        try:
+            st = os.stat(filepath)
+            return (filepath, st.st_mtime, st.st_size, os.path.getmtime(path))
+        except (OSError, TypeError):
+            return None
+
+    def _index_family(self, name):
+        family = self.get_family(name)
+        if not isinstance(family, FileSystemPackageFamilyResource):
+            return None
+
+        # stat before reading packages, so that any concurrent change to the
+        # family causes this entry to be seen as stale
+        mtime = os.path.getmtime(family.path)
+        versions = []
+
+        for package in family._iter_packages_from_dirs():
+            version_str = package.get("version", "")
+            state = self._get_package_state(name, version_str,
+                                            package.filepath)
+            if state is None:
+                return None
+
+            build_requires = [str(x) for x in (package.build_requires or [])]
+            variants = []
+
+            for variant in self.iter_variants(package):
+                requires = [str(x) for x in (variant.requires or [])]
+                variants.append((variant.index, requires, build_requires))
+
+            versions.append((package.version, version_str, variants, state))
+
+        versions = sorted(versions, key=lambda x: x[0], reverse=True)
+        return (mtime, [x[1:] for x in versions])
+
+    def _write_variant_index(self, family_names):
+        if not self.settings.variant_index:
+            return
+
+        families = self._load_variant_index().copy()
+        for name in family_names:
+            try:
+                entry = self._index_family(name)
+            except PackageMetadataError:
+                entry = None
+
+            if entry is None:
+                families.pop(name, None)
+            else:
+                families[name] = entry
+
+        # write to a temp file then rename, so readers never see a partially
+        # written index. If two releases race, one family entry may be lost -
+        # this just means that family is loaded from disk until reindexed.
+        filepath = self._variant_index_filepath
+        tmp_filepath = "%s.%d" % (filepath, os.getpid())
+        try:
+            with open(tmp_filepath, "wb") as f:
+                marshal.dump((("rez_variant_index", variant_index_version),
+                              families), f)
+            os.rename(tmp_filepath, filepath)
+        except (IOError, OSError) as e:
+            print_warning("Could not update variant index %s: %s"
+                          % (filepath, str(e)))
+            if os.path.exists(tmp_filepath):
+                os.remove(tmp_filepath)
+
+        self._get_variant_index.cache_clear()
+        self._get_family_index.cache_clear()
+        self._get_package_index.cache_clear()
+
     def _create_family(self, name):
         path = os.path.join(self.location, name)
         if not os.path.exists(path):
@@ -769,6 +1030,7 @@ class FileSystemPackageRepository(PackageRepository):
         # load new variant
         new_variant = None
         self.clear_caches()
+        self._write_variant_index([variant.name])
         family = self.get_package_family(variant.name)
         if family:
             for package in self.iter_packages(family):